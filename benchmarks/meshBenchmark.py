@@ -0,0 +1,477 @@
+"""
+
+Benchmarks for the mesh library on synthetic meshes, runs headless on ArrayMesh so no maya is needed.
+
+    python benchmarks/meshBenchmark.py --sizes 1000 100000 --output before.json
+    python benchmarks/meshBenchmark.py --sizes 1000 100000 --output after.json --compare before.json
+
+Every operation is timed on a freshly built mesh so nothing cached by an earlier operation is reused, the peak
+memory is the most numpy allocated at once during a separate run of the operation
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import types
+
+from collections import OrderedDict
+from timeit import default_timer
+
+import numpy as np
+import scipy
+
+try:
+    import tracemalloc
+except ImportError:  # python 2, no memory figures
+    tracemalloc = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_array_mesh():
+    """
+
+    Import ArrayMesh without running the pup package __init__, which loads the maya tools
+
+    :return: ArrayMesh class
+    :rtype: type
+    """
+
+    for name, path in (("pup", ("pup",)), ("pup.library", ("pup", "library"))):
+        if name not in sys.modules:
+            module = types.ModuleType(name)
+            module.__path__ = [os.path.join(ROOT, *path)]
+            sys.modules[name] = module
+
+    from pup.library.arrayMesh import ArrayMesh
+
+    return ArrayMesh
+
+
+def grid_mesh(num_verts):
+    """
+
+    Flat quad grid with a single uv shell
+
+    :param num_verts: rough number of verts
+    :type num_verts: int
+    :return: points, face counts, face verts, uvs, uv ids
+    :rtype: tuple
+    """
+
+    side = max(int(round(np.sqrt(num_verts))), 2)
+
+    xs, ys = np.meshgrid(np.arange(side, dtype=np.float64), np.arange(side, dtype=np.float64))
+    points = np.stack([xs.ravel(), ys.ravel(), np.zeros(xs.size)], axis=1)
+
+    corner = (np.arange(side - 1)[np.newaxis, :] + side * np.arange(side - 1)[:, np.newaxis]).ravel()
+    face_verts = np.stack([corner, corner + 1, corner + side + 1, corner + side], axis=1).ravel()
+
+    return (points, np.full(len(corner), 4, dtype=np.int64), face_verts, points[:, :2] / (side - 1) * 0.999,
+            face_verts.copy())
+
+
+def sphere_mesh(num_verts):
+    """
+
+    Subdivided cube pushed out onto a sphere, each side of the cube is its own uv shell
+
+    :param num_verts: rough number of verts
+    :type num_verts: int
+    :return: points, face counts, face verts, uvs, uv ids
+    :rtype: tuple
+    """
+
+    segments = max(int(round(np.sqrt(num_verts / 6.0))), 1)
+    steps = np.linspace(-1.0, 1.0, segments + 1)
+
+    us, vs = np.meshgrid(steps, steps)
+    us, vs = us.ravel(), vs.ravel()
+    ones = np.ones_like(us)
+
+    # the sides of the cube, wound so the normals point out
+    sides = [(us, vs, ones), (vs, us, -ones), (vs, ones, us), (us, -ones, vs), (ones, us, vs), (-ones, vs, us)]
+    points = np.concatenate([np.stack(side, axis=1) for side in sides])
+
+    corner = (np.arange(segments)[np.newaxis, :] + (segments + 1) * np.arange(segments)[:, np.newaxis]).ravel()
+    side_verts = np.stack([corner, corner + 1, corner + segments + 2, corner + segments + 1], axis=1)
+    side_offsets = np.arange(6) * (segments + 1) ** 2
+
+    uv_ids = (side_verts[np.newaxis] + side_offsets[:, np.newaxis, np.newaxis]).ravel()
+
+    # the sides share their edge verts, weld them
+    _, keys, face_verts = np.unique(np.round(points * segments).astype(np.int64), axis=0, return_index=True,
+                                    return_inverse=True)
+    face_verts = face_verts.ravel()[uv_ids]
+    points = points[keys]
+
+    # laid out in a 3 x 2 grid of cells
+    uvs = np.stack([us, vs], axis=1) * [0.16, 0.24] + [0.1665, 0.25]
+    uvs = np.concatenate([uvs + [itr % 3 / 3.0, itr // 3 * 0.5] for itr in range(6)])
+
+    return (points / np.linalg.norm(points, axis=1)[:, np.newaxis], np.full(len(face_verts) // 4, 4, dtype=np.int64),
+            face_verts, uvs, uv_ids)
+
+
+def torus_mesh(num_verts):
+    """
+
+    Quad torus, closed in both directions with a uv seam around each
+
+    :param num_verts: rough number of verts
+    :type num_verts: int
+    :return: points, face counts, face verts, uvs, uv ids
+    :rtype: tuple
+    """
+
+    minor = max(int(round(np.sqrt(num_verts / 4.0))), 3)
+    major = max(num_verts // minor, 3)
+
+    angles = np.linspace(0.0, 2.0 * np.pi, major, endpoint=False)[:, np.newaxis]
+    tube_angles = np.linspace(0.0, 2.0 * np.pi, minor, endpoint=False)[np.newaxis, :]
+
+    radius = 1.0 + 0.25 * np.cos(tube_angles)
+    points = np.stack([(radius * np.cos(angles)).ravel(), (radius * np.sin(angles)).ravel(),
+                       np.broadcast_to(0.25 * np.sin(tube_angles), (major, minor)).ravel()], axis=1)
+
+    rows, columns = np.meshgrid(np.arange(major), np.arange(minor), indexing="ij")
+    rows, columns = rows.ravel(), columns.ravel()
+
+    face_verts = np.stack([rows * minor + columns, (rows + 1) % major * minor + columns,
+                           (rows + 1) % major * minor + (columns + 1) % minor,
+                           rows * minor + (columns + 1) % minor], axis=1).ravel()
+
+    uv_ids = np.stack([rows * (minor + 1) + columns, (rows + 1) * (minor + 1) + columns,
+                       (rows + 1) * (minor + 1) + columns + 1, rows * (minor + 1) + columns + 1], axis=1).ravel()
+
+    us, vs = np.meshgrid(np.linspace(0.0, 0.999, major + 1), np.linspace(0.0, 0.999, minor + 1), indexing="ij")
+
+    return points, np.full(len(rows), 4, dtype=np.int64), face_verts, np.stack([us.ravel(), vs.ravel()], axis=1), \
+        uv_ids
+
+
+def shells_mesh(num_verts, tiles=8):
+    """
+
+    Flat quad grid cut into tiles x tiles uv shells, spread over udims
+
+    :param num_verts: rough number of verts
+    :type num_verts: int
+    :param tiles: number of shells along each side
+    :type tiles: int
+    :return: points, face counts, face verts, uvs, uv ids
+    :rtype: tuple
+    """
+
+    points, face_counts, face_verts, _, _ = grid_mesh(num_verts)
+
+    side = int(round(np.sqrt(len(points))))
+    size = max((side - 1 + tiles - 1) // tiles, 1)
+
+    # every corner gets a uv per tile it is in, so the tiles are cut apart in uv space
+    rows, columns = face_verts // side, face_verts % side
+    face_rows = np.repeat(np.arange(len(face_counts)) // (side - 1), 4)
+    face_columns = np.repeat(np.arange(len(face_counts)) % (side - 1), 4)
+    tile_rows, tile_columns = face_rows // size, face_columns // size
+
+    keys = np.stack([tile_rows, tile_columns, rows, columns], axis=1)
+    keys, uv_ids = np.unique(keys, axis=0, return_inverse=True)
+
+    local = (keys[:, 2:] - keys[:, :2] * size) / float(size) * 0.98 + 0.01
+    tile_ids = keys[:, 0] * tiles + keys[:, 1]
+
+    uvs = local[:, ::-1] + np.stack([tile_ids % 10, tile_ids // 10], axis=1)
+
+    return points, face_counts, face_verts, uvs, uv_ids.ravel()
+
+
+SHAPES = OrderedDict([("grid", grid_mesh), ("sphere", sphere_mesh), ("torus", torus_mesh), ("shells", shells_mesh)])
+
+
+def query_data(points, uvs, count=10000, seed=0):
+    """
+
+    Make the inputs for the query operations, built once per mesh outside of the timings
+
+    :param points: mesh points
+    :param uvs: mesh uvs
+    :param count: number of queries
+    :type count: int
+    :param seed: random seed
+    :type seed: int
+    :return: query points, ray origins, ray directions, query uvs
+    :rtype: dict
+    """
+
+    random = np.random.RandomState(seed)
+
+    low, high = points.min(axis=0), points.max(axis=0)
+    scale = np.maximum(high - low, 1e-3)
+
+    query_points = points[random.randint(len(points), size=count)] + random.normal(0.0, 0.01, (count, 3)) * scale
+    origins = low + random.uniform(0.0, 1.0, (count, 3)) * scale
+    directions = random.normal(0.0, 1.0, (count, 3))
+
+    return {"points": query_points,
+            "origins": origins,
+            "directions": directions / np.linalg.norm(directions, axis=1)[:, np.newaxis],
+            "uvs": uvs[random.randint(len(uvs), size=count)]}
+
+
+OPERATIONS = OrderedDict([
+    ("triangles", lambda mesh, data: mesh.triangles()),
+    ("normals", lambda mesh, data: mesh.normals()),
+    ("face_normals", lambda mesh, data: mesh.face_normals()),
+    ("tangents", lambda mesh, data: mesh.tangents()),
+    ("edges", lambda mesh, data: mesh.edge_vert_list()),
+    ("half_edges", lambda mesh, data: mesh.half_edges()),
+    ("adjacency", lambda mesh, data: mesh.vert_connectivity_matrix()),
+    ("face_adjacency", lambda mesh, data: mesh.face_connectivity_matrix()),
+    ("vert_pieces", lambda mesh, data: mesh.vert_pieces()),
+    ("uv_shells", lambda mesh, data: mesh.uv_shells()),
+    ("uv_triangulation", lambda mesh, data: mesh.uv_triangulation()),
+    ("closest_at_uvs", lambda mesh, data: mesh.closest_at_uvs(data["uvs"])),
+    ("closest_point", lambda mesh, data: mesh.point_on_mesh(data["points"])),
+    ("intersect_rays", lambda mesh, data: mesh.intersect_rays(data["origins"], data["directions"])),
+    ("march", lambda mesh, data: mesh.march_vert_array([0])),
+    ("cotangent_laplacian", lambda mesh, data: mesh.cotangent_laplacian()),
+    ("validate", lambda mesh, data: mesh.validate()),
+])
+
+
+def time_operation(build, operation, data, repeat=3, memory=True):
+    """
+
+    Time an operation on fresh meshes
+
+    :param build: function returning a new mesh
+    :param operation: function taking the mesh and the query data
+    :param data: query data
+    :type data: dict
+    :param repeat: number of timed runs
+    :type repeat: int
+    :param memory: also measure the peak memory in an extra run
+    :type memory: bool
+    :return: run times in seconds, peak memory in bytes or None
+    :rtype: list[float], int
+    """
+
+    times = []
+
+    for _ in range(repeat):
+        mesh = build()
+        gc.collect()
+
+        start = default_timer()
+        operation(mesh, data)
+        times.append(default_timer() - start)
+
+        del mesh
+
+    peak = None
+
+    if memory and tracemalloc is not None:
+        mesh = build()
+        gc.collect()
+
+        tracemalloc.start()
+        try:
+            operation(mesh, data)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return times, peak
+
+
+def git_commit():
+    """
+
+    Get the commit the library is at, so results can be matched to it
+
+    :return: commit hash, None outside of a git checkout
+    :rtype: str
+    """
+
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def check_uv_lookups(mesh, uvs):
+    """
+
+    Check every uv vertex of a mesh can be looked up, uvs on the border of a shell included
+
+    :param mesh: mesh to check
+    :type mesh: ArrayMesh
+    :param uvs: the mesh uvs
+    :type uvs: numpy.ndarray
+    :return: ids of the uvs that weren't found
+    :rtype: numpy.ndarray
+    """
+
+    return np.flatnonzero(~mesh.closest_at_uvs(uvs)["hit"])
+
+
+def run(sizes, shapes=None, operations=None, repeat=3, memory=True, check=True, log=True):
+    """
+
+    Run the benchmarks
+
+    :param sizes: rough vert counts of the meshes
+    :type sizes: list[int]
+    :param shapes: shape names from SHAPES, None runs all of them
+    :type shapes: list[str]
+    :param operations: operation names from OPERATIONS, None runs all of them
+    :type operations: list[str]
+    :param repeat: number of timed runs of each operation
+    :type repeat: int
+    :param memory: measure the peak memory of each operation
+    :type memory: bool
+    :param check: check every uv vertex of each mesh can be looked up before timing it
+    :type check: bool
+    :param log: print each result as it is measured
+    :type log: bool
+    :return: results, ready to be written as json
+    :rtype: dict
+    """
+
+    array_mesh = import_array_mesh()
+
+    results = []
+
+    for shape in shapes or list(SHAPES):
+        for size in sizes:
+            points, face_counts, face_verts, uvs, uv_ids = SHAPES[shape](size)
+            data = query_data(points, uvs)
+
+            def build():
+                return array_mesh(points, face_counts, face_verts, uvs=uvs, uv_ids=uv_ids)
+
+            if check:
+                missed = check_uv_lookups(build(), uvs)
+
+                if len(missed):
+                    raise RuntimeError("{0} of {1} uvs of the {2} {3} mesh weren't found, eg. {4}".format(
+                        len(missed), len(uvs), shape, size, uvs[missed[0]].tolist()))
+
+            for name in operations or list(OPERATIONS):
+                result = OrderedDict([("shape", shape), ("size", size), ("verts", len(points)),
+                                      ("faces", len(face_counts)), ("operation", name)])
+
+                try:
+                    times, peak = time_operation(build, OPERATIONS[name], data, repeat=repeat, memory=memory)
+                except Exception as e:  # keep going, a failure is a result too
+                    result["error"] = "{0}: {1}".format(type(e).__name__, e)
+                else:
+                    result["times"] = times
+                    result["best"] = min(times)
+                    result["median"] = float(np.median(times))
+                    result["peak_memory"] = peak
+
+                results.append(result)
+
+                if log:
+                    print(format_result(result))
+
+    return OrderedDict([("commit", git_commit()),
+                        ("date", time.strftime("%Y-%m-%dT%H:%M:%S")),
+                        ("python", platform.python_version()),
+                        ("numpy", np.__version__),
+                        ("scipy", scipy.__version__),
+                        ("platform", platform.platform()),
+                        ("processor", platform.processor()),
+                        ("results", results)])
+
+
+def format_result(result):
+    """
+
+    Get a result as one line of text
+
+    :param result: result from run
+    :type result: dict
+    :return: text
+    :rtype: str
+    """
+
+    label = "{0:<8} {1:>9} {2:<20}".format(result["shape"], result["verts"], result["operation"])
+
+    if "error" in result:
+        return "{0} failed {1}".format(label, result["error"])
+
+    memory = "" if result["peak_memory"] is None else "{0:>10.1f} MB".format(result["peak_memory"] / 1e6)
+
+    return "{0} {1:>10.4f} s{2}".format(label, result["best"], memory)
+
+
+def compare(baseline, results, threshold=0.1):
+    """
+
+    Compare two benchmark runs, operations are matched by shape, size and name
+
+    :param baseline: earlier results from run
+    :type baseline: dict
+    :param results: new results from run
+    :type results: dict
+    :param threshold: relative change in time to flag as slower or faster
+    :type threshold: float
+    :return: lines of text, one per operation in both runs
+    :rtype: list[str]
+    """
+
+    old = dict(((result["shape"], result["size"], result["operation"]), result) for result in baseline["results"])
+
+    lines = ["{0} -> {1}".format(baseline.get("commit"), results.get("commit"))]
+
+    for result in results["results"]:
+        previous = old.get((result["shape"], result["size"], result["operation"]))
+
+        if previous is None or "best" not in previous or "best" not in result:
+            continue
+
+        ratio = result["best"] / max(previous["best"], 1e-9)
+        flag = "slower" if ratio > 1.0 + threshold else "faster" if ratio < 1.0 - threshold else ""
+
+        lines.append("{0:<8} {1:>9} {2:<20} {3:>10.4f} s {4:>10.4f} s {5:>6.2f}x {6}".format(
+            result["shape"], result["verts"], result["operation"], previous["best"], result["best"], ratio, flag))
+
+    return lines
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Benchmark the mesh library on synthetic meshes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000, 5000000],
+                        help="rough vert counts of the meshes")
+    parser.add_argument("--shapes", nargs="+", choices=list(SHAPES), help="shapes to run, defaults to all")
+    parser.add_argument("--operations", nargs="+", choices=list(OPERATIONS),
+                        help="operations to run, defaults to all")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs of each operation")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory runs")
+    parser.add_argument("--no-check", action="store_true", help="skip checking the uv lookups of each mesh")
+    parser.add_argument("--output", default="mesh_benchmark.json", help="json file to write the results to")
+    parser.add_argument("--compare", help="json results of an earlier run to compare with")
+
+    args = parser.parse_args(args)
+
+    results = run(args.sizes, shapes=args.shapes, operations=args.operations, repeat=args.repeat,
+                  memory=not args.no_memory, check=not args.no_check)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        print("\n".join(compare(baseline, results)))
+
+
+if __name__ == "__main__":
+    main()
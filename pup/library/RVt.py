@@ -1,44 +1,15 @@
-def rivit(refPoint, mesh, orient=True, name = "myRvt"):
-
-    if refPoint and mesh:
-        loc = pm.spaceLocator()
-        pm.delete(pm.parentConstraint(refPoint, loc))
-
-        CPOM = pm.createNode("closestPointOnMesh", name="delete_CPM")
-        pm.connectAttr(mesh + ".outMesh", CPOM.inMesh)
-        pm.connectAttr(loc.getShape() + ".parentInverseMatrix[0]", CPOM.inputMatrix)
-
-        faceNumber = pm.getAttr(CPOM + ".closestFaceIndex")
-
-        pm.select(mesh+".f[%s]" % faceNumber)
+import apiMesh
 
-        mel.eval("ConvertSelectionToEdges;selectType -ocm -alc false;selectType -ocm -polymeshEdge true;")
 
+def rivit(refPoint, mesh, orient=True, name = "myRvt"):
 
-        edges = pm.ls(selection=True)
-        print edges
-        if len(edges) == 1:
-            e1 = int((edges[0].split("[")[1]).split(":")[0])
-            e2 = int(((edges[0].split("[")[1]).split(":")[1])[:-1])
-
-        elif len(edges) > 1:
-            temp_edge = []
-            for edge in edges:
-                if ":" in str(edge):
-                    temp_edge.append(int(((edge.split("[")[1]).split(":")[1])[:-1]))
-                    print "double " + (((edge.split("[")[1]).split(":")[1])[:-1])
-                else:
-                    temp_edge.append(int((edge.split("[")[1])[:-1]))
-                    print "double " + ((edge.split("[")[1])[:-1])
-
-            e1 = temp_edge[0]
-            e2 = temp_edge[-1]
-
-        else:
-            print "no edges"
+    if refPoint and mesh:
+        mesh_data = apiMesh.Mesh(str(mesh))
+        position = pm.xform(refPoint, q=True, ws=True, rp=True)
 
-        print e1, e2
-        pm.delete(CPOM, loc)
+        # two edges facing each other across the closest face, straight from the mesh arrays rather than
+        # converting a face selection to edges and parsing the names
+        e1, e2 = [int(edge) for edge in mesh_data.rivet_edges([position], space=apiMesh.WORLD_SPACE)[0]]
     else:
 
         edges = pm.selected()
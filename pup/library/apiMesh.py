@@ -1,86 +1,48 @@
 import maya.api.OpenMaya as OpenMaya
 import numpy as np
 import maya.cmds as cmds
-import re
 
-from scipy.sparse import csc_matrix, csr_matrix
-from scipy.spatial import Delaunay
+from collections import OrderedDict
+
+from .arrayMesh import ArrayMesh
+from .meshPool import MeshPool
 
 WORLD_SPACE = OpenMaya.MSpace.kWorld
 OBJECT_SPACE = OpenMaya.MSpace.kObject
 
 
-class Mesh(OpenMaya.MFnMesh):
+class Mesh(ArrayMesh, OpenMaya.MFnMesh):
+
+    object_space = OBJECT_SPACE
+    world_space = WORLD_SPACE
 
-    def __init__(self, obj, extend_to_shape=True):
+    def __init__(self, obj, extend_to_shape=True, compact=False, cache_dir=None):
         """
 
-        Mesh utils class
+        Mesh utils class, the maya side of ArrayMesh. The mesh arrays are pulled from maya in bulk the first time
+        they are needed
 
         :param obj: maya object to get mesh data for
         :type obj: str or OpenMaya.MDagPath or OpenMaya.MFnMesh
+        :param compact: store the per triangle arrays as float32, see ArrayMesh
+        :type compact: bool
+        :param cache_dir: folder to keep topology data in between sessions, eg. folder_rigging_meshCache
+        :type cache_dir: str
         """
         if isinstance(obj, str):
             self._obj = obj
 
             self.dag = self.dag(extend_to_shape=extend_to_shape)
 
-            super(Mesh, self).__init__(self.dag)
+            OpenMaya.MFnMesh.__init__(self, self.dag)
         else:
-            super(Mesh, self).__init__(obj)
-
-        # cached version of tri data
-        self._tris = None
-        self._triangle_verts = None
-        self._tri_edge_matrix = None
-        self._tri_edge_vectors = None
-        self._num_triangles = None
-        self._tri_normals = None
-        self._tri_edge_normals = None
-        self._tri_points = None
-        self._tri_centers = None
-
-        # other cached data
-        self._edge_vert_list = None
-        self._edge_con_matrix = None
-        self._vert_con_matrix = None
-        self._vert_uv_list = None
-
-        # delaunay trianglulation of UVs
-        self._uv_dl_tri = None
-
-        self._points = None
-        self._normals = None
-
-        self._poly_it = OpenMaya.MItMeshPolygon(self.dag)
-        self._edge_it = OpenMaya.MItMeshEdge(self.dag)
-        self._vert_it = OpenMaya.MItMeshVertex(self.dag)
+            OpenMaya.MFnMesh.__init__(self, obj)
 
-    def clear_cache(self):
-        """
-
-        Clear the currently cached data
-
-        """
+            self.dag = self.getPath()
 
-        # cached version of tri data
-        self._tris = None
-        self._triangle_verts = None
-        self._tri_edge_matrix = None
-        self._tri_edge_vectors = None
-        self._num_triangles = None
-        self._tri_normals = None
-        self._tri_edge_normals = None
-        self._tri_points = None
-        self._tri_centers = None
+        ArrayMesh.__init__(self, compact=compact, cache_dir=cache_dir)
 
-        # other cached data
-        self._edge_vert_list = None
-        self._edge_con_matrix = None
-        self._vert_con_matrix = None
-
-        self._points = None
-        self._normals = None
+        self._edge_it = OpenMaya.MItMeshEdge(self.dag)
 
     def dag(self, extend_to_shape=False):
         """
@@ -117,614 +79,670 @@ class Mesh(OpenMaya.MFnMesh):
 
         return OpenMaya.MFnMesh(self.dag)
 
-    def set_points(self, points):
-        """
-
-        Assign the given points to the given mesh
-
-        :param points: points to be assigned
-        :type points: np.array
-
-        """
-
-        self.setPoints(OpenMaya.MPointArray(points.tolist()), OpenMaya.MSpace.kWorld)
-
-    def points(self, space=OBJECT_SPACE):
+    def _fetch_points(self, space=None):
         """
 
-        Get the current points of the mesh, defaults to local space to figure out mesh orientation
+        Get the points from maya, defaults to local space to figure out mesh orientation
 
-        :param space: get world space positions
         :param space: OpenMaya.MSpace
-        :return: list of points
+        :return: points
         :rtype: numpy.ndarray
         """
 
-        self._points = np.delete(np.array(self.getPoints(space)), 3, axis=1)
-        return self._points
+        if space is None:
+            space = OBJECT_SPACE
 
-    def normals(self, angle_weighted=True, space=OBJECT_SPACE):
+        return np.delete(np.array(self.getPoints(space)), 3, axis=1)
+
+    def _fetch_polygons(self):
         """
 
-        Get the vertex normals
+        Get the face counts and face vertex ids from maya
 
-        :param angle_weighted: use angle weighted
-        :type angle_weighted: bool
-        :param space: OpenMaya.MSpace
-        :return: vertex normals
-        :rtype: numpy.ndarray
+        :return: verts per face, vert ids
+        :rtype: numpy.ndarray, numpy.ndarray
         """
 
-        self._normals = np.array(self.getVertexNormals(angle_weighted, space=space))
+        face_counts, face_verts = self.getVertices()
 
-        return self._normals
+        return np.array(face_counts, dtype=np.int64), np.array(face_verts, dtype=np.int64)
 
-    def bounding_box(self):
+    def _fetch_triangles(self):
         """
 
-        Get the bounding box as an numpy array
+        Get maya's triangulation of the mesh
 
-        :return: bounding box
-        :rtype: numpy.ndarray
+        :return: number of triangles per face, triangle vert ids
+        :rtype: numpy.ndarray, numpy.ndarray
         """
 
-        try:
-            _m_bounding_box = self.boundingBox
-
-            return np.array(list(_m_bounding_box.min) + list(_m_bounding_box.max))
+        n_counts, tris_ = self.getTriangles()
 
-        except RuntimeError:  # if a dag object is not passed we can't use boundingbox
+        return np.array(n_counts, dtype=np.int64), np.array(tris_, dtype=np.int64)
 
-            col_max = np.amax(self._points, axis=0)
-            col_min = np.amin(self._points, axis=0)
+    def _resolve_uv_set(self, uv_set=None):
+        """
 
-            return np.array(col_min.tolist() + [0] + col_max.tolist() + [0])
+        Get the name of the uv set to use, None gives the current set
 
-    # should be memoised really
-    def get_vert_uvs(self, uv_set=None):
+        :param uv_set: uv set name
+        :return: uv set name
+        :rtype: str
         """
 
-        Get the shared UVs for each vert on this mesh
+        return uv_set or self.currentUVSetName()
 
-        :rtype: list[tuple(float, float)]
+    def _fetch_uvs(self, uv_set=None):
         """
 
-        if self._vert_uv_list is None:
-            self._vert_it.reset()
-
-            self._vert_uv_list = []
+        Get the uvs and the uv id of each face vertex from maya in one go
 
-            while not self._vert_it.isDone():
-                u, v = self._vert_it.getUV(uvSet=uv_set)
+        :param uv_set: uv set to get
+        :return: uvs, uv id per face vertex
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
 
-                self._vert_uv_list.append((u, v))
+        uv_set = self._resolve_uv_set(uv_set)
 
-                self._vert_it.next()
+        us, vs = self.getUVs(uv_set)
+        uv_counts, uv_ids = self.getAssignedUVs(uv_set)
 
-        return self._vert_uv_list
+        face_counts, face_verts = self.polygons()
 
-    def min_u(self, uv_set=None):
-        """
+        # uv ids are only listed for mapped faces
+        face_vert_uvs = np.full(len(face_verts), -1, dtype=np.int64)
+        face_vert_uvs[np.repeat(np.array(uv_counts) > 0, face_counts)] = np.array(uv_ids, dtype=np.int64)
 
-        Get the min U from the uv set
+        return np.stack([np.array(us), np.array(vs)], axis=1), face_vert_uvs
 
-        :param uv_set: set to test
-        :return: min u
-        :rtype: float
+    def _fetch_edges(self):
         """
 
-        uvs = self.get_vert_uvs(uv_set=uv_set)
+        Get the vert ids of each edge in maya's edge order, so edge ids can be handed back to maya
 
-        return np.amin(np.array(uvs), axis=0)[0]
-
-    def max_u(self, uv_set=None):
+        :return: vert ids for each edge
+        :rtype: numpy.ndarray
         """
 
-        Get the max U from the uv set
+        edge_verts = []
 
-        :param uv_set: set to test
-        :return: min u
-        :rtype: float
-        """
+        self._edge_it.reset()
 
-        uvs = self.get_vert_uvs(uv_set=uv_set)
+        while not self._edge_it.isDone():
+            edge_verts.append([self._edge_it.vertexId(0), self._edge_it.vertexId(1)])
 
-        return np.amax(np.array(uvs), axis=0)[0]
+            self._edge_it.next()
 
-    def min_v(self, uv_set=None):
-        """
-
-        Get the min V from the uv set
+        return np.array(edge_verts)
 
-        :param uv_set: set to test
-        :return: min u
-        :rtype: float
+    def _edge_source(self):
         """
 
-        uvs = self.get_vert_uvs(uv_set=uv_set)
-
-        return np.amin(np.array(uvs), axis=0)[1]
+        Get a name for where the edge order comes from, see ArrayMesh._edge_source
 
-    def max_v(self, uv_set=None):
+        :return: maya
+        :rtype: str
         """
 
-        Get the max V from the uv set
+        return "maya"
 
-        :param uv_set: set to test
-        :return: min u
-        :rtype: float
+    def _triangle_source(self):
         """
 
-        uvs = self.get_vert_uvs(uv_set=uv_set)
+        Get a name for where the triangulation comes from, see ArrayMesh._triangle_source
 
-        return np.amax(np.array(uvs), axis=0)[1]
-
-    def uv_triangulation(self, uv_set=None):
+        :return: maya
+        :rtype: str
         """
 
-        get the delaunay triangulation for the given uv_set
+        return "maya"
 
-        :param uv_set: uv set to triangulate
-        :return: Delaunay triangulation
-        :rtype: Delaunay
+    def set_points(self, points):
         """
 
-        if self._uv_dl_tri is None:
-            uvs = self.get_vert_uvs(uv_set=uv_set)
-
-            self._uv_dl_tri = Delaunay(uvs, qhull_options="QJ")
+        Assign the given points to the given mesh, caches built from the old points are cleared
 
-        return self._uv_dl_tri
+        :param points: points to be assigned
+        :type points: np.array
 
-    def get_closest_at_uv(self, u, v, uv_set=None):
         """
 
-        Get closest data at UV,
+        self.setPoints(OpenMaya.MPointArray(points.tolist()), OpenMaya.MSpace.kWorld)
+
+        self.points()
 
-        :param u: u co-ord
-        :param v: v co-ord
-        :param uv_set: uv set to check
-        :return: point, tris, barycentric coords
-        :rtype: dict
+    def normals(self, angle_weighted=True, space=OBJECT_SPACE):
         """
 
-        # get the current uv triangulation
+        Get the vertex normals from maya, so hard edges and locked normals are kept
 
-        tri = self.uv_triangulation(uv_set=uv_set)
+        :param angle_weighted: use angle weighted
+        :type angle_weighted: bool
+        :param space: OpenMaya.MSpace
+        :return: vertex normals
+        :rtype: numpy.ndarray
+        """
 
-        # find the tri that the uv is in
-        simplex = tri.find_simplex((u, v))
+        self._normals = np.array(self.getVertexNormals(angle_weighted, space=space))
 
-        if simplex > -1:
-            containing_verts = tri.simplices[simplex]
+        return self._normals
 
-            # get the bary co-ords
-            b = tri.transform[simplex, :2].dot(np.transpose([(u, v)] - tri.transform[simplex, 2]))
-            barry_coord = np.c_[np.transpose(b), 1 - b.sum(axis=0)]
+    def bounding_box(self):
+        """
 
-            # get the latest points
-            points = self.points(space=OpenMaya.MSpace.kWorld)
+        Get the bounding box as an numpy array
 
-            v_a = points[containing_verts[0]] * barry_coord[0][0]
-            v_b = points[containing_verts[1]] * barry_coord[0][1]
-            v_c = points[containing_verts[2]] * barry_coord[0][2]
+        :return: bounding box
+        :rtype: numpy.ndarray
+        """
 
-            out_point = v_a + v_b + v_c
+        try:
+            _m_bounding_box = self.boundingBox
 
-            return {"point": out_point, "tri_ids": containing_verts, "bary": barry_coord[0]}
+            return np.array(list(_m_bounding_box.min) + list(_m_bounding_box.max))
 
-        return None
+        except RuntimeError:  # if a dag object is not passed we can't use boundingbox
+            return super(Mesh, self).bounding_box()
 
-    def get_uv_udim(self, uv_set=None):
+    @property
+    def num_edges(self):
         """
 
-        Get the uv udim for the current set
+        get the number of edges
 
-        :param uv_set: uv set to test
-        :return: u_udim, v_udim
+        :return: number of edges
+        :rtype: int
         """
 
-        uvs = np.array(self.get_vert_uvs(uv_set=uv_set))
-
-        min_ = np.amin(uvs, axis=0)
-        max_ = np.amax(uvs, axis=0)
-
-        if int(min_[0]) == int(max_[0]) and int(max_[1]) == int(max_[1]):
-            return int(min_[0]), int(min_[1])
-
-        else:
-            return None
+        return self.numEdges
 
-    def point_on_mesh(self, points, uv_set=None):
+    @property
+    def num_verts(self):
         """
 
-        Get all the information about the point on mesh closest to the given point
+        get the number of edges
 
-        :param points: points to test
-        :param uv_set: map to use
-        :return: closest data
-        :rtype: list[(OpenMaya.MPointOnMesh, float, float)]
+        :return: number of edges
+        :rtype: int
         """
 
-        m_intersect = OpenMaya.MMeshIntersector()
-        m_intersect.create(self.object())
+        return self.numVertices
 
-        if not isinstance(points, list):
-            points = [points]
+    @property
+    def num_faces(self):
+        """
 
-        out_data = []
+        get the number of faces
 
-        for point in points:
-            pos = OpenMaya.MPoint(point)
-            point_info = m_intersect.getClosestPoint(pos)
+        :return: number of faces
+        :rtype: int
+        """
 
-            b_u, b_v = point_info.barycentricCoords
-            b_w = 1.0 - (b_u + b_v)
+        return self.numPolygons
 
-            self._poly_it.setIndex(point_info.face)
+    def select_components(self, component, ids, **kwargs):
+        """
 
-            _, tri_verts = self._poly_it.getTriangle(point_info.triangle)
+        Select components of the given type, and pass kwargs to cmds.select. The ids are collapsed into runs so
+        the cost scales with the number of runs rather than the number of components
 
-            final_u = 0
-            final_v = 0
+        :param component: component type, eg. vtx, f or e
+        :type component: str
+        :param ids: ids to select
+        :param kwargs: kwargs to pass to cmds.select
 
-            for vert, bary in zip(tri_verts, [b_u, b_v, b_w]):
-                self._vert_it.setIndex(vert)
+        """
 
-                u_vals, v_vals, _ = self._vert_it.getUVs(uv_set=uv_set)
+        cmds.select(component_strings(self.fullPathName(), component, ids), **kwargs)
 
-                final_u += u_vals[0] * bary
-                final_v += v_vals[0] * bary
+    def select_verts(self, vert_ids, **kwargs):
+        """
 
-            out_data.append((point_info, final_u, final_v))
+        Select the given verts, and pass kwargs to cmds.select
 
-        return out_data
+        :param vert_ids: ids to select
+        :param kwargs: kwargs to pass to cmds.select
 
-    def triangles(self):
         """
 
-        Get the triangles for this mesh
+        self.select_components("vtx", vert_ids, **kwargs)
 
-        :return: number of triangles per face, triangle ids
-        :rtype: list[int], list[int]
+    def select_faces(self, face_ids, **kwargs):
         """
 
-        n_counts, tris_ = self.getTriangles()
+        Select the given faces, and pass kwargs to cmds.select
 
-        self._tris = tris_
+        :param face_ids: ids to select
+        :param kwargs: kwargs to pass to cmds.select
 
-        self._num_triangles = sum(n_counts)
+        """
 
-        return n_counts, tris_
+        self.select_components("f", face_ids, **kwargs)
 
-    def triangle_verts(self):
+    def select_edges(self, edge_ids, **kwargs):
         """
 
-        Get the triangles arranged as a n_tris x 3 matrix
+        Select the given edges, and pass kwargs to cmds.select
 
-        :return: triangle verts
+        :param edge_ids: ids to select
+        :param kwargs: kwargs to pass to cmds.select
 
         """
 
-        if self._triangle_verts is None:
-            # make sure we have the tris data
-            if self._tris is None:
-                self.triangles()
+        self.select_components("e", edge_ids, **kwargs)
 
-            self._triangle_verts = np.array(self._tris).reshape(-1, 3)
 
-        return self._triangle_verts
+class MeshCollection(object):
 
-    def triangle_points(self):
+    def __init__(self, meshes, uv_set=None, space=None, processes=None, cache_dir=None, share_edges=False):
         """
 
-        Get the points of each triangle, as described by the points from get_points
+        Run mesh computations over many maya meshes at once. The arrays of every mesh are pulled from maya in one
+        pass on the main thread, the computations run on ArrayMesh copies in a pool of worker processes and the
+        results are gathered back here, so nothing touches maya off the main thread.
 
-        :return: triangle point list
-        :type: numpy.ndarray
+        eg. with MeshCollection(cmds.ls(type="mesh")) as collection:
+                normals = collection.map("normals")
+
+        :param meshes: maya meshes
+        :type meshes: list[str] or list[Mesh]
+        :param uv_set: uv set to share, None shares the current set of each mesh
+        :type uv_set: str
+        :param space: space to get the points in
+        :param processes: number of worker processes, None uses one per cpu, 0 or 1 runs everything in maya
+        :type processes: int
+        :param cache_dir: folder to keep topology data in between sessions, eg. folder_rigging_meshCache
+        :type cache_dir: str
+        :param share_edges: share maya's edge order so edge ids in the results are maya's, this walks every edge
+        :type share_edges: bool
         """
 
-        if self._tri_points is None:
-            if self._points is None:
-                raise RuntimeError("Please run .points() first")
+        self.meshes = [mesh if isinstance(mesh, Mesh) else Mesh(mesh) for mesh in meshes]
+        self.names = [mesh.fullPathName() for mesh in self.meshes]
+
+        self.uv_set = uv_set
+        self.space = space
+        self.share_edges = share_edges
+
+        self.pool = MeshPool(processes=processes, cache_dir=cache_dir)
 
-            if self._tris is None:
-                self.triangles()
+        self._opened = False
 
-            self._tri_points = self._points[self._tris]
+    def __enter__(self):
+        self.open()
+        return self
 
-        return self._tri_points
+    def __exit__(self, *args):
+        self.close()
 
-    def triangle_centers(self):
+    def open(self):
         """
 
-        Get the center point of each triangle
+        Share the arrays of every mesh with the worker processes, they stay shared until close is called
 
-        :return: triangle centers
-        :rtype: numpy.ndarray
         """
 
-        if self._tri_centers is None:
-            self.triangle_points()
+        if self._opened:
+            return
 
-            self._tri_centers = np.mean(self._tri_points.reshape(-1, 3, 3), axis=1)
+        for itr, mesh in enumerate(self.meshes):
+            self.pool.add_mesh(str(itr), mesh, uv_set=self.uv_set, space=self.space, share_edges=self.share_edges)
 
-        return self._tri_centers
+        self._opened = True
 
-    def triangle_edge_vectors(self, mode=0):
+    def close(self):
         """
 
-        Get the triangle edge vectors
+        Stop the worker processes and free the shared arrays
 
-        :return: edge vectors for each triangle
-        :rtype: numpy.ndarray
         """
 
-        if self._tri_points is None:
-            self.triangle_points()
+        self.pool.close()
+        self._opened = False
 
-        self._tri_edge_vectors = self._tri_points - self._tri_points.reshape(-1, 3, 3)[:, [1, 2, 0]].reshape(-1, 3)
+    def run(self, tasks):
+        """
 
-        return self._tri_edge_vectors
+        Run tasks on every mesh. When the collection isn't open it is opened for the call and closed after
 
-    def triangle_edge_lengths(self):
+        :param tasks: ArrayMesh method names, functions taking the mesh as the first argument or
+                      (task, args, kwargs) tuples, see MeshPool.run
+        :type tasks: list
+        :return: results by mesh name, one result per task
+        :rtype: collections.OrderedDict
         """
 
-        Get the triangle edge lengths
+        opened = self._opened
 
-        :return: triangle edge lengths
-        :rtype: numpy.ndarray
-        """
+        self.open()
 
-        if self._tri_edge_vectors is None:
-            self.triangle_edge_vectors()
+        try:
+            results = self.pool.run(tasks)
+        finally:
+            if not opened:
+                self.close()
 
-        return np.linalg.norm(self._tri_edge_vectors, axis=1)
+        return OrderedDict((name, results[str(itr)]) for itr, name in enumerate(self.names))
 
-    def triangle_normals(self):
+    def map(self, task, *args, **kwargs):
         """
 
-        Get the triangle normals
+        Run a single task on every mesh
 
-        :return: triangle normals
-        :rtype: numpy.ndarray
+        :param task: ArrayMesh method name or function taking the mesh as the first argument
+        :type task: str or function
+        :param args: args to pass to the task
+        :param kwargs: kwargs to pass to the task
+        :return: result by mesh name
+        :rtype: collections.OrderedDict
         """
 
-        if self._tri_normals is None:
+        return OrderedDict((name, results[0]) for name, results in self.run([(task, args, kwargs)]).items())
 
-            if self._tri_edge_vectors is None:
-                self.triangle_edge_vectors()
 
-            self._tri_normals = np.cross(self._tri_edge_vectors[::3], self._tri_edge_vectors[1::3])
-            self._tri_normals /= np.apply_along_axis(np.linalg.norm, 1, self._tri_normals)[:, np.newaxis]
+def create_mesh(array_mesh, name, parent=None, uv_set=None):
+    """
 
-            return self._tri_normals
+    Create a maya mesh from an ArrayMesh, with its uvs when it has them
+
+    :param array_mesh: mesh to build
+    :type array_mesh: ArrayMesh
+    :param name: name of the new transform
+    :type name: str
+    :param parent: transform to put the mesh under, None leaves it in the world
+    :type parent: str
+    :param uv_set: uv set of the array mesh to assign to the default map
+    :return: new transform
+    :rtype: str
+    """
 
-        else:
-            return self._tri_normals
+    face_counts, face_verts = array_mesh.polygons()
+    points = array_mesh.points()
 
-    def triangle_edge_normals(self):
-        """
+    mesh_fn = OpenMaya.MFnMesh()
+    transform = mesh_fn.create(OpenMaya.MPointArray(points.tolist()), face_counts.tolist(), face_verts.tolist())
 
-        Get the normal described by the triangle edges and the triangle normal
+    try:
+        uvs, uv_ids = array_mesh.uv_data(uv_set=uv_set)
+    except RuntimeError:  # no uvs to carry over
+        uvs = None
 
-        :return: triangle edge normals
-        :rtype: numpy.ndarray
-        """
+    if uvs is not None:
+        face_ids = np.repeat(np.arange(len(face_counts)), face_counts)
 
-        if self._tri_edge_normals is None:
-            edge_normals = np.cross(self.triangle_normals().repeat(3, axis=0), self.triangle_edge_vectors())
-            self._tri_edge_normals = edge_normals / np.apply_along_axis(np.linalg.norm, 1, edge_normals)[:, np.newaxis]
+        # maya takes uvs for whole faces only, partly mapped faces are left unmapped
+        mapped = np.bincount(face_ids, uv_ids >= 0, minlength=len(face_counts)) == face_counts
 
-        return self._tri_edge_normals
+        mesh_fn.setUVs(uvs[:, 0].tolist(), uvs[:, 1].tolist())
+        mesh_fn.assignUVs(np.where(mapped, face_counts, 0).tolist(), uv_ids[mapped[face_ids]].tolist())
 
-    def get_neighbour_verts(self, vert_ids):
-        """
-
-        Get the neighbour verts of verts
-
-        :param vert_ids: verts to start with
-        :type vert_ids: list[int]
-        :return: list of neighbour ids
-        :rtype: list[int]
-        """
+    dag_fn = OpenMaya.MFnDagNode(transform)
+    dag_fn.setName(name)
 
-        neighbour_vids = []
+    # new meshes have no shading group, hook them up to the default one so they draw
+    cmds.sets(dag_fn.fullPathName(), edit=True, forceElement="initialShadingGroup")
 
-        for vert in vert_ids:
-            self._vert_it.setIndex(vert)
+    if parent:
+        cmds.parent(dag_fn.fullPathName(), parent)
 
-            neighbour_vids.extend(self._vert_it.getConnectedVertices() or [])
+    return dag_fn.fullPathName()
 
-        return list(set(neighbour_vids) - set(vert_ids))
 
-    def edge_vert_list(self):
-        """
+def id_ranges(ids):
+    """
 
-        Get a list of the vert ids for each edge
+    Collapse ids into runs of consecutive ids
 
-        :return: numpy.ndarray
-        """
+    :param ids: component ids in any order, duplicates are dropped
+    :return: first and last id of each run
+    :rtype: numpy.ndarray, numpy.ndarray
+    """
 
-        if self._edge_vert_list is None:
+    ids = np.unique(np.asarray(ids, dtype=np.int64))
 
-            edge_verts = []
+    if not len(ids):
+        return ids, ids
 
-            while not self._edge_it.isDone():
-                edge_verts.append([self._edge_it.vertexId(0), self._edge_it.vertexId(1)])
+    breaks = np.flatnonzero(np.diff(ids) != 1)
 
-                self._edge_it.next()
+    return ids[np.r_[0, breaks + 1]], ids[np.r_[breaks, len(ids) - 1]]
 
-            self._edge_vert_list = np.array(edge_verts)
 
-        return self._edge_vert_list
+def component_strings(node, component, ids):
+    """
 
-    def edge_connectivity_matrix(self):
-        """
+    Get compressed component names for the given ids, one per run of consecutive ids eg. mesh.vtx[0:9999]
 
-        Get the edge vert connectivity matrix for this mesh
+    :param node: node name
+    :type node: str
+    :param component: component type, eg. vtx, f or e
+    :type component: str
+    :param ids: component ids
+    :return: component names
+    :rtype: list[str]
+    """
 
-        :return: numpy.matrix
-        """
+    starts, ends = id_ranges(ids)
 
-        if self._edge_con_matrix is None:
-            edge_vert_list = self.edge_vert_list()
+    return ["{0}.{1}[{2}]".format(node, component, start) if start == end else
+            "{0}.{1}[{2}:{3}]".format(node, component, start, end) for start, end in zip(starts, ends)]
 
-            row = edge_vert_list.flatten()
-            col = np.flipud(row)
-            data = [1] * self.num_edges + [-1] * self.num_edges
 
-            self._edge_con_matrix = csc_matrix((data, (row, col)), shape=(self.num_edges, self.num_edges))
+# component attribute names for the api component types
+COMPONENT_NAMES = {OpenMaya.MFn.kMeshVertComponent: "vtx",
+                   OpenMaya.MFn.kMeshEdgeComponent: "e",
+                   OpenMaya.MFn.kMeshPolygonComponent: "f",
+                   OpenMaya.MFn.kMeshVtxFaceComponent: "vtxFace",
+                   OpenMaya.MFn.kMeshMapComponent: "map",
+                   OpenMaya.MFn.kCurveCVComponent: "cv",
+                   OpenMaya.MFn.kSurfaceCVComponent: "cv",
+                   OpenMaya.MFn.kLatticeComponent: "pt"}
 
-            return self._edge_con_matrix
-        else:
-            return self._edge_con_matrix
 
-    def vert_connectivity_matrix(self):
-        """
+def selected_component_ids(selection=None):
+    """
 
-        get the vert connectivity matrix
+    Get the component ids in a selection list straight from the api components, without flattening the
+    selection to one string per component
 
-        :return: numpy.matrix
-        """
+    :param selection: selection to read, None reads the active selection
+    :type selection: OpenMaya.MSelectionList
+    :return: ids by (full dag path, component type) in selection order, n ids for single indexed components
+             and n x 2 or n x 3 ids for double and triple indexed ones
+    :rtype: collections.OrderedDict
+    """
 
-        row = []
-        col = []
-        data = []
+    if selection is None:
+        selection = OpenMaya.MGlobal.getActiveSelectionList()
 
-        if self._vert_con_matrix is None:
-            while not self._vert_it.isDone():
+    component_ids = OrderedDict()
 
-                for vid in self._vert_it.getConnectedVertices():
-                    row.append(self._vert_it.index())
-                    col.append(vid)
-                    data.append(1)
+    for itr in range(selection.length()):
+        try:
+            dag, component = selection.getComponent(itr)
+        except (TypeError, RuntimeError):  # dependency nodes have no dag path or components
+            continue
+
+        if component.isNull():
+            continue
+
+        if component.hasFn(OpenMaya.MFn.kSingleIndexedComponent):
+            ids = np.array(OpenMaya.MFnSingleIndexedComponent(component).getElements(), dtype=np.int64)
+        elif component.hasFn(OpenMaya.MFn.kDoubleIndexedComponent):
+            ids = np.array(OpenMaya.MFnDoubleIndexedComponent(component).getElements(), dtype=np.int64).reshape(-1, 2)
+        elif component.hasFn(OpenMaya.MFn.kTripleIndexedComponent):
+            ids = np.array(OpenMaya.MFnTripleIndexedComponent(component).getElements(), dtype=np.int64).reshape(-1, 3)
+        else:
+            continue
 
-                self._vert_it.next()
+        key = (dag.fullPathName(), COMPONENT_NAMES.get(component.apiType(), component.apiTypeStr))
 
-            self._vert_con_matrix = csc_matrix((data, (row, col)), shape=(self.num_verts, self.num_verts))
+        if key in component_ids:
+            component_ids[key] = np.concatenate([component_ids[key], ids])
+        else:
+            component_ids[key] = ids
 
-        return self._vert_con_matrix
+    return component_ids
 
-    @property
-    def num_edges(self):
-        """
 
-        get the number of edges
+def ids_from_selection():
+    """
 
-        :return: number of edges
-        :rtype: int
-        """
+    Get the ids of the current selection, for the first selected object and component type
 
-        return self.numEdges
+    :return: component type, ids
+    :rtype: str, numpy.ndarray
+    """
 
-    @property
-    def num_verts(self):
-        """
+    component_ids = selected_component_ids()
 
-        get the number of edges
+    if not component_ids:
+        return None, np.zeros(0, dtype=np.int64)
 
-        :return: number of edges
-        :rtype: int
-        """
+    (_, comp_type), ids = next(iter(component_ids.items()))
 
-        return self.numVertices
+    return comp_type, ids
 
-    @property
-    def num_triangles(self):
-        """
 
-        Get the number of triangles
+def publish_meshes(objects):
+    """
 
-        :return: number of triangles
-        :rtype: int
-        """
+    Get every mesh shape under the given objects, intermediate shapes are skipped
 
-        if not self._num_triangles:
-            self.triangles()
+    :param objects: transforms or shapes
+    :type objects: list[str]
+    :return: full paths of the mesh shapes
+    :rtype: list[str]
+    """
 
-        return self._num_triangles
+    if not objects:
+        return []
 
-    def select_verts(self, vert_ids, **kwargs):
-        """
+    meshes = cmds.ls(objects, type="mesh", long=True, noIntermediate=True) or []
+    meshes += cmds.listRelatives(objects, allDescendents=True, type="mesh", fullPath=True, noIntermediate=True) or []
 
-        Select the given verts, and pass kwargs to cmds.select
+    return list(OrderedDict.fromkeys(meshes))
 
-        :param vert_ids: ids to select
-        :param kwargs: kwargs to pass to cmds.select
 
-        """
+def host_edge_ids(mesh, edge_verts):
+    """
 
-        comps = ["{}.vtx[{}]".format(self.fullPathName(), vid) for vid in vert_ids]
+    Get maya's ids for edges given by their vert ids
 
-        cmds.select(comps, **kwargs)
+    :param mesh: maya mesh
+    :type mesh: Mesh
+    :param edge_verts: n x 2 vert ids
+    :return: maya edge ids
+    :rtype: numpy.ndarray
+    """
 
-    def select_faces(self, face_ids, **kwargs):
-        """
+    edge_verts = np.sort(np.asarray(edge_verts, dtype=np.int64).reshape(-1, 2), axis=1)
+    host_edges = np.sort(np.asarray(mesh.edge_vert_list(), dtype=np.int64).reshape(-1, 2), axis=1)
 
-        Select the given faces, and pass kwargs to cmds.select
+    host_keys = host_edges[:, 0] * mesh.num_verts + host_edges[:, 1]
+    order = np.argsort(host_keys)
 
-        :param face_ids: ids to select
-        :param kwargs: kwargs to pass to cmds.select
+    return order[np.searchsorted(host_keys[order], edge_verts[:, 0] * mesh.num_verts + edge_verts[:, 1])]
 
-        """
 
-        comps = ["{}.f[{}]".format(self.fullPathName(), fid) for fid in face_ids]
+def validate_meshes(meshes, checks=None, processes=None, cache_dir=None, **kwargs):
+    """
 
-        cmds.select(comps, **kwargs)
+    Run the ArrayMesh.validate checks on many meshes, spread over worker processes by a MeshCollection
+
+    :param meshes: maya meshes
+    :type meshes: list[str]
+    :param checks: names of the checks to run, None runs all of them, see ArrayMesh.validation_checks
+    :type checks: list[str]
+    :param processes: number of worker processes, None uses one per cpu, 0 or 1 runs everything in maya
+    :type processes: int
+    :param cache_dir: folder to keep topology data in between sessions, eg. folder_rigging_meshCache
+    :type cache_dir: str
+    :param kwargs: kwargs to pass to ArrayMesh.validate
+    :return: offending component ids by check name, by mesh
+    :rtype: collections.OrderedDict
+    """
 
-    def select_edges(self, edge_ids, **kwargs):
-        """
+    checks = checks or list(Mesh.validation_checks)
 
-        Select the given edges, and pass kwargs to cmds.select
+    collection = MeshCollection(meshes, processes=processes, cache_dir=cache_dir)
+    results = collection.map("validate", checks=checks, **kwargs)
 
-        :param edge_ids: ids to select
-        :param kwargs: kwargs to pass to cmds.select
+    for mesh, result in zip(collection.meshes, results.values()):
+        edge_checks = [check for check in checks if Mesh.validation_checks[check] == "e" and len(result[check])]
 
-        """
+        if edge_checks:
+            # the workers number the edges from the face data, maya's edge order is only walked for failing meshes
+            face_data_edges, _ = mesh._face_data_edges()
 
-        comps = ["{}.e[{}]".format(self.fullPathName(), eid) for eid in edge_ids]
+            for check in edge_checks:
+                result[check] = host_edge_ids(mesh, face_data_edges[result[check]])
 
-        cmds.select(comps, **kwargs)
+    # the checks come back from the workers as a plain dict, put them back in order
+    return OrderedDict((mesh, OrderedDict((check, result[check]) for check in checks))
+                       for mesh, result in results.items())
 
-    def march_vert_array(self, start_vert_ids):
-        """
 
-        Build an array of verts that "march" down the mesh from start_vert_ids
+def validation_report(results):
+    """
 
-        :param start_vert_ids: verts to start from
-        :type start_vert_ids: list[int]
-        :return: list[list[int]]
-        """
+    Get the failed checks as lines of text
 
-        found_verts = list(start_vert_ids)
+    :param results: results from validate_meshes
+    :type results: dict
+    :return: one line per failed check
+    :rtype: list[str]
+    """
 
-        march_array = [list(start_vert_ids)]
+    return ["{0}: {1} {2} ({3})".format(mesh, len(ids), check, Mesh.validation_checks[check])
+            for mesh, checks in results.items() for check, ids in checks.items() if len(ids)]
 
-        while len(found_verts) < self.num_verts:
-            these_verts = self.get_neighbour_verts(march_array[-1])
 
-            next_verts = [vert for vert in these_verts if vert not in found_verts]
+def validate_publish(objects, gate=True, checks=None, select=True, processes=None, cache_dir=None, **kwargs):
+    """
 
-            march_array.append(next_verts)
+    Check every mesh under the objects before they are published. Failures are printed and their components
+    selected, as a gate they also stop the publish
+
+    :param objects: transforms or shapes being published
+    :type objects: list[str]
+    :param gate: raise a RuntimeError when any check fails, rather than only reporting it
+    :type gate: bool
+    :param checks: names of the checks to run, None runs all of them, see ArrayMesh.validation_checks
+    :type checks: list[str]
+    :param select: select the offending components
+    :type select: bool
+    :param processes: number of worker processes, None uses one per cpu, 0 or 1 runs everything in maya
+    :type processes: int
+    :param cache_dir: folder to keep topology data in between sessions, eg. folder_rigging_meshCache
+    :type cache_dir: str
+    :param kwargs: kwargs to pass to ArrayMesh.validate
+    :return: the failed checks, offending component ids by check name, by mesh
+    :rtype: collections.OrderedDict
+    """
 
-            found_verts += these_verts
-            found_verts = list(set(found_verts))
+    meshes = publish_meshes(objects)
 
-        return march_array
+    if not meshes:
+        return OrderedDict()
 
+    results = validate_meshes(meshes, checks=checks, processes=processes, cache_dir=cache_dir, **kwargs)
 
-def ids_from_selection():
-    """
+    failures = OrderedDict((mesh, OrderedDict((check, ids) for check, ids in mesh_results.items() if len(ids)))
+                           for mesh, mesh_results in results.items())
+    failures = OrderedDict((mesh, mesh_failures) for mesh, mesh_failures in failures.items() if mesh_failures)
 
-    Get the ids of the current selection
+    if not failures:
+        return failures
 
-    :return: component type, list of ids
-    :rtype: str, list[int]
-    """
+    for line in validation_report(failures):
+        print(line)
 
-    ids = [re.match(r'(\D*)\[(\d*)', sel.split('.')[-1]).groups() for sel in cmds.ls(sl=True, fl=True)]
+    if select:
+        cmds.select([name for mesh, mesh_failures in failures.items() for check, ids in mesh_failures.items()
+                     for name in component_strings(mesh, Mesh.validation_checks[check], ids)])
 
-    comp_type = ids[0][0]
+    if gate:
+        raise RuntimeError("Model validation failed on {0} meshes, see the script editor".format(len(failures)))
 
-    return comp_type, [int(x[1]) for x in ids]
\ No newline at end of file
+    return failures
@@ -0,0 +1,3500 @@
+import hashlib
+
+from collections import OrderedDict
+
+import numpy as np
+
+from scipy.sparse import csr_matrix, diags
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import splu
+from scipy.spatial import cKDTree
+
+from .meshBvh import TriangleBvh, cross
+from .halfEdges import HalfEdges
+from .meshDecimate import decimate_triangles
+from .meshCache import MeshCache, arrays_to_sparse, sparse_to_arrays
+
+
+def csr_row_indices(matrix, rows):
+    """
+
+    Get the column indices of the given rows of a csr matrix, concatenated row after row
+
+    :param matrix: csr matrix
+    :type matrix: scipy.sparse.csr_matrix
+    :param rows: row ids
+    :type rows: numpy.ndarray
+    :return: column ids, row id of each column id
+    :rtype: numpy.ndarray, numpy.ndarray
+    """
+
+    starts = matrix.indptr[rows]
+    counts = matrix.indptr[rows + 1] - starts
+
+    offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+
+    return matrix.indices[offsets + np.arange(counts.sum())], np.repeat(rows, counts)
+
+
+def normalized(vectors):
+    """
+
+    Get the given vectors scaled to unit length, zero length vectors are left as they are
+
+    :param vectors: n x 3 vectors
+    :type vectors: numpy.ndarray
+    :return: unit vectors
+    :rtype: numpy.ndarray
+    """
+
+    lengths = np.sqrt(np.einsum("...i,...i->...", vectors, vectors))
+
+    return vectors / np.where(lengths > 0, lengths, 1.0)[..., np.newaxis]
+
+
+def accumulate(ids, values, length):
+    """
+
+    Sum the rows of values that share an id, like np.bincount for n x m values
+
+    :param ids: id for each row
+    :type ids: numpy.ndarray
+    :param values: n x m values
+    :type values: numpy.ndarray
+    :param length: number of ids
+    :type length: int
+    :return: length x m sums
+    :rtype: numpy.ndarray
+    """
+
+    return np.stack([np.bincount(ids, values[:, axis], minlength=length) for axis in range(values.shape[1])], axis=1)
+
+
+def triangles_overlap_2d(corners_a, corners_b, tolerance=0.0):
+    """
+
+    Check pairs of 2d triangles for overlap, the triangles overlap unless an edge normal of one of them separates
+    them. Triangles that only touch along an edge or at a corner don't overlap
+
+    :param corners_a: n x 3 x 2 corners
+    :type corners_a: numpy.ndarray
+    :param corners_b: n x 3 x 2 corners
+    :type corners_b: numpy.ndarray
+    :param tolerance: overlap to ignore along each separating axis
+    :type tolerance: float
+    :return: n bools
+    :rtype: numpy.ndarray
+    """
+
+    overlap = np.ones(len(corners_a), dtype=bool)
+
+    for corners in (corners_a, corners_b):
+        for itr in range(3):
+            edges = corners[:, (itr + 1) % 3] - corners[:, itr]
+            axes = normalized(np.stack([-edges[:, 1], edges[:, 0]], axis=1))
+
+            projected_a = np.einsum("nkj,nj->nk", corners_a, axes)
+            projected_b = np.einsum("nkj,nj->nk", corners_b, axes)
+
+            overlap &= (projected_a.max(axis=1) > projected_b.min(axis=1) + tolerance) & \
+                       (projected_b.max(axis=1) > projected_a.min(axis=1) + tolerance)
+
+    return overlap
+
+
+def factorize(matrix):
+    """
+
+    Factorize a symmetric sparse matrix for repeated solves. Ordering by minimum degree on the symmetric pattern
+    and keeping the diagonal pivots gives a fraction of the fill of the default column ordering on mesh operators
+
+    :param matrix: symmetric positive definite matrix
+    :type matrix: scipy.sparse.spmatrix
+    :return: factorization, call solve on it
+    :rtype: scipy.sparse.linalg.SuperLU
+    """
+
+    return splu(matrix.tocsc(), permc_spec="MMD_AT_PLUS_A", diag_pivot_thresh=0.0, options={"SymmetricMode": True})
+
+
+class ArrayMesh(object):
+
+    # spaces handed to the point fetch, hosts like maya replace these with their own enums
+    object_space = None
+    world_space = None
+
+    # cached data grouped by what it is derived from, each group is reset together when its source changes.
+    # topology data only depends on the faces so it survives the points moving
+    _topology_cache = ("_face_counts", "_face_verts", "_face_starts", "_tri_counts", "_tris", "_triangle_verts",
+                       "_tri_faces", "_tri_face_verts", "_tri_edge_matrix", "_num_triangles", "_edge_verts",
+                       "_face_vert_edges", "_edge_vert_list", "_edge_con_matrix", "_vert_con_matrix",
+                       "_vert_face_matrix", "_edge_face_matrix", "_face_con_matrix", "_vert_pieces",
+                       "_operator_pattern", "_corner_pattern", "_uniform_laplacian", "_face_vert_keys",
+                       "_half_edges", "_face_data_edge_verts", "_face_data_vert_edges", "_face_data_half_edges",
+                       "_heat_solvers")
+
+    # uv data keyed by uv set name, depends on the topology and the uvs but not the points
+    _uv_cache = ("_uv_data", "_vert_uv_list", "_uv_bounds", "_uv_shells", "_uv_tri_index", "_tangent_weights")
+
+    _geometry_cache = ("_tri_points", "_tri_edge_vectors", "_tri_normals", "_tri_areas", "_tri_edge_normals",
+                       "_tri_centers",
+                       "_face_normals", "_normals", "_frames", "_bvh", "_operators", "_symmetry",
+                       "_curvature")
+
+    # caches that are dicts rather than single values
+    _keyed_cache = ("_uv_data", "_vert_uv_list", "_uv_bounds", "_uv_shells", "_uv_tri_index", "_tangent_weights",
+                    "_frames", "_operators", "_symmetry")
+
+    # triangles processed at once when filling the per triangle arrays
+    chunk_size = 1 << 17
+
+    # model checks run by validate, with the component type of the ids each one returns
+    validation_checks = OrderedDict([("zero_area_faces", "f"), ("non_manifold_edges", "e"), ("lamina_faces", "f"),
+                                     ("unused_verts", "vtx"), ("overlapping_uvs", "f"), ("flipped_normals", "f")])
+
+    def __init__(self, points=None, face_counts=None, face_verts=None, uvs=None, uv_ids=None, uv_set="map1",
+                 compact=False, cache_dir=None, edge_verts=None):
+        """
+
+        Array backed mesh, all of the mesh maths runs on plain numpy arrays so it can be used outside of maya.
+        Subclasses can leave the arrays empty and fill them on demand through the _fetch methods
+
+        :param points: vertex positions
+        :type points: numpy.ndarray
+        :param face_counts: number of verts in each face
+        :type face_counts: numpy.ndarray
+        :param face_verts: vert ids for each face vertex, face after face
+        :type face_verts: numpy.ndarray
+        :param uvs: uv positions
+        :type uvs: numpy.ndarray
+        :param uv_ids: uv id for each face vertex, -1 for unmapped face verts
+        :type uv_ids: numpy.ndarray
+        :param uv_set: name to store the given uvs under
+        :type uv_set: str
+        :param compact: store the per triangle arrays as float32 and don't keep the triangle points
+        :type compact: bool
+        :param cache_dir: folder to keep topology data in between sessions, see MeshCache
+        :type cache_dir: str
+        :param edge_verts: n_edges x 2 vert ids, to number the edges like the mesh they were taken from
+        :type edge_verts: numpy.ndarray
+        """
+
+        self._compact = compact
+
+        self.disk_cache = MeshCache(cache_dir) if cache_dir else None
+
+        self._source_points = None if points is None else np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self._source_polygons = None
+
+        if face_counts is not None:
+            self._source_polygons = (np.asarray(face_counts, dtype=np.int64), np.asarray(face_verts, dtype=np.int64))
+
+        self._source_edges = None if edge_verts is None else np.asarray(edge_verts, dtype=np.int64).reshape(-1, 2)
+
+        self._uv_sets = {}
+        self._default_uv_set = uv_set
+
+        if uvs is not None:
+            self._uv_sets[uv_set] = (np.asarray(uvs, dtype=np.float64).reshape(-1, 2),
+                                     np.asarray(uv_ids, dtype=np.int64))
+
+        # fingerprints of the topology and points the caches were built from
+        self._topology_key = None
+        self._geometry_key = None
+
+        self.clear_cache()
+
+    @classmethod
+    def from_triangles(cls, points, tris, uvs=None, uv_ids=None):
+        """
+
+        Build a mesh from a triangle soup
+
+        :param points: vertex positions
+        :param tris: n_tris x 3 vert ids
+        :param uvs: uv positions
+        :param uv_ids: n_tris x 3 uv ids
+        :return: mesh
+        :rtype: ArrayMesh
+        """
+
+        tris = np.asarray(tris, dtype=np.int64).reshape(-1, 3)
+
+        if uv_ids is not None:
+            uv_ids = np.asarray(uv_ids, dtype=np.int64).ravel()
+
+        return cls(points, np.full(len(tris), 3, dtype=np.int64), tris.ravel(), uvs=uvs, uv_ids=uv_ids)
+
+    @classmethod
+    def from_obj(cls, path):
+        """
+
+        Build a mesh from a wavefront obj file, only the positions, faces and first uv set are read
+
+        :param path: obj file path
+        :type path: str
+        :return: mesh
+        :rtype: ArrayMesh
+        """
+
+        points = []
+        uvs = []
+        faces = []
+
+        with open(path) as obj_file:
+            for line in obj_file:
+                if line.startswith("v "):
+                    points.append(line.split()[1:4])
+                elif line.startswith("vt "):
+                    uvs.append(line.split()[1:3])
+                elif line.startswith("f "):
+                    # negative ids count back from the verts and uvs read so far, keep the counts at this face
+                    faces.append((len(points), len(uvs), line.split()[1:]))
+
+        points = np.array(points, dtype=np.float64).reshape(-1, 3)
+        uvs = np.array(uvs, dtype=np.float64).reshape(-1, 2)
+
+        face_counts = np.array([len(face) for _, _, face in faces], dtype=np.int64)
+        corners = [corner.split("/") for _, _, face in faces for corner in face]
+
+        face_verts = np.array([int(corner[0]) for corner in corners], dtype=np.int64)
+        uv_ids = np.array([int(corner[1]) if len(corner) > 1 and corner[1] else 0 for corner in corners],
+                          dtype=np.int64)
+
+        num_points = np.repeat([num_points for num_points, _, _ in faces], face_counts).astype(np.int64)
+        num_uvs = np.repeat([num_uvs for _, num_uvs, _ in faces], face_counts).astype(np.int64)
+
+        # obj ids are 1 based
+        face_verts = np.where(face_verts < 0, num_points + face_verts, face_verts - 1)
+        uv_ids = np.where(uv_ids < 0, num_uvs + uv_ids, uv_ids - 1)
+
+        if not len(uvs):
+            return cls(points, face_counts, face_verts)
+
+        return cls(points, face_counts, face_verts, uvs=uvs, uv_ids=uv_ids)
+
+    # data sources, hosts override these to fill the arrays in bulk
+
+    def _fetch_points(self, space=None):
+        """
+
+        Get the vertex positions from the source data
+
+        :param space: space to get the points in
+        :return: points
+        :rtype: numpy.ndarray
+        """
+
+        if self._source_points is None:
+            raise RuntimeError("No points given for this mesh")
+
+        return self._source_points
+
+    def _fetch_polygons(self):
+        """
+
+        Get the face counts and face vertex ids from the source data
+
+        :return: verts per face, vert ids
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        if self._source_polygons is None:
+            raise RuntimeError("No faces given for this mesh")
+
+        return self._source_polygons
+
+    def _fetch_triangles(self):
+        """
+
+        Get the triangles for each face, arrays have no triangulation so fan triangulate each face
+
+        :return: number of triangles per face, triangle vert ids
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        face_counts, face_verts = self.polygons()
+
+        tri_counts = np.maximum(face_counts - 2, 0)
+        tri_face_starts = np.repeat(self.face_starts(), tri_counts)
+
+        # offset of the second vert of each tri within its face
+        tri_offsets = np.arange(tri_counts.sum()) - np.repeat(np.cumsum(tri_counts) - tri_counts, tri_counts) + 1
+
+        tri_face_verts = np.stack([tri_face_starts, tri_face_starts + tri_offsets, tri_face_starts + tri_offsets + 1],
+                                  axis=1)
+
+        return tri_counts, face_verts[tri_face_verts].ravel()
+
+    def _fetch_uvs(self, uv_set=None):
+        """
+
+        Get the uvs and the uv id of each face vertex for the given set
+
+        :param uv_set: uv set to get
+        :return: uvs, uv id per face vertex
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        uv_set = self._resolve_uv_set(uv_set)
+
+        if uv_set not in self._uv_sets:
+            raise RuntimeError("No uvs given for uv set {}".format(uv_set))
+
+        return self._uv_sets[uv_set]
+
+    def _resolve_uv_set(self, uv_set=None):
+        """
+
+        Get the name of the uv set to use, None gives the default set
+
+        :param uv_set: uv set name
+        :return: uv set name
+        :rtype: str
+        """
+
+        return uv_set or self._default_uv_set
+
+    def _fetch_edges(self):
+        """
+
+        Get the host's edge vert pairs, None to number the edges from the face data. Hosts overriding this
+        override _edge_source too, it is only asked for when edge ids are handed back
+
+        :return: vert ids for each edge
+        :rtype: numpy.ndarray or None
+        """
+
+        return self._source_edges
+
+    def _edge_source(self):
+        """
+
+        Get a name for where the edge order comes from. Disk cache entries built on edge ids are stored under it,
+        so meshes that number the same topology's edges differently never read each other's entries
+
+        :return: face when the edges are numbered from the face data, otherwise a fingerprint of the given edges
+        :rtype: str
+        """
+
+        if self._source_edges is None:
+            return "face"
+
+        return self.fingerprint(self._source_edges)
+
+    def _triangle_source(self):
+        """
+
+        Get a name for where the triangulation comes from, see _edge_source
+
+        :return: fan, as arrays fan triangulate each face
+        :rtype: str
+        """
+
+        return "fan"
+
+    @staticmethod
+    def fingerprint(*arrays):
+        """
+
+        Get a hash of the contents of the given arrays
+
+        :param arrays: arrays to hash
+        :return: hex digest
+        :rtype: str
+        """
+
+        digest = hashlib.md5()
+
+        for array in arrays:
+            array = np.ascontiguousarray(array)
+
+            digest.update(str(array.shape).encode("utf-8"))
+            digest.update(array.view(np.uint8))
+
+        return digest.hexdigest()
+
+    def _reset_cache(self, names):
+        """
+
+        Reset the given cached attributes
+
+        :param names: attribute names
+        :type names: tuple[str]
+        """
+
+        for name in names:
+            setattr(self, name, {} if name in self._keyed_cache else None)
+
+    def clear_cache(self):
+        """
+
+        Clear the currently cached data
+
+        """
+
+        self._reset_cache(self._topology_cache + self._uv_cache + self._geometry_cache)
+
+        self._points = self._source_points
+
+        self._topology_key = None
+        self._geometry_key = None if self._points is None else self.fingerprint(self._points)
+
+    def refresh_topology(self):
+        """
+
+        Re-fetch the faces and compare them with the cached ones, if the topology has changed every cache is
+        cleared
+
+        :return: True if the topology changed
+        :rtype: bool
+        """
+
+        face_counts, face_verts = self._fetch_polygons()
+        topology_key = self.fingerprint(face_counts, face_verts)
+
+        if topology_key == self._topology_key:
+            return False
+
+        self._reset_cache(self._topology_cache + self._uv_cache + self._geometry_cache)
+
+        self._face_counts = face_counts
+        self._face_verts = face_verts
+        self._topology_key = topology_key
+
+        return True
+
+    def topology_key(self):
+        """
+
+        Get the fingerprint of the face counts and face vert ids
+
+        :return: hex digest
+        :rtype: str
+        """
+
+        if self._topology_key is None:
+            self.refresh_topology()
+
+        return self._topology_key
+
+    def _disk_cached(self, name, build, geometry=False):
+        """
+
+        Get arrays from the disk cache under the topology fingerprint, building and saving them if they aren't
+        there. Without a disk cache they are just built
+
+        :param name: entry name
+        :type name: str
+        :param build: function returning the arrays by name
+        :param geometry: the arrays depend on the points too. The entry keeps the points fingerprint it was built
+                         from and is replaced when the points change, so posing the mesh doesn't fill the cache
+        :type geometry: bool
+        :return: arrays by name
+        :rtype: dict
+        """
+
+        if self.disk_cache is None:
+            return build()
+
+        arrays = self.disk_cache.load_arrays(self.topology_key(), name)
+        replace = False
+
+        if geometry:
+            if self._points is None:
+                self.points()
+
+            geometry_key = np.frombuffer(self._geometry_key.encode("ascii"), dtype=np.uint8)
+
+            if arrays is not None and not np.array_equal(arrays.get("geometry_key"), geometry_key):
+                arrays = None
+                replace = True
+
+        if arrays is None:
+            arrays = build()
+
+            if geometry:
+                arrays = dict(arrays, geometry_key=geometry_key)
+
+            self.disk_cache.save_arrays(self.topology_key(), name, arrays, replace=replace)
+
+        return arrays
+
+    def points(self, space=None):
+        """
+
+        Get the current points of the mesh. Anything cached from the previous points is cleared if they have
+        changed, and a change in the number of points re-checks the topology
+
+        :param space: space to get the points in
+        :return: list of points
+        :rtype: numpy.ndarray
+        """
+
+        points = self._fetch_points(space)
+        geometry_key = self.fingerprint(points)
+
+        if self._points is not None and len(points) != len(self._points):
+            self.refresh_topology()
+
+        if geometry_key != self._geometry_key:
+            self._reset_cache(self._geometry_cache)
+            self._geometry_key = geometry_key
+
+        self._points = points
+
+        return self._points
+
+    def set_points(self, points):
+        """
+
+        Replace the source points, caches depending on the old points are cleared
+
+        :param points: new points
+        :type points: numpy.ndarray
+        """
+
+        self._source_points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.points()
+
+    def normals(self, angle_weighted=True, space=None):
+        """
+
+        Get the vertex normals, averaged from the triangle normals
+
+        :param angle_weighted: weight by the corner angles rather than the triangle areas
+        :type angle_weighted: bool
+        :param space: space to get the points in
+        :return: vertex normals
+        :rtype: numpy.ndarray
+        """
+
+        self.points(space=space)
+
+        self._normals = normalized(self._corner_normals(angle_weighted))
+
+        return self._normals
+
+    def _corner_weights(self, angle_weighted=True):
+        """
+
+        Get the weight each triangle corner adds to its vertex when averaging triangle values
+
+        :param angle_weighted: use the corner angles, otherwise the triangle areas
+        :type angle_weighted: bool
+        :return: n_tris x 3 weights
+        :rtype: numpy.ndarray
+        """
+
+        if angle_weighted:
+            return self.corner_angles()
+
+        return self.triangle_areas().repeat(3).reshape(-1, 3)
+
+    def _corner_matrix(self, angle_weighted=True):
+        """
+
+        Get a n_verts x n_tris matrix holding the weight of each triangle corner, multiplying per triangle values
+        by it sums them onto the verts. The matrix is kept until the points move
+
+        :param angle_weighted: use the corner angles, otherwise the triangle areas
+        :type angle_weighted: bool
+        :return: vert triangle matrix
+        :rtype: scipy.sparse.csr_matrix
+        """
+
+        key = "corners_angles" if angle_weighted else "corners_areas"
+
+        if key in self._operators:
+            return self._operators[key]
+
+        if self._corner_pattern is None:
+            tri_verts = self.triangle_verts().ravel()
+
+            # corners sorted by vert, so the matrix rows can be filled straight from the corner values
+            order = np.argsort(tri_verts, kind="stable")
+            indptr = np.r_[0, np.cumsum(np.bincount(tri_verts, minlength=self.num_verts))]
+
+            self._corner_pattern = indptr, order // 3, order
+
+        indptr, indices, order = self._corner_pattern
+
+        corner_values = self._corner_weights(angle_weighted)
+
+        self._operators[key] = csr_matrix((corner_values.ravel()[order], indices, indptr),
+                                          shape=(self.num_verts, self.num_triangles))
+
+        return self._operators[key]
+
+    def _corner_normals(self, angle_weighted=True):
+        """
+
+        Get the vertex normals summed from the weighted triangle normals
+
+        :param angle_weighted: use the corner angles, otherwise the triangle areas
+        :type angle_weighted: bool
+        :return: unnormalized vertex normals
+        :rtype: numpy.ndarray
+        """
+
+        return self._corner_matrix(angle_weighted).dot(self.triangle_normals())
+
+    def bounding_box(self):
+        """
+
+        Get the bounding box as an numpy array
+
+        :return: bounding box
+        :rtype: numpy.ndarray
+        """
+
+        if self._points is None:
+            self.points()
+
+        col_max = np.amax(self._points, axis=0)
+        col_min = np.amin(self._points, axis=0)
+
+        return np.array(col_min.tolist() + [0] + col_max.tolist() + [0])
+
+    def polygons(self):
+        """
+
+        Get the face counts and face vertex ids
+
+        :return: verts per face, vert ids
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        if self._face_counts is None:
+            self.refresh_topology()
+
+        return self._face_counts, self._face_verts
+
+    def face_starts(self):
+        """
+
+        Get the index of the first face vertex of each face
+
+        :return: face vertex offsets
+        :rtype: numpy.ndarray
+        """
+
+        if self._face_starts is None:
+            face_counts, _ = self.polygons()
+
+            self._face_starts = np.cumsum(face_counts) - face_counts
+
+        return self._face_starts
+
+    def face_vert_faces(self):
+        """
+
+        Get the face id of each face vertex
+
+        :return: face ids
+        :rtype: numpy.ndarray
+        """
+
+        face_counts, _ = self.polygons()
+
+        return np.repeat(np.arange(len(face_counts)), face_counts)
+
+    def face_vert_next(self):
+        """
+
+        Get the index of the next face vertex around each face
+
+        :return: face vertex ids
+        :rtype: numpy.ndarray
+        """
+
+        face_counts, face_verts = self.polygons()
+
+        starts = np.repeat(self.face_starts(), face_counts)
+        counts = np.repeat(face_counts, face_counts)
+
+        return starts + (np.arange(len(face_verts)) - starts + 1) % counts
+
+    def face_vert_prev(self):
+        """
+
+        Get the index of the previous face vertex around each face
+
+        :return: face vertex ids
+        :rtype: numpy.ndarray
+        """
+
+        face_counts, face_verts = self.polygons()
+
+        starts = np.repeat(self.face_starts(), face_counts)
+        counts = np.repeat(face_counts, face_counts)
+
+        return starts + (np.arange(len(face_verts)) - starts - 1) % counts
+
+    def find_face_verts(self, from_verts, to_verts):
+        """
+
+        Find the face vertex running from each from vert to the matching to vert around its face
+
+        :param from_verts: vert ids
+        :type from_verts: numpy.ndarray
+        :param to_verts: vert ids
+        :type to_verts: numpy.ndarray
+        :return: face vertex ids, -1 where the verts aren't joined that way round
+        :rtype: numpy.ndarray
+        """
+
+        if self._face_vert_keys is None:
+            _, face_verts = self.polygons()
+
+            keys = face_verts * self.num_verts + face_verts[self.face_vert_next()]
+            order = np.argsort(keys, kind="stable")
+
+            self._face_vert_keys = keys[order], order
+
+        sorted_keys, order = self._face_vert_keys
+
+        keys = np.asarray(from_verts, dtype=np.int64) * self.num_verts + np.asarray(to_verts, dtype=np.int64)
+        found = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+
+        return np.where(sorted_keys[found] == keys, order[found], -1)
+
+    def uv_data(self, uv_set=None):
+        """
+
+        Get the uvs and the uv id of each face vertex for the given set, fetched in one go and cached per set
+
+        :param uv_set: uv set to get
+        :return: uvs, uv id per face vertex
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        uv_set = self._resolve_uv_set(uv_set)
+
+        if uv_set not in self._uv_data:
+            self._uv_data[uv_set] = self._fetch_uvs(uv_set)
+
+        return self._uv_data[uv_set]
+
+    def face_vert_uvs(self, uv_set=None):
+        """
+
+        Get the uv of each face vertex, unmapped face verts are nan
+
+        :param uv_set: uv set to get
+        :return: n_face_verts x 2 uvs
+        :rtype: numpy.ndarray
+        """
+
+        uvs, uv_ids = self.uv_data(uv_set)
+
+        face_vert_uvs = uvs[uv_ids]
+        face_vert_uvs[uv_ids < 0] = np.nan
+
+        return face_vert_uvs
+
+    def get_vert_uvs(self, uv_set=None):
+        """
+
+        Get the shared UVs for each vert on this mesh, the uv of the first face vertex using the vert.
+        Unmapped verts are left at 0, 0
+
+        :param uv_set: uv set to get
+        :return: n_verts x 2 uvs
+        :rtype: numpy.ndarray
+        """
+
+        uv_set = self._resolve_uv_set(uv_set)
+
+        if uv_set not in self._vert_uv_list:
+            _, face_verts = self.polygons()
+            uvs, uv_ids = self.uv_data(uv_set)
+
+            mapped = np.flatnonzero(uv_ids > -1)
+
+            vert_ids, first = np.unique(face_verts[mapped], return_index=True)
+
+            vert_uvs = np.zeros((self.num_verts, 2))
+            vert_uvs[vert_ids] = uvs[uv_ids[mapped[first]]]
+
+            self._vert_uv_list[uv_set] = vert_uvs
+
+        return self._vert_uv_list[uv_set]
+
+    def uv_bounds(self, uv_set=None):
+        """
+
+        Get the min and max uv of all the mapped face verts
+
+        :param uv_set: set to test
+        :return: min uv, max uv
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        uv_set = self._resolve_uv_set(uv_set)
+
+        if uv_set not in self._uv_bounds:
+            uvs, uv_ids = self.uv_data(uv_set)
+
+            used_uvs = uvs[uv_ids[uv_ids > -1]]
+
+            self._uv_bounds[uv_set] = (used_uvs.min(axis=0), used_uvs.max(axis=0))
+
+        return self._uv_bounds[uv_set]
+
+    def min_u(self, uv_set=None):
+        """
+
+        Get the min U from the uv set
+
+        :param uv_set: set to test
+        :return: min u
+        :rtype: float
+        """
+
+        return float(self.uv_bounds(uv_set=uv_set)[0][0])
+
+    def max_u(self, uv_set=None):
+        """
+
+        Get the max U from the uv set
+
+        :param uv_set: set to test
+        :return: max u
+        :rtype: float
+        """
+
+        return float(self.uv_bounds(uv_set=uv_set)[1][0])
+
+    def min_v(self, uv_set=None):
+        """
+
+        Get the min V from the uv set
+
+        :param uv_set: set to test
+        :return: min v
+        :rtype: float
+        """
+
+        return float(self.uv_bounds(uv_set=uv_set)[0][1])
+
+    def max_v(self, uv_set=None):
+        """
+
+        Get the max V from the uv set
+
+        :param uv_set: set to test
+        :return: max v
+        :rtype: float
+        """
+
+        return float(self.uv_bounds(uv_set=uv_set)[1][1])
+
+    def uv_shells(self, uv_set=None):
+        """
+
+        Get the uv shells, uvs are in the same shell when they are joined through the faces using them
+
+        :param uv_set: uv set to get the shells of
+        :return: shell id of each uv and of each face, -1 for unused uvs and faces that aren't fully mapped
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        uv_set = self._resolve_uv_set(uv_set)
+
+        if uv_set not in self._uv_shells:
+            uvs, uv_ids = self.uv_data(uv_set)
+
+            def build():
+                face_counts, _ = self.polygons()
+
+                next_uv_ids = uv_ids[self.face_vert_next()]
+                joined = (uv_ids > -1) & (next_uv_ids > -1)
+
+                graph = csr_matrix((np.ones(joined.sum(), dtype=np.int8), (uv_ids[joined], next_uv_ids[joined])),
+                                   shape=(len(uvs), len(uvs)))
+
+                _, components = connected_components(graph, directed=False)
+
+                # number the shells of the used uvs only
+                used = np.zeros(len(uvs), dtype=bool)
+                used[uv_ids[uv_ids > -1]] = True
+
+                uv_shells = np.full(len(uvs), -1, dtype=np.int64)
+                _, uv_shells[used] = np.unique(components[used], return_inverse=True)
+
+                mapped = np.bincount(self.face_vert_faces(), uv_ids > -1, minlength=len(face_counts)) == face_counts
+
+                face_shells = np.where(mapped, uv_shells[uv_ids[self.face_starts()]], -1)
+
+                return {"uv_shells": uv_shells, "face_shells": face_shells}
+
+            arrays = self._disk_cached("uv_shells_{0}".format(self.fingerprint(uvs, uv_ids)), build)
+
+            self._uv_shells[uv_set] = arrays["uv_shells"], arrays["face_shells"]
+
+        return self._uv_shells[uv_set]
+
+    def uv_shell_bounds(self, uv_set=None):
+        """
+
+        Get the min and max uv of each uv shell
+
+        :param uv_set: uv set to use
+        :return: n_shells x 2 min uvs, n_shells x 2 max uvs
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        uvs, _ = self.uv_data(uv_set)
+        uv_shells, _ = self.uv_shells(uv_set)
+
+        used = uv_shells > -1
+        num_shells = uv_shells.max() + 1
+
+        shell_min = np.full((num_shells, 2), np.inf)
+        shell_max = np.full((num_shells, 2), -np.inf)
+
+        np.minimum.at(shell_min, uv_shells[used], uvs[used])
+        np.maximum.at(shell_max, uv_shells[used], uvs[used])
+
+        return shell_min, shell_max
+
+    def uv_shell_udims(self, uv_set=None):
+        """
+
+        Get the udim tile each uv shell sits in, taken from the middle of the shell
+
+        :param uv_set: uv set to use
+        :return: udim number (1001, 1002...) of each shell
+        :rtype: numpy.ndarray
+        """
+
+        shell_min, shell_max = self.uv_shell_bounds(uv_set)
+
+        tiles = np.floor((shell_min + shell_max) * 0.5).astype(np.int64)
+
+        return 1001 + tiles[:, 0] + 10 * tiles[:, 1]
+
+    def uv_triangulation(self, uv_set=None, shell=0):
+        """
+
+        Get a triangle index over one uv shell, built from the mesh triangles laid out in uv space with every uv at
+        z = 0, so a uv can be located by casting a ray straight down onto it. Only triangles of fully mapped faces
+        are used, a shell without any has no bvh
+
+        :param uv_set: uv set to use
+        :param shell: uv shell id
+        :type shell: int
+        :return: uv triangle bvh or None, mesh triangle id of each bvh triangle
+        :rtype: TriangleBvh, numpy.ndarray
+        """
+
+        uv_set = self._resolve_uv_set(uv_set)
+
+        if (uv_set, shell) not in self._uv_tri_index:
+            uvs, uv_ids = self.uv_data(uv_set)
+            _, face_shells = self.uv_shells(uv_set)
+
+            shell_tris = np.flatnonzero(face_shells[self.triangle_faces()] == shell)
+
+            bvh = None
+
+            if len(shell_tris):
+                uv_points = np.zeros((len(uvs), 3))
+                uv_points[:, :2] = uvs
+
+                bvh = TriangleBvh(uv_points, uv_ids[self.triangle_face_verts()[shell_tris]])
+
+            self._uv_tri_index[(uv_set, shell)] = bvh, shell_tris
+
+        return self._uv_tri_index[(uv_set, shell)]
+
+    def closest_at_uvs(self, uvs, uv_set=None, space=None, chunk_size=4096):
+        """
+
+        Get the closest data at many UVs at once. Each uv is only looked up in the shells whose bounds it falls
+        in, with one ray cast onto each shell's uv triangles for all of the uvs in it
+
+        :param uvs: n x 2 uv co-ords
+        :type uvs: numpy.ndarray
+        :param uv_set: uv set to check
+        :param space: space to get the points in, defaults to world space
+        :param chunk_size: uvs to test against the shell bounds at once
+        :type chunk_size: int
+        :return: point, mesh triangle, face, uv shell, verts of the triangle, barycentric coords and whether each
+                 uv landed on the mesh. Misses have nan points and bary and -1 ids
+        :rtype: dict
+        """
+
+        uvs = np.asarray(uvs, dtype=np.float64).reshape(-1, 2)
+
+        shell_min, shell_max = self.uv_shell_bounds(uv_set)
+
+        # uv and shell pairs where the uv is inside the shell bounds
+        pair_uvs = []
+        pair_shells = []
+
+        for start in range(0, len(uvs), chunk_size):
+            chunk = uvs[start:start + chunk_size, np.newaxis]
+            inside = ((chunk >= shell_min) & (chunk <= shell_max)).all(axis=2)
+
+            query_ids, query_shells = np.nonzero(inside)
+
+            pair_uvs.append(query_ids + start)
+            pair_shells.append(query_shells)
+
+        pair_uvs = np.concatenate(pair_uvs) if pair_uvs else np.zeros(0, dtype=np.int64)
+        pair_shells = np.concatenate(pair_shells) if pair_shells else np.zeros(0, dtype=np.int64)
+
+        triangles = np.full(len(uvs), -1, dtype=np.int64)
+        shells = np.full(len(uvs), -1, dtype=np.int64)
+        bary = np.full((len(uvs), 3), np.nan)
+
+        order = np.argsort(pair_shells, kind="stable")
+        shell_ids, shell_starts = np.unique(pair_shells[order], return_index=True)
+
+        for shell, shell_uvs in zip(shell_ids, np.split(pair_uvs[order], shell_starts[1:])):
+            # uvs already found in an overlapping shell keep their first hit
+            shell_uvs = shell_uvs[triangles[shell_uvs] < 0]
+
+            if not len(shell_uvs):
+                continue
+
+            bvh, shell_tris = self.uv_triangulation(uv_set=uv_set, shell=shell)
+
+            # the shell's faces are only partly mapped, nothing to land on
+            if bvh is None:
+                continue
+
+            origins = np.ones((len(shell_uvs), 3))
+            origins[:, :2] = uvs[shell_uvs]
+
+            directions = np.zeros((len(shell_uvs), 3))
+            directions[:, 2] = -1.0
+
+            tri_ids, _, tri_bary = bvh.first_hits(origins, directions)
+
+            hit = tri_ids > -1
+
+            triangles[shell_uvs[hit]] = shell_tris[tri_ids[hit]]
+            shells[shell_uvs[hit]] = shell
+            bary[shell_uvs[hit]] = tri_bary[hit]
+
+        hit = triangles > -1
+
+        tri_ids = np.full((len(uvs), 3), -1, dtype=np.int64)
+        tri_ids[hit] = self.triangle_verts()[triangles[hit]]
+
+        faces = np.full(len(uvs), -1, dtype=np.int64)
+        faces[hit] = self.triangle_faces()[triangles[hit]]
+
+        # get the latest points
+        points = self.points(space=self.world_space if space is None else space)
+
+        out_points = np.full((len(uvs), 3), np.nan)
+        out_points[hit] = np.einsum("ijk,ij->ik", points[tri_ids[hit]], bary[hit])
+
+        return {"point": out_points, "triangle": triangles, "face": faces, "shell": shells, "tri_ids": tri_ids,
+                "bary": bary, "hit": hit}
+
+    def get_closest_at_uv(self, u, v, uv_set=None):
+        """
+
+        Get closest data at UV,
+
+        :param u: u co-ord
+        :param v: v co-ord
+        :param uv_set: uv set to check
+        :return: point, tris, barycentric coords
+        :rtype: dict
+        """
+
+        closest = self.closest_at_uvs([(u, v)], uv_set=uv_set)
+
+        if closest["hit"][0]:
+            return {"point": closest["point"][0], "tri_ids": closest["tri_ids"][0], "bary": closest["bary"][0]}
+
+        return None
+
+    def get_uv_udim(self, uv_set=None):
+        """
+
+        Get the uv udim for the current set
+
+        :param uv_set: uv set to test
+        :return: u_udim, v_udim
+        """
+
+        min_, max_ = np.floor(self.uv_bounds(uv_set=uv_set)).astype(int)
+
+        if np.array_equal(min_, max_):
+            return int(min_[0]), int(min_[1])
+
+        else:
+            return None
+
+    def triangles(self):
+        """
+
+        Get the triangles for this mesh
+
+        :return: number of triangles per face, triangle ids
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        if self._tris is None:
+            def build():
+                n_counts, tris_ = self._fetch_triangles()
+
+                return {"counts": n_counts, "tris": tris_}
+
+            arrays = self._disk_cached("triangles_{0}".format(self._triangle_source()), build)
+
+            self._tri_counts = arrays["counts"]
+            self._tris = arrays["tris"]
+
+            self._num_triangles = int(np.sum(self._tri_counts))
+
+        return self._tri_counts, self._tris
+
+    def triangle_verts(self):
+        """
+
+        Get the triangles arranged as a n_tris x 3 matrix
+
+        :return: triangle verts
+
+        """
+
+        if self._triangle_verts is None:
+            # make sure we have the tris data
+            if self._tris is None:
+                self.triangles()
+
+            self._triangle_verts = np.array(self._tris).reshape(-1, 3)
+
+        return self._triangle_verts
+
+    def triangle_faces(self):
+        """
+
+        Get the face id of each triangle
+
+        :return: face ids
+        :rtype: numpy.ndarray
+        """
+
+        if self._tri_faces is None:
+            if self._tris is None:
+                self.triangles()
+
+            self._tri_faces = np.repeat(np.arange(len(self._tri_counts)), self._tri_counts)
+
+        return self._tri_faces
+
+    def triangle_face_verts(self):
+        """
+
+        Get the face vertex id of each triangle corner, found by matching the corner vert within its face
+
+        :return: n_tris x 3 face vertex ids
+        :rtype: numpy.ndarray
+        """
+
+        if self._tri_face_verts is None:
+            _, face_verts = self.polygons()
+
+            keys = self.face_vert_faces() * self.num_verts + face_verts
+            order = np.argsort(keys, kind="stable")
+
+            tri_keys = np.repeat(self.triangle_faces(), 3) * self.num_verts + self.triangle_verts().ravel()
+
+            self._tri_face_verts = order[np.searchsorted(keys[order], tri_keys)].reshape(-1, 3)
+
+        return self._tri_face_verts
+
+    @property
+    def compact(self):
+        """
+
+        Whether the per triangle arrays are stored as float32 without keeping the triangle points, changing it
+        clears the geometry caches
+
+        :return: compact mode
+        :rtype: bool
+        """
+
+        return self._compact
+
+    @compact.setter
+    def compact(self, value):
+        if bool(value) != self._compact:
+            self._reset_cache(self._geometry_cache)
+
+        self._compact = bool(value)
+
+    @property
+    def float_type(self):
+        """
+
+        get the dtype the per triangle arrays are stored as
+
+        :return: float dtype
+        :rtype: type
+        """
+
+        return np.float32 if self._compact else np.float64
+
+    def _triangle_chunks(self):
+        """
+
+        Get the triangle ranges to fill the per triangle arrays in, so the temporary arrays stay chunk sized
+
+        :return: start and end triangle id of each chunk
+        :rtype: list[tuple[int, int]]
+        """
+
+        if self._points is None:
+            raise RuntimeError("Please run .points() first")
+
+        return [(start, min(start + self.chunk_size, self.num_triangles))
+                for start in range(0, self.num_triangles, self.chunk_size)]
+
+    def triangle_points(self):
+        """
+
+        Get the points of each triangle, as described by the points from get_points. In compact mode they are
+        built fresh each call rather than kept
+
+        :return: triangle point list
+        :type: numpy.ndarray
+        """
+
+        if self._tri_points is not None:
+            return self._tri_points
+
+        tris = self.triangle_verts()
+        tri_points = np.empty((self.num_triangles, 3, 3), dtype=self.float_type)
+
+        for start, end in self._triangle_chunks():
+            np.take(self._points, tris[start:end], axis=0, out=tri_points[start:end])
+
+        if not self._compact:
+            self._tri_points = tri_points.reshape(-1, 3)
+
+        return tri_points.reshape(-1, 3)
+
+    def triangle_centers(self):
+        """
+
+        Get the center point of each triangle
+
+        :return: triangle centers
+        :rtype: numpy.ndarray
+        """
+
+        if self._tri_centers is None:
+            tris = self.triangle_verts()
+            self._tri_centers = np.empty((self.num_triangles, 3), dtype=self.float_type)
+
+            for start, end in self._triangle_chunks():
+                np.mean(np.take(self._points, tris[start:end], axis=0), axis=1, out=self._tri_centers[start:end])
+
+        return self._tri_centers
+
+    def triangle_edge_vectors(self, mode=0):
+        """
+
+        Get the triangle edge vectors, edge k runs from corner k + 1 to corner k
+
+        :return: edge vectors for each triangle
+        :rtype: numpy.ndarray
+        """
+
+        if self._tri_edge_vectors is None:
+            tris = self.triangle_verts()
+            edge_vectors = np.empty((self.num_triangles, 3, 3), dtype=self.float_type)
+
+            for start, end in self._triangle_chunks():
+                tri_points = np.take(self._points, tris[start:end], axis=0)
+
+                np.subtract(tri_points[:, :2], tri_points[:, 1:], out=edge_vectors[start:end, :2])
+                np.subtract(tri_points[:, 2], tri_points[:, 0], out=edge_vectors[start:end, 2])
+
+            self._tri_edge_vectors = edge_vectors.reshape(-1, 3)
+
+        return self._tri_edge_vectors
+
+    def triangle_edge_lengths(self):
+        """
+
+        Get the triangle edge lengths
+
+        :return: triangle edge lengths
+        :rtype: numpy.ndarray
+        """
+
+        edge_vectors = self.triangle_edge_vectors()
+
+        return np.sqrt(np.einsum("ij,ij->i", edge_vectors, edge_vectors))
+
+    def triangle_normals(self):
+        """
+
+        Get the triangle normals
+
+        :return: triangle normals
+        :rtype: numpy.ndarray
+        """
+
+        if self._tri_normals is None:
+            edge_vectors = self.triangle_edge_vectors().reshape(-1, 3, 3)
+
+            self._tri_normals = np.empty((self.num_triangles, 3), dtype=self.float_type)
+            self._tri_areas = np.empty(self.num_triangles, dtype=self.float_type)
+
+            for start, end in self._triangle_chunks():
+                normals = cross(edge_vectors[start:end, 0], edge_vectors[start:end, 1],
+                                out=self._tri_normals[start:end])
+                areas = np.einsum("ij,ij->i", normals, normals, out=self._tri_areas[start:end])
+
+                # the cross product length is twice the triangle area
+                np.sqrt(areas, out=areas)
+                normals /= np.where(areas > 0, areas, 1.0)[:, np.newaxis]
+                areas *= 0.5
+
+        return self._tri_normals
+
+    def triangle_edge_normals(self):
+        """
+
+        Get the normal described by the triangle edges and the triangle normal
+
+        :return: triangle edge normals
+        :rtype: numpy.ndarray
+        """
+
+        if self._tri_edge_normals is None:
+            tri_normals = self.triangle_normals()
+            edge_vectors = self.triangle_edge_vectors()
+
+            self._tri_edge_normals = np.empty((self.num_triangles * 3, 3), dtype=self.float_type)
+
+            for start, end in self._triangle_chunks():
+                edge_normals = cross(tri_normals[start:end].repeat(3, axis=0), edge_vectors[start * 3:end * 3],
+                                     out=self._tri_edge_normals[start * 3:end * 3])
+
+                lengths = np.sqrt(np.einsum("ij,ij->i", edge_normals, edge_normals))
+                edge_normals /= np.where(lengths > 0, lengths, 1.0)[:, np.newaxis]
+
+        return self._tri_edge_normals
+
+    def corner_angles(self):
+        """
+
+        Get the angle at each triangle corner
+
+        :return: n_tris x 3 angles in radians
+        :rtype: numpy.ndarray
+        """
+
+        self._triangle_cotangents()
+
+        return self._operators["angles"]
+
+    def face_normals(self):
+        """
+
+        Get the polygon normals, the area weighted average of each face's triangle normals
+
+        :return: face normals
+        :rtype: numpy.ndarray
+        """
+
+        if self._face_normals is None:
+            area_normals = self.triangle_normals() * self.triangle_areas()[:, np.newaxis]
+
+            self._face_normals = normalized(accumulate(self.triangle_faces(), area_normals, self.num_faces))
+
+        return self._face_normals
+
+    def _triangle_tangent_weights(self, uv_set=None):
+        """
+
+        Get the weights that turn each triangle's two edges from corner 0 into its uv tangent and bitangent.
+        They only depend on the uvs so they are kept while the points move, triangles without uvs or with
+        degenerate uvs get zero weights
+
+        :param uv_set: map to use
+        :return: n_tris x 4 weights, tangent = edge_a * w0 + edge_b * w1, bitangent = edge_a * w2 + edge_b * w3
+        :rtype: numpy.ndarray
+        """
+
+        uv_set = self._resolve_uv_set(uv_set)
+
+        if uv_set not in self._tangent_weights:
+            tri_uvs = self.face_vert_uvs(uv_set=uv_set)[self.triangle_face_verts()]
+
+            uv_a = tri_uvs[:, 1] - tri_uvs[:, 0]
+            uv_b = tri_uvs[:, 2] - tri_uvs[:, 0]
+
+            det = uv_a[:, 0] * uv_b[:, 1] - uv_b[:, 0] * uv_a[:, 1]
+            valid = np.isfinite(det) & (np.abs(det) > 1e-20)
+
+            weights = np.stack([uv_b[:, 1], -uv_a[:, 1], -uv_b[:, 0], uv_a[:, 0]], axis=1)
+            weights[valid] /= det[valid, np.newaxis]
+            weights[~valid] = 0.0
+
+            self._tangent_weights[uv_set] = weights
+
+        return self._tangent_weights[uv_set]
+
+    def _triangle_tangents(self, uv_set=None):
+        """
+
+        Get the unit uv tangent and bitangent of each triangle side by side
+
+        :param uv_set: map to use
+        :return: n_tris x 6 tangents and bitangents
+        :rtype: numpy.ndarray
+        """
+
+        weights = self._triangle_tangent_weights(uv_set=uv_set)
+        edge_vectors = self.triangle_edge_vectors().reshape(-1, 3, 3)
+
+        # corner 0 to corners 1 and 2
+        edge_a = -edge_vectors[:, 0]
+        edge_b = edge_vectors[:, 2]
+
+        tri_tangents = np.empty((self.num_triangles, 6))
+        tri_tangents[:, :3] = edge_a * weights[:, :1] + edge_b * weights[:, 1:2]
+        tri_tangents[:, 3:] = edge_a * weights[:, 2:3] + edge_b * weights[:, 3:]
+
+        return normalized(tri_tangents.reshape(-1, 3)).reshape(-1, 6)
+
+    def tangents(self, uv_set=None, angle_weighted=True):
+        """
+
+        Get the uv tangent and bitangent at each vertex, the directions u and v increase in across the surface.
+        Each triangle's tangents are averaged onto its verts, triangles without uvs or with degenerate uvs add
+        nothing. The result is not orthonormal, see vertex_frames for that
+
+        :param uv_set: map to use
+        :param angle_weighted: weight by the corner angles rather than the triangle areas
+        :type angle_weighted: bool
+        :return: tangents, bitangents
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        vert_tangents = self._corner_matrix(angle_weighted).dot(self._triangle_tangents(uv_set=uv_set))
+
+        return normalized(vert_tangents[:, :3]), normalized(vert_tangents[:, 3:])
+
+    def vertex_frames(self, uv_set=None, angle_weighted=True, space=None):
+        """
+
+        Get an orthonormal frame at each vertex, the tangent follows u where there are uvs and the bitangent keeps
+        the handedness of the uvs. Verts without usable uvs get an arbitrary tangent perpendicular to the normal.
+        The normal is averaged from the triangle normals, hard edges are ignored
+
+        :param uv_set: map to use
+        :param angle_weighted: weight by the corner angles rather than the triangle areas
+        :type angle_weighted: bool
+        :param space: space to fetch the mesh points in, None uses the last fetched points
+        :return: n_verts x 3 x 3 frames, rows are the tangent, bitangent and normal
+        :rtype: numpy.ndarray
+        """
+
+        if space is not None:
+            self.points(space=space)
+
+        key = (self._resolve_uv_set(uv_set), angle_weighted)
+
+        if key not in self._frames:
+            # normals, tangents and bitangents summed onto the verts in one go
+            tri_vectors = np.hstack([self.triangle_normals(), self._triangle_tangents(uv_set=uv_set)])
+            vert_vectors = self._corner_matrix(angle_weighted).dot(tri_vectors)
+
+            normals = normalized(vert_vectors[:, :3])
+            uv_tangents = normalized(vert_vectors[:, 3:6])
+            uv_bitangents = vert_vectors[:, 6:]
+
+            tangents = uv_tangents - normals * np.einsum("ij,ij->i", normals, uv_tangents)[:, np.newaxis]
+            missing = np.einsum("ij,ij->i", tangents, tangents) < 1e-16
+
+            # fall back to the world axis least aligned with the normal
+            missing_normals = normals[missing]
+            fallback = np.eye(3)[np.argmin(np.abs(missing_normals), axis=1)]
+
+            tangents[missing] = fallback - missing_normals * np.einsum("ij,ij->i", missing_normals,
+                                                                       fallback)[:, np.newaxis]
+
+            tangents = normalized(tangents)
+            bitangents = cross(normals, tangents)
+
+            # keep mirrored uvs mirrored
+            flipped = np.einsum("ij,ij->i", bitangents, uv_bitangents) < 0
+            bitangents[flipped] *= -1.0
+
+            self._frames[key] = np.stack([tangents, bitangents, normals], axis=1)
+
+        return self._frames[key]
+
+    def closest_bvh(self):
+        """
+
+        Get the bounding volume hierarchy of the triangles, shared by the closest point and ray queries
+
+        :return: triangle bvh
+        :rtype: TriangleBvh
+        """
+
+        if self._points is None:
+            self.points()
+
+        if self._bvh is None:
+            self._bvh = TriangleBvh(self._points, self.triangle_verts())
+
+        return self._bvh
+
+    def _surface_data(self, tri_ids, bary, uv_set=None, get_uvs=True):
+        """
+
+        Get the face, triangle within the face, triangle verts and uv for points given as triangle ids and
+        barycentric co-ords
+
+        :param tri_ids: triangle ids
+        :param bary: n x 3 barycentric co-ords
+        :param uv_set: map to use
+        :param get_uvs: interpolate the uvs
+        :return: face id, triangle within the face, triangle vert ids, barycentric co-ords and uv for each point
+        :rtype: dict
+        """
+
+        faces = self.triangle_faces()[tri_ids]
+
+        # maya numbers triangles within each face
+        face_first_tri = np.cumsum(self._tri_counts) - self._tri_counts
+
+        out_data = {"face": faces,
+                    "triangle": tri_ids - face_first_tri[faces],
+                    "tri_ids": self.triangle_verts()[tri_ids],
+                    "bary": bary,
+                    "uv": None}
+
+        if get_uvs:
+            tri_uvs = self.face_vert_uvs(uv_set=uv_set)[self.triangle_face_verts()[tri_ids]]
+
+            out_data["uv"] = np.einsum("ijk,ij->ik", tri_uvs, bary)
+
+        return out_data
+
+    def point_on_mesh(self, points, uv_set=None, space=None, get_uvs=True):
+        """
+
+        Get all the information about the point on mesh closest to each of the given points
+
+        :param points: n x 3 points to test
+        :type points: numpy.ndarray
+        :param uv_set: map to use
+        :param space: space to fetch the mesh points in, None uses the last fetched points
+        :param get_uvs: interpolate the uvs at the closest points
+        :type get_uvs: bool
+        :return: closest point, distance, face id, triangle within the face, triangle vert ids, barycentric
+                 co-ords and uv for each point
+        :rtype: dict
+        """
+
+        if space is not None:
+            self.points(space=space)
+
+        closest, tri_ids, bary, distance = self.closest_bvh().closest_points(points)
+
+        out_data = self._surface_data(tri_ids, bary, uv_set=uv_set, get_uvs=get_uvs)
+        out_data["point"] = closest
+        out_data["distance"] = distance
+
+        return out_data
+
+    def intersect_rays(self, origins, directions, max_distance=None, both_sides=True, uv_set=None, space=None,
+                       get_uvs=False):
+        """
+
+        Get every intersection of the given rays with the mesh, sorted by ray and then by distance
+
+        :param origins: n x 3 ray origins
+        :type origins: numpy.ndarray
+        :param directions: n x 3 ray directions
+        :type directions: numpy.ndarray
+        :param max_distance: furthest distance to look for hits along each ray, None is unlimited
+        :param both_sides: hit faces pointing away from the rays too
+        :type both_sides: bool
+        :param uv_set: map to use
+        :param space: space to fetch the mesh points in, None uses the last fetched points
+        :param get_uvs: interpolate the uvs at the hits
+        :type get_uvs: bool
+        :return: ray id, hit point, distance, face id, triangle within the face, triangle vert ids, barycentric
+                 co-ords and uv for each hit
+        :rtype: dict
+        """
+
+        if space is not None:
+            self.points(space=space)
+
+        ray_ids, tri_ids, distance, bary = self.closest_bvh().intersect_rays(origins, directions,
+                                                                            max_distance=max_distance,
+                                                                            both_sides=both_sides)
+
+        out_data = self._surface_data(tri_ids, bary, uv_set=uv_set, get_uvs=get_uvs)
+        out_data["ray"] = ray_ids
+        out_data["point"] = np.einsum("ijk,ij->ik", self._points[out_data["tri_ids"]], bary)
+        out_data["distance"] = distance
+
+        return out_data
+
+    def closest_intersections(self, origins, directions, max_distance=None, both_sides=True, uv_set=None,
+                              space=None, get_uvs=False):
+        """
+
+        Get the first intersection of each ray with the mesh, like maya's closestIntersection for many rays at
+        once. Rays that miss have a hit of False, a face of -1 and nan points
+
+        :param origins: n x 3 ray origins
+        :type origins: numpy.ndarray
+        :param directions: n x 3 ray directions
+        :type directions: numpy.ndarray
+        :param max_distance: furthest distance to look for hits along each ray, None is unlimited
+        :param both_sides: hit faces pointing away from the rays too
+        :type both_sides: bool
+        :param uv_set: map to use
+        :param space: space to fetch the mesh points in, None uses the last fetched points
+        :param get_uvs: interpolate the uvs at the hits
+        :type get_uvs: bool
+        :return: hit, hit point, distance, face id, triangle within the face, triangle vert ids, barycentric
+                 co-ords and uv for each ray
+        :rtype: dict
+        """
+
+        if space is not None:
+            self.points(space=space)
+
+        tri_ids, distance, bary = self.closest_bvh().first_hits(origins, directions, max_distance=max_distance,
+                                                                both_sides=both_sides)
+
+        hit = tri_ids > -1
+
+        out_data = self._surface_data(np.where(hit, tri_ids, 0), bary, uv_set=uv_set, get_uvs=get_uvs)
+        out_data["hit"] = hit
+        out_data["point"] = np.einsum("ijk,ij->ik", self._points[out_data["tri_ids"]], bary)
+        out_data["distance"] = distance
+
+        out_data["face"][~hit] = -1
+        out_data["triangle"][~hit] = -1
+        out_data["tri_ids"][~hit] = -1
+        out_data["point"][~hit] = np.nan
+
+        if get_uvs:
+            out_data["uv"][~hit] = np.nan
+
+        return out_data
+
+    def intersection_counts(self, origins, directions, max_distance=None, both_sides=True, space=None):
+        """
+
+        Get the number of times each ray crosses the mesh, odd counts from a closed mesh mean the origin is
+        inside
+
+        :param origins: n x 3 ray origins
+        :type origins: numpy.ndarray
+        :param directions: n x 3 ray directions
+        :type directions: numpy.ndarray
+        :param max_distance: furthest distance to look for hits along each ray, None is unlimited
+        :param both_sides: count faces pointing away from the rays too
+        :type both_sides: bool
+        :param space: space to fetch the mesh points in, None uses the last fetched points
+        :return: hit counts
+        :rtype: numpy.ndarray
+        """
+
+        if space is not None:
+            self.points(space=space)
+
+        return self.closest_bvh().hit_counts(origins, directions, max_distance=max_distance, both_sides=both_sides)
+
+    def winding_numbers(self, points, accuracy=2.0, space=None):
+        """
+
+        Get the generalized winding number of the mesh around each point, about 1 inside and 0 outside. Unlike
+        counting ray crossings it degrades smoothly on meshes with holes or overlaps
+
+        :param points: n x 3 points to test
+        :type points: numpy.ndarray
+        :param accuracy: distance in bvh node radii beyond which a node is approximated, higher is more exact
+        :type accuracy: float
+        :param space: space to fetch the mesh points in, None uses the last fetched points
+        :return: winding numbers
+        :rtype: numpy.ndarray
+        """
+
+        if space is not None:
+            self.points(space=space)
+
+        return self.closest_bvh().winding_numbers(points, accuracy=accuracy)
+
+    def inside_mesh(self, points, threshold=0.5, accuracy=2.0, space=None):
+        """
+
+        Find which points are inside the mesh, from their winding numbers
+
+        :param points: n x 3 points to test
+        :type points: numpy.ndarray
+        :param threshold: winding number above which a point counts as inside
+        :type threshold: float
+        :param accuracy: distance in bvh node radii beyond which a node is approximated, higher is more exact
+        :type accuracy: float
+        :param space: space to fetch the mesh points in, None uses the last fetched points
+        :return: n bools
+        :rtype: numpy.ndarray
+        """
+
+        return self.winding_numbers(points, accuracy=accuracy, space=space) > threshold
+
+    def get_neighbour_verts(self, vert_ids):
+        """
+
+        Get the neighbour verts of verts
+
+        :param vert_ids: verts to start with
+        :type vert_ids: list[int]
+        :return: list of neighbour ids
+        :rtype: list[int]
+        """
+
+        neighbour_vids = np.unique(self.vert_connectivity_matrix()[list(vert_ids)].indices)
+
+        return np.setdiff1d(neighbour_vids, vert_ids).tolist()
+
+    def _face_data_edges(self):
+        """
+
+        Number the edges from the face data, edges are the unique sorted vert pairs of each face vertex and the
+        next vertex around its face sorted by their low vert then their high vert. Anything that doesn't hand edge
+        ids back uses these, so a host never has to be asked for its edge order just to find connections
+
+        :return: vert ids for each edge, edge id of each face vertex
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        if self._face_data_edge_verts is None:
+            def build():
+                _, face_verts = self.polygons()
+
+                next_verts = face_verts[self.face_vert_next()]
+
+                low = np.minimum(face_verts, next_verts)
+                high = np.maximum(face_verts, next_verts)
+
+                _, first, face_vert_edges = np.unique(low * self.num_verts + high, return_index=True,
+                                                      return_inverse=True)
+
+                return {"edge_verts": np.stack([low[first], high[first]], axis=1),
+                        "face_vert_edges": face_vert_edges.ravel()}
+
+            arrays = self._disk_cached("edges_face", build)
+
+            self._face_data_edge_verts = arrays["edge_verts"]
+            self._face_data_vert_edges = arrays["face_vert_edges"]
+
+        return self._face_data_edge_verts, self._face_data_vert_edges
+
+    def _face_edges(self):
+        """
+
+        Get the edges in the host's edge order, the face data order when there is no host
+
+        :return: vert ids for each edge, edge id of each face vertex
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        if self._edge_verts is None:
+            if self._edge_source() == "face":
+                arrays = dict(zip(("edge_verts", "face_vert_edges"), self._face_data_edges()))
+            else:
+                arrays = self._disk_cached("edges_{0}".format(self._edge_source()), self._build_face_edges)
+
+            self._edge_verts = arrays["edge_verts"]
+            self._face_vert_edges = arrays["face_vert_edges"]
+
+        return self._edge_verts, self._face_vert_edges
+
+    def _build_face_edges(self):
+        """
+
+        Renumber the face data edges to match the host's edge order
+
+        :return: edge_verts and face_vert_edges arrays
+        :rtype: dict
+        """
+
+        edge_verts, face_vert_edges = self._face_data_edges()
+
+        # the face data edges are sorted by the same key, so the host edges can be looked up in them
+        keys = edge_verts[:, 0] * self.num_verts + edge_verts[:, 1]
+
+        host_edges = np.sort(np.asarray(self._fetch_edges(), dtype=np.int64).reshape(-1, 2), axis=1)
+        host_ids = np.searchsorted(keys, host_edges[:, 0] * self.num_verts + host_edges[:, 1])
+
+        to_host = np.empty(len(keys), dtype=np.int64)
+        to_host[host_ids] = np.arange(len(host_ids))
+
+        return {"edge_verts": host_edges, "face_vert_edges": to_host[face_vert_edges]}
+
+    def edge_vert_list(self):
+        """
+
+        Get a list of the vert ids for each edge
+
+        :return: numpy.ndarray
+        """
+
+        if self._edge_vert_list is None:
+            self._edge_vert_list, _ = self._face_edges()
+
+        return self._edge_vert_list
+
+    def half_edges(self):
+        """
+
+        Get the half edge structure of the mesh, for edge loops, rings, boundary loops and opposite edges. Its
+        edge ids match edge_vert_list
+
+        :return: half edges
+        :rtype: HalfEdges
+        """
+
+        if self._half_edges is None:
+            if self._edge_source() == "face":
+                self._half_edges = self._topology_half_edges()
+            else:
+                face_counts, face_verts = self.polygons()
+
+                self._half_edges = HalfEdges(face_counts, face_verts, face_vert_edges=self._face_edges()[1])
+
+        return self._half_edges
+
+    def _topology_half_edges(self):
+        """
+
+        Get the half edge structure numbered by the face data edges, for walks that don't hand edge ids back
+
+        :return: half edges
+        :rtype: HalfEdges
+        """
+
+        if self._face_data_half_edges is None:
+            face_counts, face_verts = self.polygons()
+
+            self._face_data_half_edges = HalfEdges(face_counts, face_verts,
+                                                   face_vert_edges=self._face_data_edges()[1])
+
+        return self._face_data_half_edges
+
+    def rivet_edges(self, points, space=None):
+        """
+
+        Get a pair of edges facing each other across the face closest to each point, for building rivets from
+        two curves lofted between them
+
+        :param points: n x 3 points
+        :type points: numpy.ndarray
+        :param space: space to fetch the mesh points in, None uses the last fetched points
+        :return: n x 2 edge ids
+        :rtype: numpy.ndarray
+        """
+
+        faces = self.point_on_mesh(np.asarray(points, dtype=np.float64).reshape(-1, 3), space=space,
+                                   get_uvs=False)["face"]
+
+        return self.half_edges().face_edge_pairs(faces)
+
+    def _build_adjacency(self):
+        """
+
+        Get the vert and face adjacency matrices, from the disk cache when there is one. They don't depend on the
+        edge order so they are built from the face data edges
+
+        """
+
+        arrays = self._disk_cached("adjacency", self._adjacency_arrays)
+
+        self._vert_con_matrix = arrays_to_sparse(arrays, "vert_vert")
+        self._vert_face_matrix = arrays_to_sparse(arrays, "vert_face")
+        self._face_con_matrix = arrays_to_sparse(arrays, "face_face")
+
+    def _build_edge_adjacency(self):
+        """
+
+        Get the matrices with a row per edge, in the host's edge order
+
+        """
+
+        arrays = self._disk_cached("edge_adjacency_{0}".format(self._edge_source()), self._edge_adjacency_arrays)
+
+        self._edge_face_matrix = arrays_to_sparse(arrays, "edge_face")
+        self._edge_con_matrix = arrays_to_sparse(arrays, "edge_vert")
+
+    def _edge_face(self, edge_verts, face_vert_edges):
+        """
+
+        Build the edge face matrix for the given edge numbering
+
+        :param edge_verts: vert ids for each edge
+        :param face_vert_edges: edge id of each face vertex
+        :return: n_edges x n_faces matrix with a 1 for each face using an edge
+        :rtype: scipy.sparse.csr_matrix
+        """
+
+        ones = np.ones(len(face_vert_edges), dtype=np.int8)
+
+        edge_face = csr_matrix((ones, (face_vert_edges, self.face_vert_faces())),
+                               shape=(len(edge_verts), self.num_faces))
+
+        # faces that come back round to the same edge would count twice
+        edge_face.data[:] = 1
+
+        return edge_face
+
+    def _adjacency_arrays(self):
+        """
+
+        Build the vert and face adjacency matrices in one pass over the face vertex arrays, every matrix is a csr
+        matrix with a 1 for each connection
+
+        :return: the matrices split into arrays
+        :rtype: dict
+        """
+
+        _, face_verts = self.polygons()
+        edge_verts, face_vert_edges = self._face_data_edges()
+
+        num_verts = self.num_verts
+        num_faces = self.num_faces
+
+        vert_face = csr_matrix((np.ones(len(face_verts), dtype=np.int8), (face_verts, self.face_vert_faces())),
+                               shape=(num_verts, num_faces))
+
+        # faces that come back round to the same vert would count twice
+        vert_face.data[:] = 1
+
+        row = np.concatenate([edge_verts[:, 0], edge_verts[:, 1]])
+        col = np.concatenate([edge_verts[:, 1], edge_verts[:, 0]])
+
+        vert_vert = csr_matrix((np.ones(len(row), dtype=np.int8), (row, col)), shape=(num_verts, num_verts))
+        vert_vert.data[:] = 1
+
+        # faces sharing an edge, without each face's link to itself
+        edge_face = self._edge_face(edge_verts, face_vert_edges)
+
+        face_face = (edge_face.T.astype(np.int32) * edge_face).tocoo()
+        off_diagonal = face_face.row != face_face.col
+
+        face_face = csr_matrix((np.ones(off_diagonal.sum(), dtype=np.int8),
+                                (face_face.row[off_diagonal], face_face.col[off_diagonal])),
+                               shape=(num_faces, num_faces))
+
+        arrays = {}
+
+        for prefix, matrix in (("vert_vert", vert_vert), ("vert_face", vert_face), ("face_face", face_face)):
+            arrays.update(sparse_to_arrays(matrix, prefix))
+
+        return arrays
+
+    def _edge_adjacency_arrays(self):
+        """
+
+        Build the edge face and edge vert matrices in the host's edge order
+
+        :return: the matrices split into arrays
+        :rtype: dict
+        """
+
+        edge_verts, face_vert_edges = self._face_edges()
+        num_edges = len(edge_verts)
+
+        edge_row = np.repeat(np.arange(num_edges), 2)
+        edge_data = np.tile(np.array([-1, 1], dtype=np.int8), num_edges)
+
+        edge_vert = csr_matrix((edge_data, (edge_row, edge_verts.ravel())), shape=(num_edges, self.num_verts))
+
+        arrays = sparse_to_arrays(self._edge_face(edge_verts, face_vert_edges), "edge_face")
+        arrays.update(sparse_to_arrays(edge_vert, "edge_vert"))
+
+        return arrays
+
+    def edge_connectivity_matrix(self):
+        """
+
+        Get the edge vert incidence matrix for this mesh, n_edges x n_verts with -1 at the first vert of each edge
+        and 1 at the second, so multiplying per vert values gives their difference along each edge
+
+        :return: scipy.sparse.csr_matrix
+        """
+
+        if self._edge_con_matrix is None:
+            self._build_edge_adjacency()
+
+        return self._edge_con_matrix
+
+    def vert_connectivity_matrix(self):
+        """
+
+        get the vert connectivity matrix, n_verts x n_verts with a 1 for each pair of verts sharing an edge
+
+        :return: scipy.sparse.csr_matrix
+        """
+
+        if self._vert_con_matrix is None:
+            self._build_adjacency()
+
+        return self._vert_con_matrix
+
+    def vert_face_matrix(self):
+        """
+
+        get the vert face matrix, n_verts x n_faces with a 1 for each face using a vert
+
+        :return: scipy.sparse.csr_matrix
+        """
+
+        if self._vert_face_matrix is None:
+            self._build_adjacency()
+
+        return self._vert_face_matrix
+
+    def edge_face_matrix(self):
+        """
+
+        get the edge face matrix, n_edges x n_faces with a 1 for each face using an edge
+
+        :return: scipy.sparse.csr_matrix
+        """
+
+        if self._edge_face_matrix is None:
+            self._build_edge_adjacency()
+
+        return self._edge_face_matrix
+
+    def face_connectivity_matrix(self):
+        """
+
+        get the face connectivity matrix, n_faces x n_faces with a 1 for each pair of faces sharing an edge
+
+        :return: scipy.sparse.csr_matrix
+        """
+
+        if self._face_con_matrix is None:
+            self._build_adjacency()
+
+        return self._face_con_matrix
+
+    def vert_pieces(self):
+        """
+
+        Get which connected piece of the mesh each vert belongs to
+
+        :return: piece id of each vert
+        :rtype: numpy.ndarray
+        """
+
+        if self._vert_pieces is None:
+            def build():
+                return {"pieces": connected_components(self.vert_connectivity_matrix(), directed=False)[1]}
+
+            self._vert_pieces = self._disk_cached("vert_pieces", build)["pieces"]
+
+        return self._vert_pieces
+
+    @property
+    def num_edges(self):
+        """
+
+        get the number of edges
+
+        :return: number of edges
+        :rtype: int
+        """
+
+        return len(self._face_data_edges()[0])
+
+    @property
+    def num_verts(self):
+        """
+
+        get the number of verts
+
+        :return: number of verts
+        :rtype: int
+        """
+
+        if self._points is None:
+            self.points()
+
+        return len(self._points)
+
+    @property
+    def num_faces(self):
+        """
+
+        get the number of faces
+
+        :return: number of faces
+        :rtype: int
+        """
+
+        face_counts, _ = self.polygons()
+
+        return len(face_counts)
+
+    @property
+    def num_triangles(self):
+        """
+
+        Get the number of triangles
+
+        :return: number of triangles
+        :rtype: int
+        """
+
+        if not self._num_triangles:
+            self.triangles()
+
+        return self._num_triangles
+
+    def vert_ring_sources(self, seed_sets, mask=None, max_ring=None):
+        """
+
+        Breadth first march out from several sets of seed verts at once. Each vert gets the number of edges to
+        the nearest seed and which seed set got there first, ties go to the earlier set
+
+        :param seed_sets: lists of vert ids to start from
+        :type seed_sets: list[list[int]]
+        :param mask: n_verts bools, only march through verts that are True
+        :type mask: numpy.ndarray
+        :param max_ring: stop after this many rings
+        :type max_ring: int
+        :return: ring of each vert and the seed set it came from, -1 for verts that weren't reached
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        con = self.vert_connectivity_matrix()
+
+        rings = np.full(self.num_verts, -1, dtype=np.int64)
+        sources = np.full(self.num_verts, -1, dtype=np.int64)
+
+        # earlier sets claim shared seeds
+        for set_id in range(len(seed_sets) - 1, -1, -1):
+            seeds = np.asarray(seed_sets[set_id], dtype=np.int64)
+
+            rings[seeds] = 0
+            sources[seeds] = set_id
+
+        frontier = np.flatnonzero(rings == 0)
+        ring = 0
+
+        while len(frontier) and (max_ring is None or ring < max_ring):
+            ring += 1
+
+            neighbours, parents = csr_row_indices(con, frontier)
+
+            new = rings[neighbours] < 0
+
+            if mask is not None:
+                new &= mask[neighbours]
+
+            neighbours = neighbours[new]
+            neighbour_sources = sources[parents[new]]
+
+            # first come first served in seed set order
+            order = np.argsort(neighbour_sources, kind="stable")
+            frontier, first = np.unique(neighbours[order], return_index=True)
+
+            rings[frontier] = ring
+            sources[frontier] = neighbour_sources[order][first]
+
+        return rings, sources
+
+    def vert_rings(self, start_vert_ids, mask=None, max_ring=None):
+        """
+
+        Get the number of edges from start_vert_ids to every vert, the hop distance or ring each vert is in
+
+        :param start_vert_ids: verts to start from
+        :type start_vert_ids: list[int]
+        :param mask: n_verts bools, only march through verts that are True
+        :type mask: numpy.ndarray
+        :param max_ring: stop after this many rings
+        :type max_ring: int
+        :return: ring of each vert, -1 for verts that weren't reached
+        :rtype: numpy.ndarray
+        """
+
+        rings, _ = self.vert_ring_sources([start_vert_ids], mask=mask, max_ring=max_ring)
+
+        return rings
+
+    @staticmethod
+    def ring_levels(rings):
+        """
+
+        Group vert ids by ring
+
+        :param rings: ring of each vert, from vert_rings
+        :type rings: numpy.ndarray
+        :return: vert ids in each ring
+        :rtype: list[numpy.ndarray]
+        """
+
+        reached = np.flatnonzero(rings > -1)
+        order = reached[np.argsort(rings[reached], kind="stable")]
+
+        counts = np.bincount(rings[reached])
+
+        return np.split(order, np.cumsum(counts)[:-1])
+
+    def march_vert_array(self, start_vert_ids, mask=None):
+        """
+
+        Build an array of verts that "march" down the mesh from start_vert_ids, one list of verts per ring
+
+        :param start_vert_ids: verts to start from
+        :type start_vert_ids: list[int]
+        :param mask: n_verts bools, only march through verts that are True
+        :type mask: numpy.ndarray
+        :return: list[list[int]]
+        """
+
+        return [level.tolist() for level in self.ring_levels(self.vert_rings(start_vert_ids, mask=mask))]
+
+    def _triangle_cotangents(self):
+        """
+
+        Get the cotangent of each triangle corner and each triangle's area from the triangle edge vectors
+
+        :return: n_tris x 3 cotangents, triangle areas
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        if "cotangents" not in self._operators:
+            edge_vectors = self.triangle_edge_vectors()
+            lengths_sq = np.einsum("ij,ij->i", edge_vectors, edge_vectors).reshape(-1, 3)
+
+            # corner k sits between -e[k] and e[k + 2], as the edges sum to zero their dot product follows from
+            # the edge lengths and the cross product of the two is the same for every corner
+            dot = (lengths_sq + lengths_sq[:, [2, 0, 1]] - lengths_sq[:, [1, 2, 0]]) * 0.5
+            cross_length = self.triangle_areas()[:, np.newaxis] * 2.0
+
+            self._operators["cotangents"] = dot / np.maximum(cross_length, 1e-30)
+            self._operators["angles"] = np.arctan2(cross_length, dot)
+
+        return self._operators["cotangents"], self.triangle_areas()
+
+    def triangle_areas(self):
+        """
+
+        Get the area of each triangle
+
+        :return: triangle areas
+        :rtype: numpy.ndarray
+        """
+
+        if self._tri_areas is None:
+            self.triangle_normals()
+
+        return self._tri_areas
+
+    def _get_operator_pattern(self):
+        """
+
+        Get the csr layout shared by the cotangent laplacian and the full mass matrix, every triangle edge both
+        ways plus the diagonal. Each triangle edge (the edge opposite each corner) adds four values, to (a, b),
+        (b, a), (a, a) and (b, b), and the slot of each in the csr data is kept so new weights just get summed
+        into place when the points move
+
+        :return: indptr, indices, data slot of each edge value
+        :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray
+        """
+
+        if self._operator_pattern is None:
+            arrays = self._disk_cached("operator_pattern_{0}".format(self._triangle_source()),
+                                       self._operator_pattern_arrays)
+
+            self._operator_pattern = arrays["indptr"], arrays["indices"], arrays["slots"]
+
+        return self._operator_pattern
+
+    def _operator_pattern_arrays(self):
+        """
+
+        Build the shared operator layout, see _get_operator_pattern
+
+        :return: indptr, indices and slots arrays
+        :rtype: dict
+        """
+
+        tris = self.triangle_verts()
+        num_verts = self.num_verts
+
+        vert_a = tris[:, [1, 2, 0]].ravel()
+        vert_b = tris[:, [2, 0, 1]].ravel()
+        diagonal = np.arange(num_verts)
+
+        row = np.concatenate([vert_a, vert_b, vert_a, vert_b, diagonal])
+        col = np.concatenate([vert_b, vert_a, vert_a, vert_b, diagonal])
+
+        unique_keys, slots = np.unique(row * num_verts + col, return_inverse=True)
+
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(unique_keys // num_verts, minlength=num_verts))])
+
+        return {"indptr": indptr, "indices": unique_keys % num_verts, "slots": slots.ravel()[:-num_verts]}
+
+    def _pattern_matrix(self, edge_values):
+        """
+
+        Sum per triangle edge values into the shared operator layout
+
+        :param edge_values: n_tris * 3 x 4 values for (a, b), (b, a), (a, a) and (b, b) of each edge
+        :return: sparse matrix
+        :rtype: scipy.sparse.csr_matrix
+        """
+
+        indptr, indices, slots = self._get_operator_pattern()
+
+        data = np.bincount(slots, edge_values.T.ravel(), minlength=len(indices))
+
+        return csr_matrix((data, indices, indptr), shape=(self.num_verts, self.num_verts))
+
+    def cotangent_laplacian(self):
+        """
+
+        Get the cotangent laplacian, positive semi definite (diagonal minus weights) with half the sum of the
+        cotangents opposite each edge as its weight
+
+        :return: laplacian
+        :rtype: scipy.sparse.csr_matrix
+        """
+
+        if "cotangent_laplacian" not in self._operators:
+            cot, _ = self._triangle_cotangents()
+
+            # corner k's cotangent weights the edge opposite it. The weights depend on the points so they are
+            # summed into the disk cached layout in memory rather than stored for every pose
+            weights = cot.ravel() * 0.5
+
+            self._operators["cotangent_laplacian"] = self._pattern_matrix(np.stack([-weights, -weights, weights,
+                                                                                    weights], axis=1))
+
+        return self._operators["cotangent_laplacian"]
+
+    def uniform_laplacian(self):
+        """
+
+        Get the uniform (graph) laplacian over the mesh edges, vert valence on the diagonal and -1 for each
+        neighbour. It only depends on the topology so survives the points moving
+
+        :return: laplacian
+        :rtype: scipy.sparse.csr_matrix
+        """
+
+        if self._uniform_laplacian is None:
+            def build():
+                con = self.vert_connectivity_matrix().astype(np.float64)
+
+                return sparse_to_arrays(diags(np.asarray(con.sum(axis=1)).ravel()) - con, "laplacian")
+
+            self._uniform_laplacian = arrays_to_sparse(self._disk_cached("uniform_laplacian", build), "laplacian")
+
+        return self._uniform_laplacian
+
+    def mass_matrix(self, lumped=True):
+        """
+
+        Get the mass matrix, lumped gives a diagonal of a third of the area around each vert, otherwise the full
+        linear finite element mass matrix
+
+        :param lumped: get the lumped diagonal matrix
+        :type lumped: bool
+        :return: mass matrix
+        :rtype: scipy.sparse.csr_matrix
+        """
+
+        key = "lumped_mass" if lumped else "full_mass"
+
+        if key not in self._operators:
+            areas = self.triangle_areas()
+
+            if lumped:
+                vert_areas = np.bincount(self.triangle_verts().ravel(), np.repeat(areas / 3.0, 3),
+                                         minlength=self.num_verts)
+
+                self._operators[key] = diags(vert_areas).tocsr()
+
+            else:
+                # each corner is in two of its triangle's edges so gets area / 6 on the diagonal
+                edge_areas = np.repeat(areas / 12.0, 3)
+
+                self._operators[key] = self._pattern_matrix(np.stack([edge_areas] * 4, axis=1))
+
+        return self._operators[key]
+
+    def _heat_method(self):
+        """
+
+        Get the cached heat method factorizations. They are kept with the topology rather than the points. Moving,
+        rotating or uniformly scaling the mesh leaves the cotangents as they were, so the factorizations still
+        hold and only a change of shape has them made again
+
+        :return: cache dict
+        :rtype: dict
+        """
+
+        if self._points is None:
+            self.points()
+
+        heat_method = self._heat_solvers
+
+        if heat_method is not None and heat_method["geometry_key"] != self._geometry_key:
+            cot, areas = self._triangle_cotangents()
+
+            scale = areas.sum() / max(heat_method["areas"].sum(), 1e-300)
+
+            if np.allclose(cot, heat_method["cotangents"], rtol=1e-5, atol=1e-8) and \
+                    np.allclose(areas, heat_method["areas"] * scale, rtol=1e-5, atol=1e-12 * areas.max()):
+                heat_method["geometry_key"] = self._geometry_key
+            else:
+                self._heat_solvers = None
+
+        if self._heat_solvers is None:
+            laplacian = self.cotangent_laplacian()
+            mass = self.mass_matrix()
+
+            cot, areas = self._triangle_cotangents()
+
+            # a small mass term pins the constant null space of the laplacian
+            regular = 1e-10 * mass.diagonal().mean()
+
+            self._heat_solvers = {"geometry_key": self._geometry_key,
+                                  "cotangents": np.array(cot),
+                                  "areas": np.array(areas),
+                                  "laplacian": laplacian,
+                                  "mass": mass,
+                                  "poisson": factorize(laplacian + regular * mass),
+                                  "edge_length_sq": np.mean(self.triangle_edge_lengths()) ** 2,
+                                  "heat": {}}
+
+        return self._heat_solvers
+
+    def _heat_solver(self, time_scale):
+        """
+
+        Get the factorized heat flow system for the given time step. A uniformly scaled mesh scales the whole
+        system, which leaves the direction of the heat gradient as it was
+
+        :param time_scale: multiplier on the mean edge length squared
+        :return: heat solver
+        """
+
+        heat_method = self._heat_method()
+
+        if time_scale not in heat_method["heat"]:
+            time_step = time_scale * heat_method["edge_length_sq"]
+
+            heat_method["heat"][time_scale] = factorize(heat_method["mass"] + time_step * heat_method["laplacian"])
+
+        return heat_method["heat"][time_scale]
+
+    def gradient_matrix(self):
+        """
+
+        Get the gradient operator, n_tris * 3 x n_verts so multiplying per vert values gives the gradient of each
+        triangle as rows of x, y and z. Each corner adds the gradient of its hat function, the rotated edge
+        opposite it over twice the triangle area. The divergence of a per triangle field is minus its transpose
+        times the field scaled by the triangle areas
+
+        :return: gradient matrix
+        :rtype: scipy.sparse.csr_matrix
+        """
+
+        if "gradient" not in self._operators:
+            tris = self.triangle_verts()
+            edge_vectors = self.triangle_edge_vectors().reshape(-1, 3, 3)
+
+            hat_gradients = cross(np.repeat(self.triangle_normals(), 3, axis=0),
+                                  -edge_vectors[:, [1, 2, 0]].reshape(-1, 3)).reshape(-1, 3, 3)
+            hat_gradients /= np.maximum(self.triangle_areas() * 2.0, 1e-30)[:, np.newaxis, np.newaxis]
+
+            # rows are triangle and axis, each holding the three corners
+            data = hat_gradients.transpose(0, 2, 1).ravel()
+            indices = np.repeat(tris, 3, axis=0).ravel()
+            indptr = np.arange(0, len(data) + 1, 3)
+
+            self._operators["gradient"] = csr_matrix((data, indices, indptr), shape=(len(tris) * 3, self.num_verts))
+
+        return self._operators["gradient"]
+
+    def geodesic_distances(self, source_vert_ids, time_scale=25.0, max_steps=4):
+        """
+
+        Get the geodesic distance from the source verts to every vert with the heat method (Crane et al. 2013).
+        The systems are factorized once for the topology so each new set of sources is two back substitutions,
+        they are only factorized again when the mesh changes shape, see _heat_method.
+
+        A single heat step of a few edge lengths keeps the distances accurate far from the sources, shorter steps
+        pick up the grain of the mesh there. Where the heat still drops below what a double can hold on a very
+        big mesh, the heat flow is run again from the edge of the area it reached with the same factorization
+
+        :param source_vert_ids: verts to measure from
+        :type source_vert_ids: list[int]
+        :param time_scale: multiplier on the heat time step, the mean edge length squared, larger is smoother
+        :type time_scale: float
+        :param max_steps: most heat flow solves
+        :type max_steps: int
+        :return: distance of each vert, inf on pieces of the mesh without a source
+        :rtype: numpy.ndarray
+        """
+
+        heat_method = self._heat_method()
+        heat_solver = self._heat_solver(time_scale)
+
+        source_vert_ids = np.asarray(source_vert_ids, dtype=np.int64)
+
+        gradient_matrix = self.gradient_matrix()
+
+        num_verts = self.num_verts
+        pieces = self.vert_pieces()
+
+        source_pieces = np.zeros(pieces.max() + 1, dtype=bool)
+        source_pieces[pieces[source_vert_ids]] = True
+
+        field = np.zeros((self.num_triangles, 3))
+        todo = None
+
+        source_heat = np.zeros(num_verts)
+        source_heat[source_vert_ids] = 1.0
+
+        for step in range(max_steps):
+            heat = heat_solver.solve(source_heat)
+
+            # unit field pointing away from the sources, brought up to size first so tiny gradients don't underflow
+            gradient = -gradient_matrix.dot(heat).reshape(-1, 3)
+            gradient /= np.maximum(np.abs(gradient).max(axis=1), 1e-300)[:, np.newaxis]
+            gradient /= np.maximum(np.sqrt(np.einsum("ij,ij->i", gradient, gradient)), 1.0)[:, np.newaxis]
+
+            # only where the heat is far enough from underflow for its gradient to have a direction
+            cold = (heat <= 1e-280 * heat.max()) & source_pieces[pieces]
+
+            if todo is None and not cold.any():
+                field = gradient
+                break
+
+            tris = self.triangle_verts()
+
+            if todo is None:
+                todo = source_pieces[pieces[tris[:, 0]]]
+
+            reached = todo & ~cold[tris].any(axis=1)
+
+            if step == max_steps - 1:
+                reached = todo
+
+            field[reached] = gradient[reached]
+            todo &= ~reached
+
+            if not todo.any():
+                break
+
+            # carry on from the verts where the reached triangles meet the rest
+            done = np.zeros(num_verts, dtype=bool)
+            done[tris[~todo].ravel()] = True
+
+            source_heat = np.zeros(num_verts)
+            source_heat[tris[todo].ravel()] = 1.0
+            source_heat *= done
+
+        if todo is None:
+            # triangles on pieces without a source have no direction
+            field *= source_pieces[pieces[self.triangle_verts()[:, 0]]][:, np.newaxis]
+
+        divergence = -gradient_matrix.T.dot((field * self.triangle_areas()[:, np.newaxis]).ravel())
+
+        # each piece of the mesh needs a divergence that sums to zero to be solvable
+        mass = self.mass_matrix().diagonal()
+
+        divergence -= mass * (np.bincount(pieces, divergence) / np.bincount(pieces, mass))[pieces]
+
+        # the laplacian doesn't change with the scale of the mesh, the divergence carries it
+        distances = heat_method["poisson"].solve(-divergence)
+
+        # shift each piece so its sources sit at 0, pieces without sources can't be reached
+        source_min = np.full(len(source_pieces), np.inf)
+        np.minimum.at(source_min, pieces[source_vert_ids], distances[source_vert_ids])
+
+        return distances - source_min[pieces]
+
+    def curvature(self, space=None):
+        """
+
+        Get the discrete curvature at each vert in one pass over the cached triangle and laplacian data. Mean
+        curvature comes from the cotangent laplacian, gaussian curvature from the angle defect, both over the
+        lumped vert areas, and the principal directions from a least squares fit of the normal curvature along
+        each edge. Boundary verts take the average of their interior neighbours since their one ring is cut off.
+        Curvature is positive where the surface bulges out along the normals
+
+        :param space: space to fetch the mesh points in, None uses the last fetched points
+        :return: mean, gaussian, min and max principal curvature, min and max principal directions and concavity,
+                 mean curvature scaled by the local edge length where the surface dips in and zero elsewhere
+        :rtype: dict
+        """
+
+        if space is not None:
+            self.points(space=space)
+
+        if self._curvature is None:
+            points = self._points
+            num_verts = self.num_verts
+
+            normals = normalized(self._corner_normals(True))
+            vert_areas = np.maximum(self.mass_matrix().diagonal(), 1e-30)
+
+            # the laplacian of the points is the mean curvature normal times twice the area
+            mean = np.einsum("ij,ij->i", self.cotangent_laplacian().dot(points), normals) / (2.0 * vert_areas)
+
+            angle_sums = np.bincount(self.triangle_verts().ravel(), self.corner_angles().ravel(), minlength=num_verts)
+            gaussian = (2.0 * np.pi - angle_sums) / vert_areas
+
+            # normal curvature along each edge, from both ends
+            edge_verts, _ = self._face_data_edges()
+            starts = np.concatenate([edge_verts[:, 0], edge_verts[:, 1]])
+            ends = np.concatenate([edge_verts[:, 1], edge_verts[:, 0]])
+
+            vectors = points[ends] - points[starts]
+            squared_lengths = np.maximum(np.einsum("ij,ij->i", vectors, vectors), 1e-30)
+
+            normal_curvatures = -2.0 * np.einsum("ij,ij->i", normals[starts], vectors) / squared_lengths
+
+            # tangent frame from the world axis least aligned with each normal
+            fallback = np.eye(3)[np.argmin(np.abs(normals), axis=1)]
+            tangents = normalized(fallback - normals * np.einsum("ij,ij->i", normals, fallback)[:, np.newaxis])
+            bitangents = cross(normals, tangents)
+
+            u = np.einsum("ij,ij->i", tangents[starts], vectors)
+            v = np.einsum("ij,ij->i", bitangents[starts], vectors)
+            in_plane = np.maximum(u * u + v * v, 1e-30)
+
+            # fit k(u, v) = a u^2 + 2b uv + c v^2 over each one ring
+            rows = np.stack([u * u, 2.0 * u * v, v * v], axis=1) / in_plane[:, np.newaxis]
+
+            normal_matrix = accumulate(starts, (rows[:, :, np.newaxis] * rows[:, np.newaxis]).reshape(-1, 9),
+                                       num_verts).reshape(-1, 3, 3)
+            normal_matrix += np.eye(3) * 1e-9
+
+            rhs = accumulate(starts, rows * normal_curvatures[:, np.newaxis], num_verts)
+            a, b, c = np.linalg.solve(normal_matrix, rhs[:, :, np.newaxis])[:, :, 0].T
+
+            # direction of the largest eigen value of the fitted tensor
+            angle = 0.5 * np.arctan2(2.0 * b, a - c)
+            max_directions = tangents * np.cos(angle)[:, np.newaxis] + bitangents * np.sin(angle)[:, np.newaxis]
+            min_directions = cross(normals, max_directions)
+
+            edge_lengths = np.bincount(starts, np.sqrt(squared_lengths), minlength=num_verts)
+            valence = np.maximum(np.bincount(starts, minlength=num_verts), 1)
+            mean_edge_lengths = edge_lengths / valence
+
+            boundary = self._topology_half_edges().boundary_verts
+            boundary = np.concatenate([boundary, np.zeros(num_verts - len(boundary), dtype=bool)])[:num_verts]
+
+            if boundary.any():
+                interior = csr_matrix(self.vert_connectivity_matrix(), dtype=np.float64)
+                interior = interior.multiply(~boundary[np.newaxis]).tocsr()[boundary]
+
+                counts = np.asarray(interior.sum(axis=1)).ravel()
+                scale = 1.0 / np.maximum(counts, 1.0)
+
+                mean[boundary] = interior.dot(mean) * scale
+                gaussian[boundary] = interior.dot(gaussian) * scale
+
+            spread = np.sqrt(np.maximum(mean * mean - gaussian, 0.0))
+
+            self._curvature = {"mean": mean,
+                               "gaussian": gaussian,
+                               "min": mean - spread,
+                               "max": mean + spread,
+                               "min_direction": min_directions,
+                               "max_direction": max_directions,
+                               "concavity": np.maximum(-mean * mean_edge_lengths, 0.0)}
+
+        return self._curvature
+
+    def decimate(self, target_triangles=None, ratio=0.5, preserve_boundary=True, preserve_uv_seams=True,
+                 uv_set=None, space=None):
+        """
+
+        Build a reduced triangle mesh by quadric error edge collapses, see decimate_triangles. The verts of the
+        reduced mesh are a subset of the source verts so its uvs and weights can be copied straight across, and
+        every source vert gets the reduced triangle and barycentric co-ords it sits closest to for anything that
+        has to follow the reduced mesh
+
+        :param target_triangles: number of triangles to reduce to, None uses the ratio
+        :type target_triangles: int
+        :param ratio: fraction of the triangles to keep when there is no target
+        :type ratio: float
+        :param preserve_boundary: never move verts on open edges
+        :type preserve_boundary: bool
+        :param preserve_uv_seams: never move verts with more than one uv
+        :type preserve_uv_seams: bool
+        :param uv_set: map to carry over, meshes without uvs are reduced without them
+        :param space: space to fetch the mesh points in, None uses the last fetched points
+        :return: reduced mesh, and the source vert of each reduced vert, the source triangle of each reduced
+                 triangle and the reduced triangle and barycentric co-ords of each source vert
+        :rtype: ArrayMesh, dict
+        """
+
+        points = self.points(space=space)
+
+        try:
+            uvs, uv_ids = self.uv_data(uv_set=uv_set)
+            corner_uv_ids = uv_ids[self.triangle_face_verts()]
+        except RuntimeError:  # no uvs to keep
+            uvs = corner_uv_ids = None
+
+        reduced = decimate_triangles(points, self.triangle_verts(), corner_uv_ids=corner_uv_ids,
+                                     target_triangles=target_triangles, ratio=ratio,
+                                     preserve_boundary=preserve_boundary, preserve_uv_seams=preserve_uv_seams)
+
+        source_verts, tris = np.unique(reduced["tris"], return_inverse=True)
+        tris = tris.reshape(-1, 3)
+
+        proxy_uvs = proxy_uv_ids = None
+
+        if uvs is not None:
+            # unmapped corners stay unmapped
+            corner_uv_ids = reduced["corner_uv_ids"]
+            mapped = corner_uv_ids >= 0
+
+            source_uvs, compact_ids = np.unique(corner_uv_ids[mapped], return_inverse=True)
+
+            proxy_uvs = uvs[source_uvs]
+            proxy_uv_ids = np.full(corner_uv_ids.shape, -1, dtype=np.int64)
+            proxy_uv_ids[mapped] = compact_ids.ravel()
+
+        proxy = ArrayMesh.from_triangles(points[source_verts], tris, uvs=proxy_uvs, uv_ids=proxy_uv_ids)
+
+        closest = proxy.point_on_mesh(points, get_uvs=False)
+
+        mapping = {"source_verts": source_verts,
+                   "source_triangles": reduced["source_tris"],
+                   "triangles": closest["face"],
+                   "bary": closest["bary"]}
+
+        return proxy, mapping
+
+    def symmetry_map(self, axis="x", tolerance=None, seed_edge=None, space=None):
+        """
+
+        Get the mirror of each vert across the plane through the origin facing the given axis, so any per vert
+        data can be mirrored with data[mirror_ids].
+
+        Verts are matched to the nearest vert of their mirrored position first. Where that fails, eg. on an
+        asymmetric sculpt, the match is carried over from the matched faces by walking the topology edge by edge,
+        as the winding flips in the mirror each face vertex running u to v matches the one running v' to u'.
+        seed_edge lets the walk start from an edge on the symmetry line when nothing matches by position
+
+        :param axis: x, y, z or 0, 1, 2
+        :param tolerance: furthest a mirrored vert can be from its match, defaults to a tenth of the mean edge
+                          length
+        :type tolerance: float
+        :param seed_edge: id of an edge on the symmetry line that mirrors onto itself
+        :type seed_edge: int
+        :param space: space to fetch the mesh points in, None uses the last fetched points
+        :return: mirror vert ids (unmatched verts map to themselves), confidence - 1 for an exact match, falling
+                 to 0 at the tolerance, 0.5 for verts matched by the walk and 0 for unmatched verts
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        if space is not None or self._points is None:
+            self.points(space=space)
+
+        axis = "xyz".index(axis) if axis in ("x", "y", "z") else int(axis)
+        key = (axis, tolerance, seed_edge)
+
+        if key not in self._symmetry:
+            def build():
+                mirror_ids, confidence = self._build_symmetry_map(axis, tolerance, seed_edge)
+
+                return {"mirror_ids": mirror_ids, "confidence": confidence}
+
+            # the seed edge is an edge id, so the entry goes with the edge order
+            name = "symmetry_{0}_{1}".format(self.fingerprint(np.array([axis, tolerance or 0.0, -1 if seed_edge is None
+                                                                       else seed_edge])), self._edge_source())
+            arrays = self._disk_cached(name, build, geometry=True)
+
+            self._symmetry[key] = arrays["mirror_ids"], arrays["confidence"]
+
+        return self._symmetry[key]
+
+    def _build_symmetry_map(self, axis, tolerance, seed_edge):
+        """
+
+        Build the symmetry map, see symmetry_map
+
+        :param axis: axis id
+        :param tolerance: match tolerance, None for a tenth of the mean edge length
+        :param seed_edge: edge on the symmetry line
+        :return: mirror vert ids, confidence
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        points = self._points
+        num_verts = self.num_verts
+
+        if tolerance is None:
+            tolerance = 0.1 * self.triangle_edge_lengths().mean()
+
+        mirrored = points.copy()
+        mirrored[:, axis] *= -1.0
+
+        distances, mirror_ids = cKDTree(points).query(mirrored, distance_upper_bound=tolerance)
+
+        # only keep matches that agree both ways
+        matched = np.isfinite(distances)
+        matched[matched] = mirror_ids[mirror_ids[matched]] == np.flatnonzero(matched)
+
+        confidence = np.where(matched, 1.0 - distances / max(tolerance, 1e-300), 0.0)
+        mirror_ids = np.where(matched, mirror_ids, np.arange(num_verts))
+
+        if matched.all():
+            return mirror_ids, confidence
+
+        _, face_verts = self.polygons()
+        next_verts = face_verts[self.face_vert_next()]
+
+        # face vertex matches, u -> v matches v' -> u'
+        face_vert_map = np.full(len(face_verts), -1, dtype=np.int64)
+
+        both = matched[face_verts] & matched[next_verts]
+        seeds = np.flatnonzero(both)
+        seed_mirrors = self.find_face_verts(mirror_ids[next_verts[seeds]], mirror_ids[face_verts[seeds]])
+
+        if seed_edge is not None:
+            vert_a, vert_b = self.edge_vert_list()[seed_edge]
+
+            # an edge on the symmetry line matches its own opposite face vertex
+            sides = self.find_face_verts([vert_a, vert_b], [vert_b, vert_a])
+
+            seeds = np.concatenate([seeds, sides])
+            seed_mirrors = np.concatenate([seed_mirrors, sides[::-1]])
+
+        valid = (seeds > -1) & (seed_mirrors > -1)
+        seeds = seeds[valid]
+        seed_mirrors = seed_mirrors[valid]
+
+        face_vert_faces = self.face_vert_faces()
+        face_counts, _ = self.polygons()
+
+        while len(seeds):
+            # carry each match round its face, forwards on one side and backwards on the other
+            todo = face_vert_map[seeds] < 0
+            seeds = seeds[todo]
+            seed_mirrors = seed_mirrors[todo]
+
+            _, first = np.unique(face_vert_faces[seeds], return_index=True)
+            seeds = seeds[first]
+            seed_mirrors = seed_mirrors[first]
+
+            counts = face_counts[face_vert_faces[seeds]]
+            mirror_counts = face_counts[face_vert_faces[seed_mirrors]]
+
+            # faces that don't match up in size can't be walked through
+            same = counts == mirror_counts
+            seeds = seeds[same]
+            seed_mirrors = seed_mirrors[same]
+            counts = counts[same]
+
+            starts = self.face_starts()[face_vert_faces[seeds]]
+            mirror_starts = self.face_starts()[face_vert_faces[seed_mirrors]]
+
+            steps = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            repeated_counts = np.repeat(counts, counts)
+
+            offsets = (np.repeat(seeds - starts, counts) + steps) % repeated_counts
+            mirror_offsets = (np.repeat(seed_mirrors - mirror_starts, counts) - steps) % repeated_counts
+
+            face_vert_ids = np.repeat(starts, counts) + offsets
+            mirror_face_vert_ids = np.repeat(mirror_starts, counts) + mirror_offsets
+
+            new = face_vert_map[face_vert_ids] < 0
+            face_vert_ids = face_vert_ids[new]
+            mirror_face_vert_ids = mirror_face_vert_ids[new]
+
+            face_vert_map[face_vert_ids] = mirror_face_vert_ids
+
+            # cross each edge into the next face, the face vertex running the other way round the same edge
+            seeds = self.find_face_verts(next_verts[face_vert_ids], face_verts[face_vert_ids])
+            seed_mirrors = self.find_face_verts(next_verts[mirror_face_vert_ids], face_verts[mirror_face_vert_ids])
+
+            valid = (seeds > -1) & (seed_mirrors > -1)
+            seeds = seeds[valid]
+            seed_mirrors = seed_mirrors[valid]
+
+        # u in u -> v matches u', the end of v' -> u'
+        walked = np.flatnonzero(face_vert_map > -1)
+        walked_verts = face_verts[walked]
+        walked_mirrors = next_verts[face_vert_map[walked]]
+
+        unmatched = ~matched[walked_verts]
+
+        mirror_ids[walked_verts[unmatched]] = walked_mirrors[unmatched]
+        confidence[walked_verts[unmatched]] = 0.5
+
+        return mirror_ids, confidence
+
+    def face_centers(self):
+        """
+
+        Get the average of the verts of each face
+
+        :return: n_faces x 3 centers
+        :rtype: numpy.ndarray
+        """
+
+        if self._points is None:
+            self.points()
+
+        face_counts, face_verts = self.polygons()
+        faces = self.face_vert_faces()
+
+        return accumulate(faces, self._points[face_verts], len(face_counts)) / face_counts[:, np.newaxis]
+
+    def match_topology(self, other, seed_candidates=4):
+        """
+
+        Match the verts of this mesh to a mesh with the same connectivity but a different vert order, eg. the same
+        model republished after being rebuilt, so per vert data from the other mesh can be brought across with
+        data[vert_map]. The match is cached on disk under both topology fingerprints
+
+        :param other: mesh to match to
+        :type other: ArrayMesh
+        :param seed_candidates: nearest faces of the other mesh to try starting each walk from
+        :type seed_candidates: int
+        :return: vert of the other mesh matching each vert, -1 for verts that couldn't be matched
+        :rtype: numpy.ndarray
+        """
+
+        if self.topology_key() == other.topology_key():
+            return np.arange(self.num_verts)
+
+        def build():
+            return {"vert_map": self._build_topology_match(other, seed_candidates)}
+
+        return self._disk_cached("topology_match_{0}".format(other.topology_key()), build)["vert_map"]
+
+    def _topology_walk(self, other, seed, other_seed, face_map, other_used):
+        """
+
+        Walk out from a pair of matching face vertices, matching whole faces at a time. Going round a face
+        matches face vertex to face vertex and crossing an edge matches the twins on the far side
+
+        :param other: mesh being matched to
+        :param seed: face vertex id to start from
+        :param other_seed: matching face vertex of the other mesh
+        :param face_map: other face matched to each face so far, faces already matched are left alone
+        :param other_used: faces of the other mesh that are already matched
+        :return: matched face vertex ids and their matches, number of edges where the two meshes disagree
+        :rtype: numpy.ndarray, numpy.ndarray, int
+        """
+
+        half_edges = self._topology_half_edges()
+        other_half_edges = other._topology_half_edges()
+
+        face_map = face_map.copy()
+        other_used = other_used.copy()
+
+        matched = []
+        other_matched = []
+        conflicts = 0
+
+        seeds = np.array([seed])
+        other_seeds = np.array([other_seed])
+
+        while len(seeds):
+            faces = half_edges.face[seeds]
+            other_faces = other_half_edges.face[other_seeds]
+
+            counts = half_edges.face_counts[faces]
+
+            valid = (counts == other_half_edges.face_counts[other_faces]) & (face_map[faces] < 0) & \
+                ~other_used[other_faces]
+            conflicts += int(np.count_nonzero((face_map[faces] < 0) & ~valid))
+
+            seeds, other_seeds, faces, other_faces, counts = (seeds[valid], other_seeds[valid], faces[valid],
+                                                               other_faces[valid], counts[valid])
+
+            # several edges can reach the same face in one step, the first one in claims it
+            _, first = np.unique(faces, return_index=True)
+            first = first[np.unique(other_faces[first], return_index=True)[1]]
+
+            seeds, other_seeds, faces, other_faces, counts = (seeds[first], other_seeds[first], faces[first],
+                                                               other_faces[first], counts[first])
+
+            face_map[faces] = other_faces
+            other_used[other_faces] = True
+
+            # every face vertex of the matched faces, counted round from the seeds
+            steps = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            repeated_counts = np.repeat(counts, counts)
+
+            starts = half_edges.face_start[faces]
+            other_starts = other_half_edges.face_start[other_faces]
+
+            face_vert_ids = np.repeat(starts, counts) + (np.repeat(seeds - starts, counts) + steps) % repeated_counts
+            other_face_vert_ids = np.repeat(other_starts, counts) + (np.repeat(other_seeds - other_starts, counts) +
+                                                                     steps) % repeated_counts
+
+            matched.append(face_vert_ids)
+            other_matched.append(other_face_vert_ids)
+
+            twins = half_edges.twin[face_vert_ids]
+            other_twins = other_half_edges.twin[other_face_vert_ids]
+
+            # a boundary on one side only means the meshes differ here
+            conflicts += int(np.count_nonzero((twins < 0) != (other_twins < 0)))
+
+            valid = (twins > -1) & (other_twins > -1)
+            valid[valid] = face_map[half_edges.face[twins[valid]]] < 0
+
+            seeds = twins[valid]
+            other_seeds = other_twins[valid]
+
+        if not matched:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), conflicts
+
+        return np.concatenate(matched), np.concatenate(other_matched), conflicts
+
+    def _build_topology_match(self, other, seed_candidates):
+        """
+
+        Match the verts of two meshes with the same connectivity, see match_topology. Each piece is walked from
+        one of its faces, the nearest faces of the other mesh with the same vert count are tried as the start
+        with every rotation whose vert valences line up, and the walk that matches the most of the piece with
+        the fewest disagreements and the least distance between matched verts wins. Position only breaks ties
+        so the meshes can be different shapes
+
+        :param other: mesh to match to
+        :param seed_candidates: nearest faces of the other mesh to try starting each walk from
+        :return: vert of the other mesh matching each vert, -1 for verts that couldn't be matched
+        :rtype: numpy.ndarray
+        """
+
+        half_edges = self._topology_half_edges()
+        other_half_edges = other._topology_half_edges()
+
+        points = self.points()
+        other_points = other.points()
+
+        centers = self.face_centers()
+        other_centers = other.face_centers()
+
+        num_faces = len(half_edges.face_counts)
+        num_other_faces = len(other_half_edges.face_counts)
+
+        face_map = np.full(num_faces, -1, dtype=np.int64)
+        other_used = np.zeros(num_other_faces, dtype=bool)
+
+        face_vert_map = np.full(len(half_edges.vert), -1, dtype=np.int64)
+
+        valences = half_edges.valence
+        other_valences = other_half_edges.valence
+
+        center_tree = cKDTree(other_centers)
+
+        # each face is only tried as a start once, pieces with nothing to match are skipped altogether
+        tried = np.zeros(num_faces, dtype=bool)
+        piece_faces = self.vert_pieces()[half_edges.vert[half_edges.face_start]]
+
+        while True:
+            untried = np.flatnonzero((face_map < 0) & ~tried)
+
+            if not len(untried):
+                break
+
+            face = untried[0]
+            tried[face] = True
+
+            count = half_edges.face_counts[face]
+            start = half_edges.face_start[face]
+            seed_valences = valences[half_edges.vert[start:start + count]]
+
+            # nearest unmatched faces with the same number of verts
+            _, candidates = center_tree.query(centers[face], k=min(num_other_faces, seed_candidates * 4))
+            candidates = np.atleast_1d(candidates)
+            candidates = candidates[(other_half_edges.face_counts[candidates] == count) & ~other_used[candidates]]
+            candidates = candidates[:seed_candidates]
+
+            best = None
+            exact = False
+
+            for candidate in candidates:
+                other_start = other_half_edges.face_start[candidate]
+                candidate_valences = other_valences[other_half_edges.vert[other_start:other_start + count]]
+
+                for rotation in range(count):
+                    if exact:
+                        break
+
+                    if not np.array_equal(np.roll(candidate_valences, -rotation), seed_valences):
+                        continue
+
+                    ids, other_ids, conflicts = self._topology_walk(other, start, other_start + rotation, face_map,
+                                                                    other_used)
+
+                    offsets = points[half_edges.vert[ids]] - other_points[other_half_edges.vert[other_ids]]
+                    distance = np.einsum("ij,ij->", offsets, offsets) / max(len(ids), 1)
+
+                    score = (conflicts - len(ids), distance)
+
+                    if best is None or score < best[0]:
+                        best = score, ids, other_ids
+
+                    # in the same place with nothing out of line, it won't get any better
+                    exact = not conflicts and distance < 1e-12
+
+            if best is None:
+                # nothing to start from, don't try the rest of the piece
+                tried[piece_faces == piece_faces[face]] = True
+                continue
+
+            _, ids, other_ids = best
+
+            face_vert_map[ids] = other_ids
+            face_map[half_edges.face[ids]] = other_half_edges.face[other_ids]
+            other_used[other_half_edges.face[other_ids]] = True
+
+        vert_map = np.full(self.num_verts, -1, dtype=np.int64)
+
+        matched = face_vert_map > -1
+        vert_map[half_edges.vert[matched]] = other_half_edges.vert[face_vert_map[matched]]
+
+        return vert_map
+
+    def validate(self, checks=None, area_tolerance=1e-6, uv_set=None, space=None):
+        """
+
+        Run model checks over the whole mesh at once, see validation_checks for the checks and the component
+        type of the ids each one returns
+
+        :param checks: names of the checks to run, None runs all of them
+        :type checks: list[str]
+        :param area_tolerance: faces smaller than this fraction of the mean edge length squared count as zero area
+        :type area_tolerance: float
+        :param uv_set: uv set to check for overlaps
+        :param space: space to fetch the mesh points in, None uses the last fetched points
+        :return: offending component ids by check name, empty where the check passes
+        :rtype: collections.OrderedDict
+        """
+
+        if space is not None:
+            self.points(space=space)
+
+        kwargs = {"zero_area_faces": {"tolerance": area_tolerance}, "overlapping_uvs": {"uv_set": uv_set}}
+
+        results = OrderedDict()
+
+        for check in checks or list(self.validation_checks):
+            if check not in self.validation_checks:
+                raise ValueError("Unknown check {0}, expected one of {1}".format(check, list(self.validation_checks)))
+
+            results[check] = getattr(self, check)(**kwargs.get(check, {}))
+
+        return results
+
+    def zero_area_faces(self, tolerance=1e-6):
+        """
+
+        Get the faces with no area, including faces that don't triangulate
+
+        :param tolerance: fraction of the mean edge length squared below which a face has no area
+        :type tolerance: float
+        :return: face ids
+        :rtype: numpy.ndarray
+        """
+
+        edge_verts, _ = self._face_data_edges()
+
+        if not len(edge_verts):
+            return np.zeros(0, dtype=np.int64)
+
+        if self._points is None:
+            self.points()
+
+        edge_vectors = self._points[edge_verts[:, 1]] - self._points[edge_verts[:, 0]]
+        mean_length_sq = np.einsum("ij,ij->", edge_vectors, edge_vectors) / len(edge_vectors)
+
+        areas = np.bincount(self.triangle_faces(), self.triangle_areas(), minlength=self.num_faces)
+
+        return np.flatnonzero(areas <= tolerance * mean_length_sq)
+
+    def non_manifold_edges(self):
+        """
+
+        Get the edges shared by more than two faces
+
+        :return: edge ids
+        :rtype: numpy.ndarray
+        """
+
+        _, face_vert_edges = self._face_edges()
+
+        return np.flatnonzero(np.bincount(face_vert_edges, minlength=self.num_edges) > 2)
+
+    def lamina_faces(self):
+        """
+
+        Get the faces that share all of their verts with another face, they come in sets lying on top of each other
+
+        :return: face ids
+        :rtype: numpy.ndarray
+        """
+
+        face_counts, face_verts = self.polygons()
+
+        # verts sorted within each face, so faces over the same verts have the same rows
+        sorted_verts = face_verts[np.lexsort((face_verts, self.face_vert_faces()))]
+        face_starts = self.face_starts()
+
+        lamina = np.zeros(len(face_counts), dtype=bool)
+
+        for count in np.unique(face_counts):
+            face_ids = np.flatnonzero(face_counts == count)
+            keys = sorted_verts[face_starts[face_ids][:, np.newaxis] + np.arange(count)]
+
+            order = np.lexsort(keys.T[::-1])
+            keys = keys[order]
+
+            same = (keys[1:] == keys[:-1]).all(axis=1)
+
+            lamina[face_ids[order[np.r_[same, False] | np.r_[False, same]]]] = True
+
+        return np.flatnonzero(lamina)
+
+    def unused_verts(self):
+        """
+
+        Get the verts that aren't part of any face
+
+        :return: vert ids
+        :rtype: numpy.ndarray
+        """
+
+        _, face_verts = self.polygons()
+
+        return np.flatnonzero(np.bincount(face_verts, minlength=self.num_verts) == 0)
+
+    def overlapping_uvs(self, uv_set=None, chunk_size=1 << 20):
+        """
+
+        Get the faces whose uvs overlap other faces in uv space, within a shell or across shells. Neighbouring
+        triangles are folded over when their far corners are on the same side of their shared uv edge, the others
+        are bucketed on a grid and every pair sharing a cell that doesn't share a uv is tested for overlap.
+        Unmapped faces are skipped
+
+        :param uv_set: uv set to check
+        :param chunk_size: triangle pairs to test at once, limits the memory used
+        :type chunk_size: int
+        :return: face ids
+        :rtype: numpy.ndarray
+        """
+
+        try:
+            uvs, uv_ids = self.uv_data(uv_set)
+        except RuntimeError:  # no uvs to overlap
+            return np.zeros(0, dtype=np.int64)
+
+        tri_faces = self.triangle_faces()
+        tri_uv_ids = uv_ids[self.triangle_face_verts()]
+
+        corners = uvs[np.maximum(tri_uv_ids, 0)]
+        edges = corners[:, 1:] - corners[:, :1]
+        uv_areas = np.abs(edges[:, 0, 0] * edges[:, 1, 1] - edges[:, 0, 1] * edges[:, 1, 0])
+
+        tri_ids = np.flatnonzero((tri_uv_ids >= 0).all(axis=1) & (uv_areas > 1e-12))
+
+        if not len(tri_ids):
+            return np.zeros(0, dtype=np.int64)
+
+        corners = corners[tri_ids]
+        tri_uv_ids = tri_uv_ids[tri_ids]
+
+        # folds, triangles sharing a uv edge overlap when their far corners are on the same side of it
+        edge_from = tri_uv_ids.ravel()
+        edge_to = tri_uv_ids[:, [1, 2, 0]].ravel()
+
+        keys = np.minimum(edge_from, edge_to) * len(uvs) + np.maximum(edge_from, edge_to)
+        order = np.argsort(keys, kind="stable")
+        pairs = np.flatnonzero(keys[order[1:]] == keys[order[:-1]])
+
+        corner_a = order[pairs]
+        corner_b = order[pairs + 1]
+
+        start = uvs[np.minimum(edge_from, edge_to)[corner_a]]
+        direction = uvs[np.maximum(edge_from, edge_to)[corner_a]] - start
+
+        sides = []
+        for corner in (corner_a, corner_b):
+            far = uvs[tri_uv_ids[corner // 3, (corner % 3 + 2) % 3]] - start
+            sides.append(direction[:, 0] * far[:, 1] - direction[:, 1] * far[:, 0])
+
+        fold = sides[0] * sides[1] > 1e-12
+        folded = tri_ids[np.r_[corner_a[fold], corner_b[fold]] // 3]
+
+        low = corners.min(axis=1)
+        high = corners.max(axis=1)
+
+        # cells about the size of a triangle, each triangle is listed in every cell its bounds touch
+        cell_size = max(float(np.mean((high - low).max(axis=1))), 1e-9)
+        origin = low.min(axis=0)
+
+        cell_low = ((low - origin) / cell_size).astype(np.int64)
+        cell_high = ((high - origin) / cell_size).astype(np.int64)
+        width = int(cell_high[:, 0].max()) + 1
+
+        spans = cell_high - cell_low + 1
+        counts = spans[:, 0] * spans[:, 1]
+
+        entry_tris = np.repeat(np.arange(len(tri_ids)), counts)
+        local = np.arange(len(entry_tris)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        cells = (cell_low[entry_tris, 1] + local // spans[entry_tris, 0]) * width + \
+            cell_low[entry_tris, 0] + local % spans[entry_tris, 0]
+
+        order = np.argsort(cells, kind="stable")
+        cells = cells[order]
+        entry_tris = entry_tris[order]
+
+        # every pair of entries in the same cell
+        cell_starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+        cell_counts = np.diff(np.r_[cell_starts, len(cells)])
+
+        later = np.repeat(cell_starts + cell_counts, cell_counts) - np.arange(len(cells)) - 1
+
+        overlapping = [folded]
+
+        tolerance = 1e-7 * cell_size
+        low_x, low_y = low[:, 0].copy(), low[:, 1].copy()
+        high_x, high_y = high[:, 0] - tolerance, high[:, 1] - tolerance
+
+        step = max(chunk_size // int(cell_counts.max()), 1)
+
+        for start in range(0, len(cells), step):
+            entries = np.arange(start, min(start + step, len(cells)))
+            pair_counts = later[entries]
+
+            first = np.repeat(entries, pair_counts)
+            second = first + np.arange(len(first)) - np.repeat(np.cumsum(pair_counts) - pair_counts, pair_counts) + 1
+
+            tri_a = entry_tris[first]
+            tri_b = entry_tris[second]
+
+            # only test pairs whose bounds overlap, one axis at a time to thin them out early
+            keep = (low_x[tri_a] < high_x[tri_b]) & (low_x[tri_b] < high_x[tri_a])
+            first, tri_a, tri_b = first[keep], tri_a[keep], tri_b[keep]
+
+            keep = (low_y[tri_a] < high_y[tri_b]) & (low_y[tri_b] < high_y[tri_a])
+            first, tri_a, tri_b = first[keep], tri_a[keep], tri_b[keep]
+
+            # each pair is only tested in the cell holding the low corner of where their bounds meet
+            meet_x = ((np.maximum(low_x[tri_a], low_x[tri_b]) - origin[0]) / cell_size).astype(np.int64)
+            meet_y = ((np.maximum(low_y[tri_a], low_y[tri_b]) - origin[1]) / cell_size).astype(np.int64)
+            keep = meet_y * width + meet_x == cells[first]
+
+            # triangles sharing a uv are neighbours, they can only overlap by folding
+            tri_a, tri_b = tri_a[keep], tri_b[keep]
+            keep = ~(tri_uv_ids[tri_a][:, :, np.newaxis] == tri_uv_ids[tri_b][:, np.newaxis, :]).any(axis=(1, 2))
+
+            tri_a, tri_b = tri_a[keep], tri_b[keep]
+            hit = triangles_overlap_2d(corners[tri_a], corners[tri_b], tolerance=tolerance)
+
+            overlapping.extend([tri_ids[tri_a[hit]], tri_ids[tri_b[hit]]])
+
+        return np.unique(tri_faces[np.concatenate(overlapping)])
+
+    def flipped_normals(self):
+        """
+
+        Get the faces wound the other way to the faces around them. Each connected piece is split into the two
+        sets of faces that agree with each other and the smaller set is flipped, on a closed piece the set facing
+        in is flipped instead. Faces on one sided pieces like a mobius strip can't agree and are all returned
+
+        :return: face ids
+        :rtype: numpy.ndarray
+        """
+
+        face_counts, face_verts = self.polygons()
+        edge_verts, face_vert_edges = self._face_data_edges()
+
+        num_faces = len(face_counts)
+        faces = self.face_vert_faces()
+
+        # the two face verts of each manifold edge sit next to each other once sorted by edge
+        order = np.argsort(face_vert_edges, kind="stable")
+        edge_counts = np.bincount(face_vert_edges, minlength=len(edge_verts))
+
+        first = np.cumsum(edge_counts) - edge_counts
+        pairs = np.flatnonzero(edge_counts == 2)
+
+        face_vert_a = order[first[pairs]]
+        face_vert_b = order[first[pairs] + 1]
+
+        # faces agree when they run along their shared edge in opposite directions
+        agree = face_verts[face_vert_a] != face_verts[face_vert_b]
+
+        face_a = faces[face_vert_a]
+        face_b = faces[face_vert_b]
+
+        # node f is face f as it is, node f + num_faces is face f reversed
+        rows = np.r_[face_a, face_a + num_faces]
+        columns = np.r_[np.where(agree, face_b, face_b + num_faces), np.where(agree, face_b + num_faces, face_b)]
+
+        graph = csr_matrix((np.ones(len(rows)), (rows, columns)), shape=(2 * num_faces, 2 * num_faces))
+
+        _, labels = connected_components(graph, directed=False)
+
+        kept = labels[:num_faces]
+        reversed_ = labels[num_faces:]
+
+        one_sided = kept == reversed_
+
+        # faces in the bigger set of their piece keep their winding
+        set_sizes = np.bincount(kept, minlength=labels.max() + 1)
+        flipped = (set_sizes[kept] < set_sizes[reversed_]) | \
+                  ((set_sizes[kept] == set_sizes[reversed_]) & (kept > reversed_))
+
+        # a closed piece should enclose a positive volume, when it doesn't the bigger set is the one facing in
+        pieces = np.minimum(kept, reversed_)
+
+        open_faces = np.zeros(num_faces, dtype=bool)
+        open_faces[faces[edge_counts[face_vert_edges] != 2]] = True
+
+        open_pieces = np.bincount(pieces, open_faces | one_sided, minlength=labels.max() + 1) > 0
+
+        if self._points is None:
+            self.points()
+
+        tri_faces = self.triangle_faces()
+        tri_points = self.triangle_points().reshape(-1, 3, 3)
+
+        volumes = np.einsum("ij,ij->i", tri_points[:, 0], cross(tri_points[:, 1], tri_points[:, 2]))
+        volumes = np.bincount(pieces[tri_faces], np.where(flipped[tri_faces], -volumes, volumes),
+                              minlength=labels.max() + 1)
+
+        inside_out = ~open_pieces & (volumes < 0)
+
+        return np.flatnonzero((flipped != inside_out[pieces]) | one_sided)
@@ -7,6 +7,7 @@ import json
 from . import transformLib
 from . import constraintsLib
 from . import utilsLib
+from . import apiMesh
 
 
 colourIndexDict = {'grey': 0, 'black': 1, 'darkgrey': 2, 'lightgrey': 3, 'plum': 4, 'darkblue': 5, 'blue': 6,
@@ -413,6 +414,27 @@ def decending_geo(grp=""):
 
 
 
+def create_proxy(geo, ratio=0.25, target_triangles=None, name=None, parent=None):
+    """
+    builds a reduced copy of a mesh for the proxy stream, the verts are a subset of the source verts so uvs
+    and skin weights carry straight over
+    :param geo: mesh transform to reduce
+    :param ratio: fraction of the triangles to keep
+    :param target_triangles: number of triangles to keep, overrides the ratio
+    :param name: name of the proxy, defaults to the geo name with PRX on the end
+    :param parent: group to put the proxy in
+    :return: proxy transform, vert mapping back to the source - see ArrayMesh.decimate
+    """
+
+    name = name if name else str(geo).split("|")[-1] + "_PRX"
+
+    mesh = apiMesh.Mesh(str(geo))
+    proxy, mapping = mesh.decimate(target_triangles=target_triangles, ratio=ratio, space=apiMesh.WORLD_SPACE)
+
+    return apiMesh.create_mesh(proxy, name, parent=parent), mapping
+
+
+
 # ============================================================ FOLICLES
 def follicleRivetUI():
     if not pm.pluginInfo('matrixNodes.so', query=True, loaded=True):
@@ -566,56 +588,12 @@ def follicleRivet(mesh=None, referenceObject=None, name=None, dynamic=0):
 def rivit(refPoint, mesh, orient=True, name = "myRvt"):
 
     if refPoint and mesh:
-        loc = pm.spaceLocator()
-        pm.delete(pm.parentConstraint(refPoint, loc))
-
-        CPOM = pm.createNode("closestPointOnMesh", name="delete_CPM")
-        pm.connectAttr(mesh + ".outMesh", CPOM.inMesh)
-        pm.connectAttr(loc.getShape() + ".parentInverseMatrix[0]", CPOM.inputMatrix)
-
-        faceNumber = pm.getAttr(CPOM + ".closestFaceIndex")
-
-        pm.select(mesh+".f[%s]" % faceNumber)
-
-        mel.eval("ConvertSelectionToEdges;selectType -ocm -alc false;selectType -ocm -polymeshEdge true;")
-
-
-        edges = pm.ls(selection=True)
-        print edges
-        if len(edges) == 1:
-            e1 = int((edges[0].split("[")[1]).split(":")[0])
-            e2 = int(((edges[0].split("[")[1]).split(":")[1])[:-1])
-
-        elif len(edges) > 1:
-            temp_edge = []
-            for edge in edges:
-                if ":" in str(edge):
-                    temp_edge.append(int(((edge.split("[")[1]).split(":")[1])[:-1]))
-                    print "double " + (((edge.split("[")[1]).split(":")[1])[:-1])
-                else:
-                    temp_edge.append(int((edge.split("[")[1])[:-1]))
-                    print "double " + ((edge.split("[")[1])[:-1])
-
-            e1 = temp_edge[0]
-            e2 = temp_edge[-1]
-        # elif len(edges) == 3:
-        #     temp_edge = []
-        #     for edge in edges:
-        #         if ":" in str(edge):
-        #             print "skipping " + edge
-        #         else:
-        #             temp_edge.append(edge)
-        #     e1 = int((temp_edge[0].split("[")[1])[:-1])
-        #     e2 = int((temp_edge[1].split("[")[1])[:-1])
-        #
-        # elif len(edges) == 4:
-        #     e1 = int((edges[0].split("[")[1])[:-1])
-        #     e2 = int((edges[-1].split("[")[1])[:-1])
-        else:
-            print "no edges"
+        mesh_data = apiMesh.Mesh(str(mesh))
+        position = pm.xform(refPoint, q=True, ws=True, rp=True)
 
-        print e1, e2
-        pm.delete(CPOM, loc)
+        # two edges facing each other across the closest face, straight from the mesh arrays rather than
+        # converting a face selection to edges and parsing the names
+        e1, e2 = [int(edge) for edge in mesh_data.rivet_edges([position], space=apiMesh.WORLD_SPACE)[0]]
     else:
 
         edges = pm.selected()
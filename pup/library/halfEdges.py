@@ -0,0 +1,403 @@
+import numpy as np
+
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+class HalfEdges(object):
+
+    def __init__(self, face_counts, face_verts, face_vert_edges=None):
+        """
+
+        Half edge view of a polygon mesh built straight from the face vertex arrays. Every face vertex is the half
+        edge running from its vert to the next vert around the face, so half edge ids are face vertex ids and all
+        the links are plain index arrays
+
+        :param face_counts: verts per face
+        :type face_counts: numpy.ndarray
+        :param face_verts: vert ids of each face vertex
+        :type face_verts: numpy.ndarray
+        :param face_vert_edges: edge id of each face vertex, None numbers the edges from the vert pairs
+        :type face_vert_edges: numpy.ndarray
+        """
+
+        self.face_counts = np.asarray(face_counts, dtype=np.int64)
+        self.vert = np.asarray(face_verts, dtype=np.int64)
+
+        num_half_edges = len(self.vert)
+        self.num_verts = int(self.vert.max()) + 1 if num_half_edges else 0
+
+        face_starts = np.cumsum(self.face_counts) - self.face_counts
+
+        self.face = np.repeat(np.arange(len(self.face_counts)), self.face_counts)
+
+        starts = face_starts[self.face]
+        counts = self.face_counts[self.face]
+        offsets = np.arange(num_half_edges) - starts
+
+        self.next = starts + (offsets + 1) % counts
+        self.prev = starts + (offsets - 1) % counts
+        self.face_start = face_starts
+
+        to_verts = self.vert[self.next]
+
+        # the twin runs the other way along the same edge, non manifold edges pair up with one of their faces
+        keys = self.vert * self.num_verts + to_verts
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        twin_keys = to_verts * self.num_verts + self.vert
+        found = np.minimum(np.searchsorted(sorted_keys, twin_keys), max(num_half_edges - 1, 0))
+
+        self.twin = np.where(sorted_keys[found] == twin_keys, order[found], -1) if num_half_edges else order
+
+        if face_vert_edges is None:
+            low = np.minimum(self.vert, to_verts)
+            high = np.maximum(self.vert, to_verts)
+
+            _, face_vert_edges = np.unique(low * self.num_verts + high, return_inverse=True)
+
+        self.edge = np.asarray(face_vert_edges, dtype=np.int64).ravel()
+        self.num_edges = int(self.edge.max()) + 1 if num_half_edges else 0
+
+        # one half edge per edge to start queries from
+        self.edge_half_edge = np.full(self.num_edges, -1, dtype=np.int64)
+        self.edge_half_edge[self.edge[::-1]] = np.arange(num_half_edges)[::-1]
+
+        self.boundary = self.twin < 0
+
+        edge_from = self.vert[self.edge_half_edge]
+        edge_to = to_verts[self.edge_half_edge]
+
+        self.valence = np.bincount(np.r_[edge_from, edge_to], minlength=self.num_verts)
+
+        self.boundary_verts = np.zeros(self.num_verts, dtype=bool)
+        self.boundary_verts[self.vert[self.boundary]] = True
+        self.boundary_verts[to_verts[self.boundary]] = True
+
+    def edge_verts(self, edge_ids):
+        """
+
+        Get the verts at each end of the given edges, in the direction of their first half edge
+
+        :param edge_ids: edge ids
+        :type edge_ids: numpy.ndarray
+        :return: n x 2 vert ids
+        :rtype: numpy.ndarray
+        """
+
+        half_edges = self.edge_half_edge[np.asarray(edge_ids, dtype=np.int64)]
+
+        return np.stack([self.vert[half_edges], self.vert[self.next[half_edges]]], axis=1)
+
+    def opposite_half_edges(self, half_edge_ids):
+        """
+
+        Get the half edge across the face from each half edge, only quads have one
+
+        :param half_edge_ids: half edge ids
+        :type half_edge_ids: numpy.ndarray
+        :return: half edge ids, -1 where the face isn't a quad
+        :rtype: numpy.ndarray
+        """
+
+        half_edge_ids = np.asarray(half_edge_ids, dtype=np.int64)
+
+        quads = self.face_counts[self.face[half_edge_ids]] == 4
+
+        return np.where(quads, self.next[self.next[half_edge_ids]], -1)
+
+    def opposite_edges(self, edge_ids):
+        """
+
+        Get the edge across each quad on either side of the given edges
+
+        :param edge_ids: edge ids
+        :type edge_ids: numpy.ndarray
+        :return: n x 2 edge ids, -1 on the boundary side and where the face isn't a quad
+        :rtype: numpy.ndarray
+        """
+
+        half_edges = self.edge_half_edge[np.asarray(edge_ids, dtype=np.int64)]
+        twins = self.twin[half_edges]
+
+        opposite = np.stack([self.opposite_half_edges(half_edges),
+                             np.where(twins < 0, -1, self.opposite_half_edges(np.maximum(twins, 0)))], axis=1)
+
+        return np.where(opposite < 0, -1, self.edge[opposite])
+
+    def face_neighbours(self, face_ids):
+        """
+
+        Get the faces across each edge of the given faces
+
+        :param face_ids: face ids
+        :type face_ids: numpy.ndarray
+        :return: neighbour face ids and the face each one is next to, in edge order around each face
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        face_ids = np.asarray(face_ids, dtype=np.int64)
+
+        counts = self.face_counts[face_ids]
+        sources = np.repeat(face_ids, counts)
+
+        # every face vertex of the given faces
+        half_edges = np.repeat(self.face_start[face_ids] - np.cumsum(counts) + counts, counts) + np.arange(len(sources))
+
+        twins = self.twin[half_edges]
+        inside = twins >= 0
+
+        return self.face[twins[inside]], sources[inside]
+
+    def _loop_forward(self, half_edges):
+        """
+
+        Step along an edge loop to the half edge straight across the vert at the end of each half edge, loops
+        only run through interior verts with four edges
+
+        :param half_edges: half edge ids
+        :type half_edges: numpy.ndarray
+        :return: next half edge along each loop, -1 where the loop stops
+        :rtype: numpy.ndarray
+        """
+
+        turn = self.twin[self.next[half_edges]]
+        pole = self.vert[self.next[half_edges]]
+
+        valid = (turn >= 0) & (self.valence[pole] == 4) & ~self.boundary_verts[pole]
+
+        return np.where(valid, self.next[np.maximum(turn, 0)], -1)
+
+    def _loop_backward(self, half_edges):
+        """
+
+        Step back along an edge loop to the half edge straight across the vert at the start of each half edge
+
+        :param half_edges: half edge ids
+        :type half_edges: numpy.ndarray
+        :return: previous half edge along each loop, -1 where the loop stops
+        :rtype: numpy.ndarray
+        """
+
+        turn = self.twin[self.prev[half_edges]]
+        pole = self.vert[half_edges]
+
+        valid = (turn >= 0) & (self.valence[pole] == 4) & ~self.boundary_verts[pole]
+
+        return np.where(valid, self.prev[np.maximum(turn, 0)], -1)
+
+    def _ring_step(self, half_edges):
+        """
+
+        Step across the quad of each half edge to the next half edge of an edge ring
+
+        :param half_edges: half edge ids
+        :type half_edges: numpy.ndarray
+        :return: the half edge across each quad and its twin to carry on from, -1 where the ring stops
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        opposite = self.opposite_half_edges(half_edges)
+
+        return opposite, np.where(opposite < 0, -1, self.twin[np.maximum(opposite, 0)])
+
+    def _walk(self, edge_ids, walks, max_length=None):
+        """
+
+        Walk out from many edges at once, one step for all the walks at a time
+
+        :param edge_ids: edges the walks start from
+        :type edge_ids: numpy.ndarray
+        :param walks: (direction, starting half edges, step) for each way to walk, the step takes the current half
+                      edges and gives the half edge whose edge is recorded and the half edge to carry on from, -1
+                      for either stops that walk
+        :type walks: list[tuple]
+        :param max_length: most edges to walk each way
+        :type max_length: int
+        :return: ordered edge ids for each start edge
+        :rtype: list[numpy.ndarray]
+        """
+
+        edge_ids = np.asarray(edge_ids, dtype=np.int64)
+        num_walks = len(edge_ids)
+
+        if max_length is None:
+            max_length = self.num_edges
+
+        walk_ids = [np.arange(num_walks)]
+        positions = [np.zeros(num_walks, dtype=np.int64)]
+        edges = [edge_ids]
+
+        closed = np.zeros(num_walks, dtype=bool)
+
+        for sign, current, step in walks:
+            # a walk that came back round to its start edge already has the whole loop
+            active = np.flatnonzero(~closed & (current >= 0))
+            current = current[active]
+
+            for position in range(1, max_length + 1):
+                if not len(active):
+                    break
+
+                recorded, current = step(current)
+
+                keep = recorded >= 0
+                active, recorded, current = active[keep], self.edge[recorded[keep]], current[keep]
+
+                back = recorded == edge_ids[active]
+                closed[active[back]] = True
+
+                keep = ~back
+                active, recorded, current = active[keep], recorded[keep], current[keep]
+
+                walk_ids.append(active)
+                positions.append(np.full(len(active), sign * position, dtype=np.int64))
+                edges.append(recorded)
+
+                keep = current >= 0
+                active, current = active[keep], current[keep]
+
+        walk_ids = np.concatenate(walk_ids)
+        positions = np.concatenate(positions)
+        edges = np.concatenate(edges)
+
+        order = np.lexsort((positions, walk_ids))
+
+        return np.split(edges[order], np.cumsum(np.bincount(walk_ids, minlength=num_walks))[:-1])
+
+    def edge_loops(self, edge_ids, max_length=None):
+        """
+
+        Get the edge loop through each of the given edges. Loops carry straight on through verts with four edges
+        and stop at poles and on the boundary
+
+        :param edge_ids: edges to start from
+        :type edge_ids: numpy.ndarray
+        :param max_length: most edges to walk each way from the start edge
+        :type max_length: int
+        :return: ordered edge ids of each loop
+        :rtype: list[numpy.ndarray]
+        """
+
+        def forward(half_edges):
+            half_edges = self._loop_forward(half_edges)
+            return half_edges, half_edges
+
+        def backward(half_edges):
+            half_edges = self._loop_backward(half_edges)
+            return half_edges, half_edges
+
+        starts = self.edge_half_edge[np.asarray(edge_ids, dtype=np.int64)]
+
+        return self._walk(edge_ids, [(1, starts, forward), (-1, starts, backward)], max_length=max_length)
+
+    def edge_rings(self, edge_ids, max_length=None):
+        """
+
+        Get the edge ring through each of the given edges, rings step across quads and stop at other faces and
+        on the boundary
+
+        :param edge_ids: edges to start from
+        :type edge_ids: numpy.ndarray
+        :param max_length: most edges to walk each way from the start edge
+        :type max_length: int
+        :return: ordered edge ids of each ring
+        :rtype: list[numpy.ndarray]
+        """
+
+        starts = self.edge_half_edge[np.asarray(edge_ids, dtype=np.int64)]
+
+        # the other way round starts in the face on the other side of the edge
+        walks = [(1, starts, self._ring_step), (-1, self.twin[starts], self._ring_step)]
+
+        return self._walk(edge_ids, walks, max_length=max_length)
+
+    def boundary_next(self):
+        """
+
+        Get the next boundary half edge round the boundary from each boundary half edge, found by turning
+        round the vert at its end until the boundary is reached again
+
+        :return: boundary half edge ids and the boundary half edge after each
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        boundary = np.flatnonzero(self.boundary)
+        following = self.next[boundary]
+
+        todo = np.flatnonzero(self.twin[following] >= 0)
+
+        for _ in range(int(self.valence.max()) if len(self.valence) else 0):
+            if not len(todo):
+                break
+
+            following[todo] = self.next[self.twin[following[todo]]]
+            todo = todo[self.twin[following[todo]] >= 0]
+
+        return boundary, following
+
+    def boundary_loops(self):
+        """
+
+        Get the verts of each boundary loop in order, running the same way as the faces they border
+
+        :return: ordered vert ids of each loop
+        :rtype: list[numpy.ndarray]
+        """
+
+        boundary, following = self.boundary_next()
+
+        num_boundary = len(boundary)
+
+        if not num_boundary:
+            return []
+
+        position = np.full(len(self.vert), -1, dtype=np.int64)
+        position[boundary] = np.arange(num_boundary)
+
+        successors = position[following]
+
+        graph = csr_matrix((np.ones(num_boundary), (np.arange(num_boundary), successors)),
+                           shape=(num_boundary, num_boundary))
+        num_loops, labels = connected_components(graph, directed=True, connection="weak")
+
+        # cut each loop open before its first half edge then rank along it by pointer jumping
+        _, heads = np.unique(labels, return_index=True)
+
+        is_head = np.zeros(num_boundary, dtype=bool)
+        is_head[heads] = True
+
+        pointers = np.where(is_head[successors], -1, successors)
+        distances = (pointers >= 0).astype(np.int64)
+
+        for _ in range(int(np.ceil(np.log2(num_boundary))) + 1):
+            jump = pointers >= 0
+
+            if not jump.any():
+                break
+
+            distances[jump] += distances[pointers[jump]]
+            pointers[jump] = pointers[pointers[jump]]
+
+        order = np.lexsort((-distances, labels))
+
+        return np.split(self.vert[boundary[order]], np.cumsum(np.bincount(labels, minlength=num_loops))[:-1])
+
+    def face_edge_pairs(self, face_ids):
+        """
+
+        Get two edges facing each other across each of the given faces, the first edge of the face and the edge
+        half way round it, so opposite edges for quads
+
+        :param face_ids: face ids
+        :type face_ids: numpy.ndarray
+        :return: n x 2 edge ids
+        :rtype: numpy.ndarray
+        """
+
+        face_ids = np.asarray(face_ids, dtype=np.int64)
+
+        first = self.face_start[face_ids]
+
+        return np.stack([self.edge[first], self.edge[first + self.face_counts[face_ids] // 2]], axis=1)
@@ -5,11 +5,17 @@ import pymel.core as pm
 import math
 import itertools
 import os
+import shutil
+import tempfile
 import xml.etree.ElementTree as ET
 
+import numpy as np
+
 from . import transformLib
 from . import constraintsLib
 from . import utilsLib
+from . import apiMesh
+from .arrayMesh import ArrayMesh
 
 def create_chain(node=None, name="my_###_JNT"):
     """
@@ -705,7 +711,8 @@ def copy_skin_weights(source=None, destination=None, uv=None, matchInfluences=Tr
                 pm.waitCursor(state=False)
 
 
-def xml_weights_in(path=None, useSelected=False, copyToRender=False, uv=None, method='index', render_suf=None, anim_suf=None):
+def xml_weights_in(path=None, useSelected=False, copyToRender=False, uv=None, method='index', render_suf=None, anim_suf=None,
+                   cache_dir=None):
     """
 
         Description:
@@ -725,6 +732,8 @@ def xml_weights_in(path=None, useSelected=False, copyToRender=False, uv=None, me
                                the influence list can contain other nodes as part of the geometry's influence list.
 
                                Setting to False take a lot longer to applied the xml file.
+            cache_dir: (string) Folder to keep vert order matches in, see remap_weights_xml. With "index" the weights
+                       are remapped when the mesh has been republished with its verts in a different order.
 
         Return:
              None.
@@ -819,12 +828,22 @@ def xml_weights_in(path=None, useSelected=False, copyToRender=False, uv=None, me
                                 # added from job branch...
                                 if pm.objExists('{0}_SKN'.format(meshName)):
                                     if os.path.isfile('{0}/{1}.xml'.format(path,meshName)):
-                                        pm.deformerWeights('{0}.xml'.format(meshName),
-                                                             path=path,
-                                                             method=method,
-                                                             im=True,
-                                                             # skip='transform',
-                                                             deformer='{0}_SKN'.format(meshName))
+                                        xml_path = path
+
+                                        if method == 'index':
+                                            xml_path = remap_weights_xml(path, meshName, cache_dir=cache_dir)
+
+                                        try:
+                                            pm.deformerWeights('{0}.xml'.format(meshName),
+                                                                 path=xml_path,
+                                                                 method=method,
+                                                                 im=True,
+                                                                 # skip='transform',
+                                                                 deformer='{0}_SKN'.format(meshName))
+                                        finally:
+                                            # a remapped xml is written to a temp folder, it's done with once read
+                                            if xml_path != path:
+                                                shutil.rmtree(xml_path, ignore_errors=True)
 
 
                                 if copyToRender:
@@ -880,7 +899,95 @@ def xml_weights_out(path, geometry=None):
             if cls:
                 pm.deformerWeights('{0}.xml'.format(plyName), path=path, ex=True, skip='transform', deformer=cls)
 
+                # keep the topology so the weights can still go on by index if the vert order changes
+                save_topology(plyName, path)
+
             else:
                 print ' XML weights out: No skin cluster found on:', plyName
 
 
+def save_topology(mesh, path):
+    """
+        Description:
+            Saves the points and faces of a mesh next to its weights xml, so the vert order it was saved with
+            can be matched to a later publish of the same model.
+
+        Flags:
+            mesh (string): The mesh to save.
+            path (string): The folder the xml files are in.
+        Return:
+            (string) The saved file.
+
+    """
+
+    mesh_data = apiMesh.Mesh(str(mesh))
+    face_counts, face_verts = mesh_data.polygons()
+
+    file_path = '{0}/{1}_topology.npz'.format(path, str(mesh).split('|')[-1])
+
+    np.savez(file_path, points=mesh_data.points(), face_counts=face_counts, face_verts=face_verts)
+
+    return file_path
+
+
+def remap_weights_xml(path, mesh, cache_dir=None):
+    """
+        Description:
+            Brings a weights xml saved on an older publish of a mesh onto the current vert order. The mesh the
+            weights were saved from is matched to the current one by walking their topology, see
+            ArrayMesh.match_topology, and the point indices in the xml are rewritten to suit. Blendshape deltas
+            and any other per vert data can be brought across with the same match, data[vert_map].
+
+        Flags:
+            path (string): The folder the xml files are in.
+            mesh (string): The mesh the weights are going on.
+            cache_dir (string): Folder to keep the vert order matches in, so each pair of publishes is only
+                                matched once.
+        Return:
+            (string) The folder to load the xml from, the original one when nothing needs remapping. A remapped
+                     xml is written to a new temp folder, which is up to the caller to remove.
+
+    """
+
+    mesh_name = str(mesh).split('|')[-1]
+    topology_path = '{0}/{1}_topology.npz'.format(path, mesh_name)
+
+    if not os.path.isfile(topology_path):
+        return path
+
+    saved = np.load(topology_path)
+    saved_mesh = ArrayMesh(saved['points'], saved['face_counts'], saved['face_verts'])
+
+    current_mesh = apiMesh.Mesh(str(mesh), cache_dir=cache_dir)
+
+    vert_map = current_mesh.match_topology(saved_mesh)
+
+    if np.array_equal(vert_map, np.arange(len(vert_map))):
+        return path
+
+    unmatched = np.count_nonzero(vert_map < 0)
+    if unmatched:
+        print ' XML weights in: {0} verts on {1} have no match, they keep no weights'.format(unmatched, mesh_name)
+
+    # the current index of each saved vert
+    new_ids = np.full(saved_mesh.num_verts, -1, dtype=np.int64)
+    new_ids[vert_map[vert_map > -1]] = np.flatnonzero(vert_map > -1)
+
+    tree = ET.parse('{0}/{1}.xml'.format(path, mesh_name))
+
+    for element in itertools.chain(tree.getroot().findall('shape'), tree.getroot().findall('weights')):
+        for point in element.findall('point'):
+            new_id = new_ids[int(point.get('index'))]
+
+            if new_id < 0:
+                element.remove(point)
+            else:
+                point.set('index', str(new_id))
+
+        if element.get('max') is not None:
+            element.set('max', str(max([int(point.get('index')) for point in element.findall('point')] or [0])))
+
+    remap_path = tempfile.mkdtemp(prefix='remappedWeights_')
+    tree.write('{0}/{1}.xml'.format(remap_path, mesh_name))
+
+    return remap_path
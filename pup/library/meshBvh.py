@@ -0,0 +1,1142 @@
+import numpy as np
+
+from scipy.spatial import cKDTree
+
+
+def morton_codes(positions, bits=10):
+    """
+
+    Get the morton (z-order) code of each position within the bounds of all the positions
+
+    :param positions: n x 3 positions
+    :type positions: numpy.ndarray
+    :param bits: bits per axis
+    :type bits: int
+    :return: morton codes
+    :rtype: numpy.ndarray
+    """
+
+    min_ = positions.min(axis=0)
+    size = np.maximum(positions.max(axis=0) - min_, 1e-12)
+
+    cells = ((positions - min_) / size * ((1 << bits) - 1)).astype(np.uint64)
+
+    codes = np.zeros(len(positions), dtype=np.uint64)
+
+    for bit in range(bits):
+        for axis in range(3):
+            codes |= ((cells[:, axis] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(3 * bit + axis)
+
+    return codes
+
+
+def cross(vectors_a, vectors_b, out=None):
+    """
+
+    Row by row cross product of two n x 3 arrays, faster than np.cross for large arrays
+
+    :param vectors_a: n x 3 vectors
+    :type vectors_a: numpy.ndarray
+    :param vectors_b: n x 3 vectors
+    :type vectors_b: numpy.ndarray
+    :param out: n x 3 array to write the result to, it must not share memory with the inputs
+    :type out: numpy.ndarray
+    :return: n x 3 cross products
+    :rtype: numpy.ndarray
+    """
+
+    if out is None:
+        out = np.empty(np.broadcast(vectors_a, vectors_b).shape)
+
+    out[:, 0] = vectors_a[:, 1] * vectors_b[:, 2] - vectors_a[:, 2] * vectors_b[:, 1]
+    out[:, 1] = vectors_a[:, 2] * vectors_b[:, 0] - vectors_a[:, 0] * vectors_b[:, 2]
+    out[:, 2] = vectors_a[:, 0] * vectors_b[:, 1] - vectors_a[:, 1] * vectors_b[:, 0]
+
+    return out
+
+
+def closest_points_on_triangles(positions, tri_a, tri_b, tri_c):
+    """
+
+    Get the closest point on each triangle to each position, all arrays are matched row for row
+
+    :param positions: n x 3 positions
+    :param tri_a: n x 3 first triangle corners
+    :param tri_b: n x 3 second triangle corners
+    :param tri_c: n x 3 third triangle corners
+    :return: closest points, barycentric co-ords
+    :rtype: numpy.ndarray, numpy.ndarray
+    """
+
+    edge_ab = tri_b - tri_a
+    edge_ac = tri_c - tri_a
+    to_pos = positions - tri_a
+
+    d00 = np.einsum("ij,ij->i", edge_ab, edge_ab)
+    d01 = np.einsum("ij,ij->i", edge_ab, edge_ac)
+    d11 = np.einsum("ij,ij->i", edge_ac, edge_ac)
+    d20 = np.einsum("ij,ij->i", to_pos, edge_ab)
+    d21 = np.einsum("ij,ij->i", to_pos, edge_ac)
+
+    denom = d00 * d11 - d01 * d01
+    safe_denom = np.where(np.abs(denom) > 1e-30, denom, 1.0)
+
+    # barycentric co-ords of the position projected onto the triangle plane
+    bary_b = (d11 * d20 - d01 * d21) / safe_denom
+    bary_c = (d00 * d21 - d01 * d20) / safe_denom
+
+    bary = np.stack([1.0 - bary_b - bary_c, bary_b, bary_c], axis=1)
+
+    outside = (np.abs(denom) <= 1e-30) | (bary < 0).any(axis=1)
+
+    if outside.any():
+        # anything projecting outside the triangle is closest to one of its edges
+        pos = positions[outside]
+        corners = [tri_a[outside], tri_b[outside], tri_c[outside]]
+
+        best_d2 = np.full(len(pos), np.inf)
+        best_bary = np.zeros((len(pos), 3))
+
+        for start, end in ((0, 1), (1, 2), (2, 0)):
+            seg = corners[end] - corners[start]
+            seg_len2 = np.einsum("ij,ij->i", seg, seg)
+
+            t = np.einsum("ij,ij->i", pos - corners[start], seg) / np.where(seg_len2 > 0, seg_len2, 1.0)
+            t = np.clip(t, 0.0, 1.0)
+
+            diff = corners[start] + seg * t[:, np.newaxis] - pos
+            d2 = np.einsum("ij,ij->i", diff, diff)
+
+            closer = d2 < best_d2
+
+            best_d2[closer] = d2[closer]
+            best_bary[closer] = 0.0
+            best_bary[closer, start] = 1.0 - t[closer]
+            best_bary[closer, end] = t[closer]
+
+        bary[outside] = best_bary
+
+    closest = tri_a * bary[:, :1] + tri_b * bary[:, 1:2] + tri_c * bary[:, 2:]
+
+    return closest, bary
+
+
+def ray_triangle_intersections(origins, directions, tri_a, tri_b, tri_c, both_sides=True):
+    """
+
+    Intersect each ray with the matching triangle, all arrays are matched row for row
+
+    :param origins: n x 3 ray origins
+    :param directions: n x 3 ray directions
+    :param tri_a: n x 3 first triangle corners
+    :param tri_b: n x 3 second triangle corners
+    :param tri_c: n x 3 third triangle corners
+    :param both_sides: hit triangles facing away from the rays too
+    :type both_sides: bool
+    :return: hit mask, ray parameters, barycentric co-ords
+    :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray
+    """
+
+    edge_ab = tri_b - tri_a
+    edge_ac = tri_c - tri_a
+
+    p_vec = cross(directions, edge_ac)
+    det = np.einsum("ij,ij->i", edge_ab, p_vec)
+
+    safe_det = np.where(det != 0, det, 1.0)
+
+    to_origin = origins - tri_a
+    bary_b = np.einsum("ij,ij->i", to_origin, p_vec) / safe_det
+
+    q_vec = cross(to_origin, edge_ab)
+    bary_c = np.einsum("ij,ij->i", directions, q_vec) / safe_det
+
+    ray_t = np.einsum("ij,ij->i", edge_ac, q_vec) / safe_det
+
+    # triangles facing the rays have a positive determinant
+    facing = det > 0 if not both_sides else det != 0
+
+    hit = facing & (bary_b >= 0) & (bary_c >= 0) & (bary_b + bary_c <= 1) & (ray_t >= 0)
+
+    return hit, ray_t, np.stack([1.0 - bary_b - bary_c, bary_b, bary_c], axis=1)
+
+
+def triangle_solid_angles(positions, tri_a, tri_b, tri_c):
+    """
+
+    Get the signed solid angle each triangle covers seen from the matching position (van Oosterom and Strackee),
+    positive where the position is behind the triangle
+
+    :param positions: n x 3 positions
+    :param tri_a: n x 3 first triangle verts
+    :param tri_b: n x 3 second triangle verts
+    :param tri_c: n x 3 third triangle verts
+    :return: solid angles
+    :rtype: numpy.ndarray
+    """
+
+    a = tri_a - positions
+    b = tri_b - positions
+    c = tri_c - positions
+
+    length_a = np.sqrt(np.einsum("ij,ij->i", a, a))
+    length_b = np.sqrt(np.einsum("ij,ij->i", b, b))
+    length_c = np.sqrt(np.einsum("ij,ij->i", c, c))
+
+    determinant = np.einsum("ij,ij->i", a, cross(b, c))
+    divisor = (length_a * length_b * length_c + np.einsum("ij,ij->i", a, b) * length_c +
+               np.einsum("ij,ij->i", b, c) * length_a + np.einsum("ij,ij->i", c, a) * length_b)
+
+    return 2.0 * np.arctan2(determinant, divisor)
+
+
+class TriangleBvh(object):
+
+    def __init__(self, points, tris, leaf_size=4):
+        """
+
+        Bounding volume hierarchy over a triangle mesh. Triangles are sorted along a morton curve and packed into
+        fixed size leaves, the tree above them is a complete binary tree stored heap style so node i has the
+        children 2i + 1 and 2i + 2 and every leaf sits on the same level
+
+        :param points: vertex positions
+        :type points: numpy.ndarray
+        :param tris: n_tris x 3 vert ids
+        :type tris: numpy.ndarray
+        :param leaf_size: triangles per leaf
+        :type leaf_size: int
+        """
+
+        self.points = np.asarray(points, dtype=np.float64)
+        self.tris = np.asarray(tris, dtype=np.int64).reshape(-1, 3)
+        self.leaf_size = leaf_size
+
+        tri_points = self.points[self.tris]
+
+        # per triangle bounds, used to skip triangles before the exact test
+        self.tri_min = tri_points.min(axis=1)
+        self.tri_max = tri_points.max(axis=1)
+
+        self.tri_normals = cross(tri_points[:, 1] - tri_points[:, 0], tri_points[:, 2] - tri_points[:, 0])
+        lengths = np.sqrt(np.einsum("ij,ij->i", self.tri_normals, self.tri_normals))
+        self.tri_normals /= np.where(lengths > 0, lengths, 1.0)[:, np.newaxis]
+
+        order = np.argsort(morton_codes(tri_points.mean(axis=1)), kind="stable")
+
+        self.depth = int(np.ceil(np.log2(max(1.0, np.ceil(len(self.tris) / float(leaf_size))))))
+        self.num_leaves = 1 << self.depth
+        self.first_leaf = self.num_leaves - 1
+
+        # tri ids in each leaf, -1 pads the leaves past the end of the mesh
+        self.leaf_tris = np.full(self.num_leaves * leaf_size, -1, dtype=np.int64)
+        self.leaf_tris[:len(order)] = order
+        self.leaf_tris = self.leaf_tris.reshape(self.num_leaves, leaf_size)
+
+        self.box_min = np.full((2 * self.num_leaves - 1, 3), np.inf)
+        self.box_max = np.full((2 * self.num_leaves - 1, 3), -np.inf)
+
+        tri_min = np.full((self.num_leaves * leaf_size, 3), np.inf)
+        tri_max = np.full((self.num_leaves * leaf_size, 3), -np.inf)
+        tri_min[:len(order)] = self.tri_min[order]
+        tri_max[:len(order)] = self.tri_max[order]
+
+        self.box_min[self.first_leaf:] = tri_min.reshape(self.num_leaves, leaf_size, 3).min(axis=1)
+        self.box_max[self.first_leaf:] = tri_max.reshape(self.num_leaves, leaf_size, 3).max(axis=1)
+
+        # fill the boxes in from the leaves up
+        for level in range(self.depth - 1, -1, -1):
+            nodes = np.arange((1 << level) - 1, (1 << (level + 1)) - 1)
+
+            self.box_min[nodes] = np.minimum(self.box_min[2 * nodes + 1], self.box_min[2 * nodes + 2])
+            self.box_max[nodes] = np.maximum(self.box_max[2 * nodes + 1], self.box_max[2 * nodes + 2])
+
+        # padding nodes past the end of the mesh have inverted boxes
+        self.filled = self.box_min[:, 0] <= self.box_max[:, 0]
+
+        # the box bounds again with each axis contiguous, for the ray slab tests. Empty nodes get nan boxes so
+        # every test against them fails without looking up filled
+        self.axis_min = np.where(self.filled, self.box_min.T, np.nan)
+        self.axis_max = np.where(self.filled, self.box_max.T, np.nan)
+
+        self._vert_tree = None
+        self._leaf_frames = None
+        self._leaf_corners = None
+        self._dipoles = None
+        self._triangle_dipoles = None
+
+    def vert_tree(self):
+        """
+
+        Get a kd tree of the triangle verts and the triangles around each of them, used to find a close triangle
+        to start each closest point search from
+
+        :return: kd tree, vert ids of the tree points, start of each tree point's triangles in the vert triangles
+                 and the vert triangles
+        :rtype: cKDTree, numpy.ndarray, numpy.ndarray, numpy.ndarray
+        """
+
+        if self._vert_tree is None:
+            corners = self.tris.ravel()
+            order = np.argsort(corners, kind="stable")
+            vert_ids, starts = np.unique(corners[order], return_index=True)
+
+            self._vert_tree = (cKDTree(self.points[vert_ids], leafsize=32, balanced_tree=False), vert_ids,
+                               np.append(starts, len(corners)), order // 3)
+
+        return self._vert_tree
+
+    def leaf_frames(self):
+        """
+
+        Get a box around each leaf lined up with the leaf's average normal. Surface patches that are tilted
+        against the world axes have thick axis aligned boxes, the oriented ones stay thin and cull far more
+
+        :return: 3 x 3 x n_leaves axes (axis, component, leaf), 3 x n_leaves box mins and maxes along each axis
+        :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray
+        """
+
+        if self._leaf_frames is None:
+            # pad the empty slots with the last triangle, it is in the same leaf as them or they are in empty leaves
+            leaf_tris = self.leaf_tris.ravel()
+            num_tris = len(self.tris)
+            leaf_tris = np.where(leaf_tris > -1, leaf_tris, max(num_tris - 1, 0))
+
+            normals = self.tri_normals[leaf_tris].reshape(self.num_leaves, self.leaf_size, 3).sum(axis=1)
+            lengths = np.sqrt(np.einsum("ij,ij->i", normals, normals))
+            normals = np.where(lengths[:, np.newaxis] > 1e-12, normals / np.maximum(lengths, 1e-12)[:, np.newaxis],
+                               [0.0, 0.0, 1.0])
+
+            # any direction away from the normal gives the other two axes
+            helper = np.eye(3)[np.argmin(np.abs(normals), axis=1)]
+            side = cross(normals, helper)
+            side /= np.sqrt(np.einsum("ij,ij->i", side, side))[:, np.newaxis]
+
+            axes = np.stack([side, cross(normals, side), normals])
+
+            leaf_points = self.points[self.tris[leaf_tris]].reshape(self.num_leaves, -1, 3)
+
+            box_min = np.empty((3, self.num_leaves))
+            box_max = np.empty((3, self.num_leaves))
+
+            for axis in range(3):
+                along = np.einsum("ijk,ik->ij", leaf_points, axes[axis])
+                box_min[axis] = along.min(axis=1)
+                box_max[axis] = along.max(axis=1)
+
+            self._leaf_frames = np.ascontiguousarray(axes.transpose(0, 2, 1)), box_min, box_max
+
+        return self._leaf_frames
+
+    def closest_points(self, positions, chunk_size=16384):
+        """
+
+        Get the closest point on the mesh to each position
+
+        :param positions: n x 3 positions
+        :type positions: numpy.ndarray
+        :param chunk_size: positions to search at once, limits the memory used
+        :type chunk_size: int
+        :return: closest points, triangle ids, barycentric co-ords, distances
+        :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray
+        """
+
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+
+        closest = np.zeros((len(positions), 3))
+        tri_ids = np.full(len(positions), -1, dtype=np.int64)
+        bary = np.zeros((len(positions), 3))
+        dist_sq = np.full(len(positions), np.inf)
+
+        if not len(positions) or not len(self.tris):
+            return closest, tri_ids, bary, dist_sq
+
+        # searching nearby positions together keeps the gathers from the mesh arrays local
+        order = np.argsort(morton_codes(positions), kind="stable")
+
+        for start in range(0, len(positions), chunk_size):
+            chunk = order[start:start + chunk_size]
+
+            closest[chunk], tri_ids[chunk], bary[chunk], dist_sq[chunk] = self._closest_chunk(positions[chunk])
+
+        return closest, tri_ids, bary, np.sqrt(dist_sq)
+
+    def _closest_chunk(self, positions):
+        """
+
+        Closest point search for one chunk of positions. The triangles around the nearest vert give each position
+        a close upper bound, then every leaf whose boxes are within that bound is checked for anything closer
+
+        :param positions: n x 3 positions
+        :return: closest points, triangle ids, barycentric co-ords, squared distances
+        """
+
+        tree, vert_ids, starts, vert_tris = self.vert_tree()
+
+        _, nearest = tree.query(positions)
+
+        counts = starts[nearest + 1] - starts[nearest]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        seed_query_ids = np.repeat(np.arange(len(positions)), counts)
+        seed_tri_ids = vert_tris[np.repeat(starts[nearest], counts) + offsets]
+
+        seed_points = self.points[self.tris[seed_tri_ids]]
+        seeds, seed_bary = closest_points_on_triangles(positions[seed_query_ids], seed_points[:, 0],
+                                                       seed_points[:, 1], seed_points[:, 2])
+
+        diff = seeds - positions[seed_query_ids]
+        seed_d2 = np.einsum("ij,ij->i", diff, diff)
+
+        bound = np.full(len(positions), np.inf)
+        np.minimum.at(bound, seed_query_ids, seed_d2)
+        bound = bound * (1.0 + 1e-9) + 1e-12
+
+        axis_positions = np.ascontiguousarray(positions.T)
+        axes, leaf_min, leaf_max = self.leaf_frames()
+
+        query_ids = np.arange(len(positions))
+        nodes = np.zeros(len(positions), dtype=np.int64)
+
+        for level in range(1, self.depth + 1):
+            query_ids = np.repeat(query_ids, 2)
+            nodes = np.repeat(2 * nodes + 1, 2)
+            nodes[1::2] += 1
+
+            pos = [axis_positions[axis][query_ids] for axis in range(3)]
+            distance_sq = np.zeros(len(nodes))
+
+            if level < self.depth:
+                for axis in range(3):
+                    gap = np.maximum(np.maximum(self.axis_min[axis][nodes] - pos[axis],
+                                                pos[axis] - self.axis_max[axis][nodes]), 0.0)
+                    distance_sq += gap * gap
+
+            else:
+                # the leaves are thin enough to be worth their oriented boxes
+                leaves = nodes - self.first_leaf
+
+                for axis in range(3):
+                    along = (axes[axis][0][leaves] * pos[0] + axes[axis][1][leaves] * pos[1] +
+                             axes[axis][2][leaves] * pos[2])
+
+                    gap = np.maximum(np.maximum(leaf_min[axis][leaves] - along, along - leaf_max[axis][leaves]), 0.0)
+                    distance_sq += gap * gap
+
+            keep = distance_sq <= bound[query_ids]
+
+            query_ids = query_ids[keep]
+            nodes = nodes[keep]
+
+        leaf_tris = self.leaf_tris[nodes - self.first_leaf]
+
+        query_ids = np.repeat(query_ids, self.leaf_size)
+        tri_ids = leaf_tris.ravel()
+
+        # skip the padding and the triangles around the nearest vert, they were tested for the bound
+        valid = tri_ids > -1
+        valid[valid] = (self.tris[tri_ids[valid]] != vert_ids[nearest[query_ids[valid]]][:, np.newaxis]).all(axis=1)
+
+        query_ids = query_ids[valid]
+        tri_ids = tri_ids[valid]
+
+        pos = positions[query_ids]
+
+        # the triangle box and plane distances are cheap lower bounds, only test what passes both
+        gap = np.maximum(np.maximum(self.tri_min[tri_ids] - pos, pos - self.tri_max[tri_ids]), 0.0)
+        plane_dist = np.einsum("ij,ij->i", pos - self.points[self.tris[tri_ids, 0]], self.tri_normals[tri_ids])
+
+        valid = (np.einsum("ij,ij->i", gap, gap) <= bound[query_ids]) & (plane_dist * plane_dist <= bound[query_ids])
+        query_ids = query_ids[valid]
+        tri_ids = tri_ids[valid]
+        pos = pos[valid]
+
+        tri_points = self.points[self.tris[tri_ids]]
+
+        candidates, candidate_bary = closest_points_on_triangles(pos, tri_points[:, 0], tri_points[:, 1],
+                                                                 tri_points[:, 2])
+
+        diff = candidates - pos
+
+        query_ids = np.concatenate([seed_query_ids, query_ids])
+        tri_ids = np.concatenate([seed_tri_ids, tri_ids])
+        candidates = np.concatenate([seeds, candidates])
+        candidate_bary = np.concatenate([seed_bary, candidate_bary])
+        d2 = np.concatenate([seed_d2, np.einsum("ij,ij->i", diff, diff)])
+
+        # best candidate for each position, every position has at least one seed
+        order = np.lexsort((d2, query_ids))
+        first = order[np.r_[True, query_ids[order][1:] != query_ids[order][:-1]]]
+
+        return candidates[first], tri_ids[first], candidate_bary[first], d2[first]
+
+    def leaf_corners(self):
+        """
+
+        Get the corners of the triangles in each leaf slot, laid out in leaf order so the triangles of a leaf are
+        read in one block. Padding slots repeat the last triangle and have to be skipped through leaf_tris
+
+        :return: n_leaves * leaf_size x 3 x 3 triangle corners
+        :rtype: numpy.ndarray
+        """
+
+        if self._leaf_corners is None:
+            leaf_tris = self.leaf_tris.ravel()
+            leaf_tris = np.where(leaf_tris > -1, leaf_tris, max(len(self.tris) - 1, 0))
+
+            self._leaf_corners = self.points[self.tris[leaf_tris]]
+
+        return self._leaf_corners
+
+    def ray_box_hits(self, origins, inv_directions, max_distance, ray_ids, nodes):
+        """
+
+        Slab test rays against node boxes, the ray arrays are axis major so each axis is a contiguous row
+
+        :param origins: 3 x n_rays ray origins
+        :param inv_directions: 3 x n_rays reciprocals of the ray directions, inf where a direction is zero
+        :param max_distance: n_rays furthest ray parameters to look for hits
+        :param ray_ids: n ray ids to test
+        :param nodes: n node ids to test each ray against
+        :return: hit mask, ray parameter where each ray enters each box
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        enter = np.zeros(len(nodes))
+        leave = max_distance[ray_ids]
+
+        for axis in range(3):
+            origin = origins[axis][ray_ids]
+            inv_direction = inv_directions[axis][ray_ids]
+
+            box_min = self.axis_min[axis][nodes]
+            box_max = self.axis_max[axis][nodes]
+
+            with np.errstate(invalid="ignore"):
+                to_min = (box_min - origin) * inv_direction
+                to_max = (box_max - origin) * inv_direction
+
+            # a ray parallel to the slab never crosses it, it is inside the slab the whole way or not at all.
+            # Origins on the slab planes would give 0 * inf there
+            parallel = np.isinf(inv_direction)
+
+            if parallel.any():
+                inside = (box_min <= origin) & (origin <= box_max)
+
+                to_min = np.where(parallel, -np.inf, to_min)
+                to_max = np.where(parallel, np.where(inside, np.inf, -np.inf), to_max)
+
+            np.maximum(enter, np.minimum(to_min, to_max), out=enter)
+            np.minimum(leave, np.maximum(to_min, to_max), out=leave)
+
+        # the nan boxes of empty nodes fail here
+        return leave >= enter, enter
+
+    @staticmethod
+    def _inv_directions(directions):
+        """
+
+        Get the axis major reciprocal directions for the slab tests
+
+        :param directions: n x 3 ray directions
+        :return: 3 x n reciprocal directions
+        :rtype: numpy.ndarray
+        """
+
+        with np.errstate(divide="ignore"):
+            return np.ascontiguousarray((1.0 / directions).T)
+
+    def _descend(self, axis_origins, inv_directions, max_distance, ray_ids, nodes, levels):
+        """
+
+        Follow rays down the tree from the given nodes, keeping every child box each ray passes through
+
+        :param axis_origins: 3 x n_rays ray origins
+        :param inv_directions: 3 x n_rays reciprocal ray directions
+        :param max_distance: n_rays furthest ray parameters to look for hits
+        :param ray_ids: ray id of each node to start from
+        :param nodes: nodes to start from
+        :param levels: number of levels to go down
+        :return: ray ids, nodes and the ray parameters where the rays enter them
+        :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray
+        """
+
+        enter = np.zeros(len(nodes))
+
+        for _ in range(levels):
+            ray_ids = np.repeat(ray_ids, 2)
+            nodes = np.repeat(2 * nodes + 1, 2)
+            nodes[1::2] += 1
+
+            keep, enter = self.ray_box_hits(axis_origins, inv_directions, max_distance, ray_ids, nodes)
+
+            ray_ids = ray_ids[keep]
+            nodes = nodes[keep]
+            enter = enter[keep]
+
+        return ray_ids, nodes, enter
+
+    def _leaf_hits(self, origins, directions, max_distance, both_sides, ray_ids, nodes):
+        """
+
+        Test rays against every triangle in the matching leaves
+
+        :param origins: n_rays x 3 ray origins
+        :param directions: n_rays x 3 unit ray directions
+        :param max_distance: n_rays furthest distances to look for hits
+        :param both_sides: hit triangles facing away from the rays too
+        :param ray_ids: ray id of each leaf node
+        :param nodes: leaf nodes
+        :return: ray ids, triangle ids, distances, barycentric co-ords of the hits
+        :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray
+        """
+
+        slots = ((nodes - self.first_leaf) * self.leaf_size)[:, np.newaxis] + np.arange(self.leaf_size)
+        slots = slots.ravel()
+        ray_ids = np.repeat(ray_ids, self.leaf_size)
+
+        tri_ids = self.leaf_tris.ravel()[slots]
+
+        valid = tri_ids > -1
+        ray_ids = ray_ids[valid]
+        tri_ids = tri_ids[valid]
+
+        corners = self.leaf_corners()[slots[valid]]
+
+        hit, distances, bary = ray_triangle_intersections(origins[ray_ids], directions[ray_ids], corners[:, 0],
+                                                          corners[:, 1], corners[:, 2], both_sides=both_sides)
+
+        hit &= distances <= max_distance[ray_ids]
+
+        return ray_ids[hit], tri_ids[hit], distances[hit], bary[hit]
+
+    def intersect_rays(self, origins, directions, max_distance=None, both_sides=True, chunk_size=16384):
+        """
+
+        Get every intersection of the rays with the mesh, sorted by ray and then by distance along the ray
+
+        :param origins: n x 3 ray origins
+        :type origins: numpy.ndarray
+        :param directions: n x 3 ray directions, they don't need to be unit length
+        :type directions: numpy.ndarray
+        :param max_distance: furthest distance to look for hits along each ray, None is unlimited
+        :type max_distance: float or numpy.ndarray
+        :param both_sides: hit triangles facing away from the rays too
+        :type both_sides: bool
+        :param chunk_size: rays to cast at once, limits the memory used
+        :type chunk_size: int
+        :return: ray ids, triangle ids, distances, barycentric co-ords
+        :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray
+        """
+
+        origins, directions, max_distance = self._ray_inputs(origins, directions, max_distance)
+
+        hits = [self._intersect_chunk(origins[start:start + chunk_size], directions[start:start + chunk_size],
+                                      max_distance[start:start + chunk_size], both_sides, start)
+                for start in range(0, len(origins), chunk_size)]
+
+        if not hits:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros((0, 3))
+
+        return tuple(np.concatenate(values) for values in zip(*hits))
+
+    @staticmethod
+    def _ray_inputs(origins, directions, max_distance):
+        """
+
+        Get the ray inputs as float arrays with unit directions and a max distance for every ray
+
+        :param origins: n x 3 ray origins
+        :param directions: n x 3 ray directions
+        :param max_distance: furthest distance to look for hits along each ray, None is unlimited
+        :return: origins, unit directions, max distances
+        :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray
+        """
+
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+
+        lengths = np.sqrt(np.einsum("ij,ij->i", directions, directions))
+        directions = directions / np.where(lengths > 0, lengths, 1.0)[:, np.newaxis]
+
+        max_distance = np.broadcast_to(np.inf if max_distance is None else max_distance, len(origins))
+
+        return origins, directions, max_distance
+
+    def _intersect_chunk(self, origins, directions, max_distance, both_sides, offset):
+        """
+
+        Ray casting for one chunk of rays, every node box a ray passes through is followed down to the leaves
+        and each ray is tested against the triangles there
+
+        :param origins: n x 3 ray origins
+        :param directions: n x 3 unit ray directions
+        :param max_distance: n furthest distances to look for hits
+        :param both_sides: hit triangles facing away from the rays too
+        :param offset: id of the first ray in the chunk
+        :return: ray ids, triangle ids, distances, barycentric co-ords
+        """
+
+        inv_directions = self._inv_directions(directions)
+        axis_origins = np.ascontiguousarray(origins.T)
+
+        ray_ids = np.arange(len(origins))
+        nodes = np.zeros(len(origins), dtype=np.int64)
+
+        keep, _ = self.ray_box_hits(axis_origins, inv_directions, max_distance, ray_ids, nodes)
+
+        ray_ids, nodes, _ = self._descend(axis_origins, inv_directions, max_distance, ray_ids[keep], nodes[keep],
+                                          self.depth)
+
+        ray_ids, tri_ids, distances, bary = self._leaf_hits(origins, directions, max_distance, both_sides, ray_ids,
+                                                            nodes)
+
+        order = np.lexsort((distances, ray_ids))
+
+        ray_ids = ray_ids[order]
+        tri_ids = tri_ids[order]
+        distances = distances[order]
+        bary = bary[order]
+
+        # rays through a shared edge or vert hit every triangle there, only keep the first of them
+        tolerance = 1e-9 * max(1.0, np.abs(self.box_max[0] - self.box_min[0]).max())
+        unique = np.ones(len(ray_ids), dtype=bool)
+        unique[1:] = (ray_ids[1:] != ray_ids[:-1]) | (distances[1:] - distances[:-1] > tolerance)
+
+        return ray_ids[unique] + offset, tri_ids[unique], distances[unique], bary[unique]
+
+    def first_hits(self, origins, directions, max_distance=None, both_sides=True, chunk_size=16384):
+        """
+
+        Get the first intersection of each ray with the mesh
+
+        :param origins: n x 3 ray origins
+        :param directions: n x 3 ray directions
+        :param max_distance: furthest distance to look for hits along each ray, None is unlimited
+        :param both_sides: hit triangles facing away from the rays too
+        :param chunk_size: rays to cast at once, limits the memory used
+        :type chunk_size: int
+        :return: triangle ids (-1 for misses), distances (inf for misses), barycentric co-ords
+        :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray
+        """
+
+        origins, directions, max_distance = self._ray_inputs(origins, directions, max_distance)
+
+        tri_ids = np.full(len(origins), -1, dtype=np.int64)
+        distances = np.full(len(origins), np.inf)
+        bary = np.zeros((len(origins), 3))
+
+        if not len(origins) or not len(self.tris):
+            return tri_ids, distances, bary
+
+        # rays starting near each other go through the same upper nodes
+        order = np.argsort(morton_codes(origins), kind="stable")
+
+        for start in range(0, len(origins), chunk_size):
+            chunk = order[start:start + chunk_size]
+
+            tri_ids[chunk], distances[chunk], bary[chunk] = self._first_hit_chunk(origins[chunk], directions[chunk],
+                                                                                  max_distance[chunk], both_sides)
+
+        return tri_ids, distances, bary
+
+    def _first_hit_chunk(self, origins, directions, max_distance, both_sides, subtree_levels=6):
+        """
+
+        First hit casting for one chunk of rays. The rays go down to the roots of small subtrees like
+        _intersect_chunk, then each ray visits its subtrees nearest first. Every hit shortens the ray, so the
+        subtrees behind it are dropped without being visited
+
+        :param origins: n x 3 ray origins
+        :param directions: n x 3 unit ray directions
+        :param max_distance: n furthest distances to look for hits
+        :param both_sides: hit triangles facing away from the rays too
+        :param subtree_levels: levels in each subtree
+        :return: triangle ids, distances, barycentric co-ords
+        """
+
+        inv_directions = self._inv_directions(directions)
+        axis_origins = np.ascontiguousarray(origins.T)
+
+        best_tri_ids = np.full(len(origins), -1, dtype=np.int64)
+        best_bary = np.zeros((len(origins), 3))
+        best = np.array(max_distance, dtype=np.float64)
+
+        ray_ids = np.arange(len(origins))
+        nodes = np.zeros(len(origins), dtype=np.int64)
+
+        keep, enter = self.ray_box_hits(axis_origins, inv_directions, best, ray_ids, nodes)
+
+        subtree_levels = min(subtree_levels, self.depth)
+
+        ray_ids, nodes, enter = self._descend(axis_origins, inv_directions, best, ray_ids[keep], nodes[keep],
+                                              self.depth - subtree_levels)
+
+        order = np.lexsort((enter, ray_ids))
+        ray_ids = ray_ids[order]
+        nodes = nodes[order]
+        enter = enter[order]
+
+        while len(ray_ids):
+            # the nearest subtree left for each ray
+            nearest = np.ones(len(ray_ids), dtype=bool)
+            nearest[1:] = ray_ids[1:] != ray_ids[:-1]
+
+            leaf_ray_ids, leaves, _ = self._descend(axis_origins, inv_directions, best, ray_ids[nearest],
+                                                    nodes[nearest], subtree_levels)
+
+            hit_ray_ids, tri_ids, distances, bary = self._leaf_hits(origins, directions, best, both_sides,
+                                                                    leaf_ray_ids, leaves)
+
+            # closest hit for each ray, a hit at the same distance as the current best doesn't replace it
+            order = np.lexsort((distances, hit_ray_ids))
+            first = order[np.r_[True, hit_ray_ids[order][1:] != hit_ray_ids[order][:-1]]] if len(order) else order
+            first = first[distances[first] < best[hit_ray_ids[first]]]
+
+            best[hit_ray_ids[first]] = distances[first]
+            best_tri_ids[hit_ray_ids[first]] = tri_ids[first]
+            best_bary[hit_ray_ids[first]] = bary[first]
+
+            # subtrees the rays enter after their current hits can't hold anything closer
+            keep = ~nearest & (enter <= best[ray_ids])
+
+            ray_ids = ray_ids[keep]
+            nodes = nodes[keep]
+            enter = enter[keep]
+
+        return best_tri_ids, np.where(best_tri_ids > -1, best, np.inf), best_bary
+
+    def hit_counts(self, origins, directions, max_distance=None, both_sides=True):
+        """
+
+        Get the number of times each ray crosses the mesh
+
+        :param origins: n x 3 ray origins
+        :param directions: n x 3 ray directions
+        :param max_distance: furthest distance to look for hits along each ray, None is unlimited
+        :param both_sides: count triangles facing away from the rays too
+        :return: hit counts
+        :rtype: numpy.ndarray
+        """
+
+        ray_ids, _, _, _ = self.intersect_rays(origins, directions, max_distance=max_distance,
+                                               both_sides=both_sides)
+
+        return np.bincount(ray_ids, minlength=len(np.asarray(origins).reshape(-1, 3)))
+
+    def dipoles(self):
+        """
+
+        Get the far field approximation of each node for winding numbers, the area weighted normal sum, the area
+        weighted center and a radius around the center holding all of the node's triangles
+
+        :return: node area vectors, centers and radii
+        :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray
+        """
+
+        if self._dipoles is None:
+            tri_points = self.points[self.tris]
+
+            area_vectors = cross(tri_points[:, 1] - tri_points[:, 0], tri_points[:, 2] - tri_points[:, 0]) * 0.5
+            areas = np.sqrt(np.einsum("ij,ij->i", area_vectors, area_vectors))
+            centers = tri_points.mean(axis=1)
+
+            num_nodes = 2 * self.num_leaves - 1
+            node_vectors = np.zeros((num_nodes, 3))
+            node_areas = np.zeros(num_nodes)
+            node_centers = np.zeros((num_nodes, 3))
+            radii = np.zeros(num_nodes)
+
+            valid = self.leaf_tris > -1
+            leaf_tris = np.where(valid, self.leaf_tris, 0)
+            weights = np.where(valid, areas[leaf_tris], 0.0)
+
+            # zero area leaves still need a center inside their box
+            leaf_areas = weights.sum(axis=1)
+            weights = np.where(leaf_areas[:, np.newaxis] > 0, weights, valid)
+            leaf_weights = np.maximum(weights.sum(axis=1), 1e-300)
+
+            leaves = slice(self.first_leaf, None)
+            node_vectors[leaves] = np.einsum("ij,ijk->ik", valid.astype(np.float64), area_vectors[leaf_tris])
+            node_areas[leaves] = leaf_areas
+            node_centers[leaves] = np.einsum("ij,ijk->ik", weights, centers[leaf_tris]) / leaf_weights[:, np.newaxis]
+
+            offsets = tri_points[leaf_tris] - node_centers[leaves][:, np.newaxis, np.newaxis]
+            reach = np.sqrt(np.einsum("ijkl,ijkl->ijk", offsets, offsets)).max(axis=2)
+            radii[leaves] = np.where(valid, reach, 0.0).max(axis=1)
+
+            for level in range(self.depth - 1, -1, -1):
+                nodes = np.arange((1 << level) - 1, (1 << (level + 1)) - 1)
+                left = 2 * nodes + 1
+                right = left + 1
+
+                node_vectors[nodes] = node_vectors[left] + node_vectors[right]
+                node_areas[nodes] = node_areas[left] + node_areas[right]
+
+                # area weighted, falling back to the filled children for zero area nodes
+                weight_left = np.where(node_areas[nodes] > 0, node_areas[left], self.filled[left])
+                weight_right = np.where(node_areas[nodes] > 0, node_areas[right], self.filled[right])
+                total = np.maximum(weight_left + weight_right, 1e-300)
+
+                node_centers[nodes] = (node_centers[left] * weight_left[:, np.newaxis] +
+                                       node_centers[right] * weight_right[:, np.newaxis]) / total[:, np.newaxis]
+
+                # a sphere around both children's spheres, or around the node's box when that is tighter
+                for child in (left, right):
+                    gap = node_centers[child] - node_centers[nodes]
+                    reach = np.sqrt(np.einsum("ij,ij->i", gap, gap)) + radii[child]
+
+                    radii[nodes] = np.maximum(radii[nodes], np.where(self.filled[child], reach, 0.0))
+
+                centers = node_centers[nodes]
+                corner = np.maximum(self.box_max[nodes] - centers, centers - self.box_min[nodes])
+
+                radii[nodes] = np.minimum(radii[nodes], np.sqrt(np.einsum("ij,ij->i", corner, corner)))
+
+            self._dipoles = node_vectors, node_centers, radii
+
+        return self._dipoles
+
+    def triangle_dipoles(self):
+        """
+
+        Get the far field approximation of each triangle in the leaf slots, like dipoles does for the nodes. Big
+        leaves can straddle a jump in the curve, testing their triangles one by one keeps far ones approximated
+
+        :return: n_leaves * leaf_size area vectors, centers and radii
+        :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray
+        """
+
+        if self._triangle_dipoles is None:
+            corners = self.leaf_corners()
+
+            centers = corners.mean(axis=1)
+            offsets = corners - centers[:, np.newaxis]
+
+            self._triangle_dipoles = (cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]) * 0.5,
+                                      centers, np.sqrt(np.einsum("ijk,ijk->ij", offsets, offsets)).max(axis=1))
+
+        return self._triangle_dipoles
+
+    def winding_numbers(self, positions, accuracy=2.0, chunk_size=16384):
+        """
+
+        Get the generalized winding number of the mesh around each position, about 1 inside and 0 outside even
+        for meshes with holes. The positions are grouped into their own tree and the two trees are walked
+        together. A node further from a group than accuracy times their radii is treated as a single dipole
+        (Barill et al. 2018) and only its value and gradient at the group center are kept, the positions pick
+        those up on the way back down. Leaf groups carry on one position at a time and the triangles that are
+        still too close are summed exactly
+
+        :param positions: n x 3 positions
+        :type positions: numpy.ndarray
+        :param accuracy: distance in node and group radii beyond which a node is approximated, higher is more
+                         exact
+        :type accuracy: float
+        :param chunk_size: positions to evaluate at once, limits the memory used
+        :type chunk_size: int
+        :return: winding numbers
+        :rtype: numpy.ndarray
+        """
+
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+
+        winding = np.zeros(len(positions))
+
+        if not len(positions) or not len(self.tris):
+            return winding
+
+        # nearby positions share their groups, so they are evaluated together
+        order = np.argsort(morton_codes(positions), kind="stable")
+
+        for start in range(0, len(positions), chunk_size):
+            chunk = order[start:start + chunk_size]
+
+            winding[chunk] = self._winding_chunk(positions[chunk], accuracy)
+
+        return winding
+
+    def _winding_chunk(self, positions, accuracy, leaf_size=4):
+        """
+
+        Winding numbers for one chunk of positions, see winding_numbers
+
+        :param positions: n x 3 positions, sorted along a morton curve
+        :param accuracy: distance in node radii beyond which a node is approximated
+        :param leaf_size: positions in each leaf of the position tree
+        :return: winding numbers
+        :rtype: numpy.ndarray
+        """
+
+        node_vectors, node_centers, radii = self.dipoles()
+
+        # a complete tree over the positions like the triangle one, the positions are already in curve order
+        depth = int(np.ceil(np.log2(max(1.0, np.ceil(len(positions) / float(leaf_size))))))
+        first_leaf = (1 << depth) - 1
+
+        slots = np.full((1 << depth) * leaf_size, -1, dtype=np.int64)
+        slots[:len(positions)] = np.arange(len(positions))
+        slots = slots.reshape(-1, leaf_size)
+
+        # padding repeats the last position, it shares a leaf with the padding or the leaf is empty
+        padded = positions[np.where(slots > -1, slots, len(positions) - 1)]
+
+        group_min = np.zeros((first_leaf + len(slots), 3))
+        group_max = np.zeros((first_leaf + len(slots), 3))
+
+        group_min[first_leaf:] = padded.min(axis=1)
+        group_max[first_leaf:] = padded.max(axis=1)
+
+        group_filled = np.zeros(len(group_min), dtype=bool)
+        group_filled[first_leaf:] = slots[:, 0] > -1
+
+        for level in range(depth - 1, -1, -1):
+            groups = np.arange((1 << level) - 1, (1 << (level + 1)) - 1)
+            left = 2 * groups + 1
+            right = left + 1
+
+            # an empty right child keeps its parent's box to the left child's
+            right_min = np.where(group_filled[right][:, np.newaxis], group_min[right], group_min[left])
+            right_max = np.where(group_filled[right][:, np.newaxis], group_max[right], group_max[left])
+
+            group_min[groups] = np.minimum(group_min[left], right_min)
+            group_max[groups] = np.maximum(group_max[left], right_max)
+            group_filled[groups] = group_filled[left]
+
+        group_centers = (group_min + group_max) * 0.5
+        group_radii = np.sqrt(np.einsum("ij,ij->i", group_max - group_min, group_max - group_min)) * 0.5
+
+        # value and gradient of the far field at each group center
+        values = np.zeros(len(group_centers))
+        gradients = np.zeros((len(group_centers), 3))
+
+        near_groups = []
+        near_nodes = []
+
+        groups = np.zeros(1, dtype=np.int64)
+        nodes = np.zeros(1, dtype=np.int64)
+        accept_sq = accuracy * accuracy
+
+        while len(groups):
+            offsets = node_centers[nodes] - group_centers[groups]
+            distance_sq = np.einsum("ij,ij->i", offsets, offsets)
+
+            reach = group_radii[groups] + radii[nodes]
+            far = distance_sq > accept_sq * reach * reach
+
+            if far.any():
+                far_groups = groups[far]
+                far_offsets = offsets[far]
+                far_vectors = node_vectors[nodes[far]]
+
+                inv_cube = distance_sq[far] ** -1.5
+                dipole = np.einsum("ij,ij->i", far_offsets, far_vectors) * inv_cube
+
+                # gradient of the dipole field with respect to the position
+                gradient = (far_offsets * (3.0 * dipole / distance_sq[far])[:, np.newaxis] -
+                            far_vectors * inv_cube[:, np.newaxis])
+
+                values += np.bincount(far_groups, dipole, minlength=len(values))
+
+                for axis in range(3):
+                    gradients[:, axis] += np.bincount(far_groups, gradient[:, axis], minlength=len(values))
+
+                groups = groups[~far]
+                nodes = nodes[~far]
+
+            # groups that are down to a leaf carry on position by position
+            group_leaf = groups >= first_leaf
+            near_groups.append(groups[group_leaf])
+            near_nodes.append(nodes[group_leaf])
+
+            groups = groups[~group_leaf]
+            nodes = nodes[~group_leaf]
+
+            # open the bigger of the two, or the group when the node is a leaf
+            split_group = (nodes >= self.first_leaf) | (group_radii[groups] > radii[nodes])
+
+            groups = np.concatenate([np.repeat(2 * groups[split_group] + 1, 2), np.repeat(groups[~split_group], 2)])
+            nodes = np.concatenate([np.repeat(nodes[split_group], 2), np.repeat(2 * nodes[~split_group] + 1, 2)])
+
+            num_split = 2 * split_group.sum()
+            groups[1:num_split:2] += 1
+            nodes[num_split + 1::2] += 1
+
+            keep = group_filled[groups] & self.filled[nodes]
+            groups = groups[keep]
+            nodes = nodes[keep]
+
+        # move the expansions down to the leaves
+        for level in range(1, depth + 1):
+            groups = np.arange((1 << level) - 1, (1 << (level + 1)) - 1)
+            parents = (groups - 1) // 2
+
+            values[groups] += values[parents] + np.einsum("ij,ij->i", gradients[parents],
+                                                          group_centers[groups] - group_centers[parents])
+            gradients[groups] += gradients[parents]
+
+        leaves = first_leaf + np.arange(len(positions)) // leaf_size
+
+        solid_angles = values[leaves] + np.einsum("ij,ij->i", gradients[leaves], positions - group_centers[leaves])
+
+        near_groups = np.concatenate(near_groups)
+        near_nodes = np.concatenate(near_nodes)
+
+        query_ids = slots[near_groups - first_leaf].ravel()
+        nodes = np.repeat(near_nodes, leaf_size)
+
+        valid = query_ids > -1
+        query_ids = query_ids[valid]
+        nodes = nodes[valid]
+
+        accept_sq = (accuracy * radii) ** 2
+        tri_vectors, tri_centers, tri_radii = self.triangle_dipoles()
+
+        # the rest of the way down one position at a time
+        while len(nodes):
+            offsets = node_centers[nodes] - positions[query_ids]
+            distance_sq = np.einsum("ij,ij->i", offsets, offsets)
+
+            far = distance_sq > accept_sq[nodes]
+
+            if far.any():
+                dipole = np.einsum("ij,ij->i", offsets[far], node_vectors[nodes[far]]) / distance_sq[far] ** 1.5
+                solid_angles += np.bincount(query_ids[far], dipole, minlength=len(positions))
+
+            # near leaves are opened up into their triangles, the far ones are still approximated
+            leaf = ~far & (nodes >= self.first_leaf)
+
+            if leaf.any():
+                leaf_query_ids = np.repeat(query_ids[leaf], self.leaf_size)
+                tri_slots = (((nodes[leaf] - self.first_leaf) * self.leaf_size)[:, np.newaxis] +
+                             np.arange(self.leaf_size)).ravel()
+
+                valid = self.leaf_tris.ravel()[tri_slots] > -1
+                leaf_query_ids = leaf_query_ids[valid]
+                tri_slots = tri_slots[valid]
+
+                offsets = tri_centers[tri_slots] - positions[leaf_query_ids]
+                distance_sq = np.einsum("ij,ij->i", offsets, offsets)
+
+                tri_far = distance_sq > (accuracy * tri_radii[tri_slots]) ** 2
+
+                dipole = (np.einsum("ij,ij->i", offsets[tri_far], tri_vectors[tri_slots[tri_far]]) /
+                          distance_sq[tri_far] ** 1.5)
+                solid_angles += np.bincount(leaf_query_ids[tri_far], dipole, minlength=len(positions))
+
+                leaf_query_ids = leaf_query_ids[~tri_far]
+                corners = self.leaf_corners()[tri_slots[~tri_far]]
+
+                exact = triangle_solid_angles(positions[leaf_query_ids], corners[:, 0], corners[:, 1], corners[:, 2])
+                solid_angles += np.bincount(leaf_query_ids, exact, minlength=len(positions))
+
+            split = ~far & ~leaf
+
+            query_ids = np.repeat(query_ids[split], 2)
+            nodes = np.repeat(2 * nodes[split] + 1, 2)
+            nodes[1::2] += 1
+
+            keep = self.filled[nodes]
+            query_ids = query_ids[keep]
+            nodes = nodes[keep]
+
+        return solid_angles / (4.0 * np.pi)
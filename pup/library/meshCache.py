@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from scipy.sparse import csr_matrix
+
+# bump this when the layout of anything stored changes, older caches are then ignored
+CACHE_VERSION = 2
+
+
+def sparse_to_arrays(matrix, prefix):
+    """
+
+    Split a sparse matrix into plain arrays that can be saved
+
+    :param matrix: sparse matrix
+    :type matrix: scipy.sparse.spmatrix
+    :param prefix: name to prefix the arrays with
+    :type prefix: str
+    :return: arrays by name
+    :rtype: dict
+    """
+
+    matrix = matrix.tocsr()
+
+    return {prefix + "_data": matrix.data,
+            prefix + "_indices": matrix.indices,
+            prefix + "_indptr": matrix.indptr,
+            prefix + "_shape": np.array(matrix.shape, dtype=np.int64)}
+
+
+def arrays_to_sparse(arrays, prefix):
+    """
+
+    Rebuild a csr matrix saved with sparse_to_arrays
+
+    :param arrays: arrays by name
+    :type arrays: dict
+    :param prefix: name the arrays were prefixed with
+    :type prefix: str
+    :return: sparse matrix
+    :rtype: scipy.sparse.csr_matrix
+    """
+
+    return csr_matrix((arrays[prefix + "_data"], arrays[prefix + "_indices"], arrays[prefix + "_indptr"]),
+                      shape=tuple(int(x) for x in arrays[prefix + "_shape"]))
+
+
+class MeshCache(object):
+
+    def __init__(self, directory, mmap=True):
+        """
+
+        On disk cache of mesh data keyed by a mesh fingerprint, each entry is a folder of .npy files under
+        <directory>/v<CACHE_VERSION>/<key>/<name>/ so the arrays can be memory mapped straight back in
+
+        :param directory: root folder of the cache
+        :type directory: str
+        :param mmap: memory map the arrays when loading rather than reading them into memory
+        :type mmap: bool
+        """
+
+        self.directory = directory
+        self.mmap = mmap
+
+    def entry_path(self, key, name):
+        """
+
+        Get the folder an entry is stored in
+
+        :param key: mesh fingerprint
+        :type key: str
+        :param name: entry name
+        :type name: str
+        :return: path
+        :rtype: str
+        """
+
+        return os.path.join(self.directory, "v{0}".format(CACHE_VERSION), key, name)
+
+    def load_arrays(self, key, name):
+        """
+
+        Load the arrays of an entry
+
+        :param key: mesh fingerprint
+        :type key: str
+        :param name: entry name
+        :type name: str
+        :return: arrays by name, None if the entry isn't cached
+        :rtype: dict or None
+        """
+
+        path = self.entry_path(key, name)
+
+        if not os.path.isdir(path):
+            return None
+
+        return dict((file_name[:-4], np.load(os.path.join(path, file_name), mmap_mode="r" if self.mmap else None,
+                                             allow_pickle=False))
+                    for file_name in os.listdir(path) if file_name.endswith(".npy"))
+
+    def save_arrays(self, key, name, arrays, replace=False):
+        """
+
+        Save the arrays of an entry. The entry is written to a temporary folder and moved into place so other
+        processes never see half an entry
+
+        :param key: mesh fingerprint
+        :type key: str
+        :param name: entry name
+        :type name: str
+        :param arrays: arrays by name
+        :type arrays: dict
+        :param replace: replace the entry if it is already saved, otherwise the saved one is kept
+        :type replace: bool
+        """
+
+        path = self.entry_path(key, name)
+        parent = os.path.dirname(path)
+
+        if not os.path.isdir(parent):
+            try:
+                os.makedirs(parent)
+            except OSError:  # made by another process in the meantime
+                pass
+
+        temp_path = tempfile.mkdtemp(dir=parent)
+
+        for array_name, array in arrays.items():
+            np.save(os.path.join(temp_path, array_name + ".npy"), np.asarray(array), allow_pickle=False)
+
+        if replace:
+            shutil.rmtree(path, ignore_errors=True)
+
+        try:
+            os.rename(temp_path, path)
+        except OSError:  # already saved by another process
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+    def clear(self, key=None):
+        """
+
+        Delete the cached entries of one mesh, or the whole cache
+
+        :param key: mesh fingerprint, None clears everything
+        :type key: str
+        """
+
+        path = self.directory if key is None else os.path.join(self.directory, "v{0}".format(CACHE_VERSION), key)
+
+        shutil.rmtree(path, ignore_errors=True)
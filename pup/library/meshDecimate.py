@@ -0,0 +1,303 @@
+import numpy as np
+
+from scipy.sparse import csr_matrix
+
+from .meshBvh import cross
+
+
+def plane_quadrics(points, tris):
+    """
+
+    Get the area weighted plane quadric of each triangle, the 4 x 4 matrix that gives the squared distance of a
+    point to the triangle's plane
+
+    :param points: vertex positions
+    :type points: numpy.ndarray
+    :param tris: n_tris x 3 vert ids
+    :type tris: numpy.ndarray
+    :return: n_tris x 4 x 4 quadrics
+    :rtype: numpy.ndarray
+    """
+
+    tri_points = points[tris]
+
+    normals = cross(tri_points[:, 1] - tri_points[:, 0], tri_points[:, 2] - tri_points[:, 0])
+    double_areas = np.sqrt(np.einsum("ij,ij->i", normals, normals))
+    normals /= np.where(double_areas > 0, double_areas, 1.0)[:, np.newaxis]
+
+    planes = np.concatenate([normals, -np.einsum("ij,ij->i", normals, tri_points[:, 0])[:, np.newaxis]], axis=1)
+
+    return planes[:, :, np.newaxis] * planes[:, np.newaxis] * (double_areas * 0.5)[:, np.newaxis, np.newaxis]
+
+
+def edge_quadrics(points, edges, normals, weight):
+    """
+
+    Get quadrics for planes standing on edges, used to hold open boundaries in place
+
+    :param points: vertex positions
+    :param edges: n x 2 vert ids
+    :param normals: n x 3 normals of the faces the edges belong to
+    :param weight: scale of the quadrics relative to the face quadrics
+    :return: n x 4 x 4 quadrics
+    :rtype: numpy.ndarray
+    """
+
+    vectors = points[edges[:, 1]] - points[edges[:, 0]]
+    squared_lengths = np.einsum("ij,ij->i", vectors, vectors)
+
+    sides = cross(vectors, normals)
+    lengths = np.sqrt(np.einsum("ij,ij->i", sides, sides))
+    sides /= np.where(lengths > 0, lengths, 1.0)[:, np.newaxis]
+
+    planes = np.concatenate([sides, -np.einsum("ij,ij->i", sides, points[edges[:, 0]])[:, np.newaxis]], axis=1)
+
+    return planes[:, :, np.newaxis] * planes[:, np.newaxis] * (squared_lengths * weight)[:, np.newaxis, np.newaxis]
+
+
+def sum_quadrics(ids, quadrics, length):
+    """
+
+    Sum the quadrics that share an id
+
+    :param ids: id for each quadric
+    :param quadrics: n x 4 x 4 quadrics
+    :param length: number of ids
+    :return: length x 4 x 4 quadrics
+    :rtype: numpy.ndarray
+    """
+
+    flat = quadrics.reshape(-1, 16)
+
+    return np.stack([np.bincount(ids, flat[:, i], minlength=length) for i in range(16)], axis=1).reshape(-1, 4, 4)
+
+
+def decimate_triangles(points, tris, corner_uv_ids=None, target_triangles=None, ratio=0.5, preserve_boundary=True,
+                       preserve_uv_seams=True, boundary_weight=100.0, max_passes=200):
+    """
+
+    Reduce a triangle mesh by collapsing edges in order of their quadric error (Garland and Heckbert). Every
+    collapse moves one vert onto the other, so the verts that are left are a subset of the source verts and
+    map straight back to it. Collapses run in passes, each pass takes the cheapest collapse of every vert and
+    keeps the ones whose neighbourhoods don't touch so they can all be applied at once. Collapses that would
+    pinch the surface (link condition) or flip a triangle are skipped
+
+    :param points: vertex positions
+    :type points: numpy.ndarray
+    :param tris: n_tris x 3 vert ids
+    :type tris: numpy.ndarray
+    :param corner_uv_ids: n_tris x 3 uv ids of each triangle corner, None for meshes without uvs
+    :type corner_uv_ids: numpy.ndarray
+    :param target_triangles: number of triangles to reduce to, None uses the ratio
+    :type target_triangles: int
+    :param ratio: fraction of the triangles to keep when there is no target
+    :type ratio: float
+    :param preserve_boundary: never move verts on open edges
+    :type preserve_boundary: bool
+    :param preserve_uv_seams: never move verts with more than one uv
+    :type preserve_uv_seams: bool
+    :param boundary_weight: how strongly open edges hold their shape when they aren't preserved
+    :type boundary_weight: float
+    :param max_passes: most collapse passes to run
+    :type max_passes: int
+    :return: tris of the kept triangles in source vert ids, their corner uv ids and the source triangle each
+             one came from
+    :rtype: dict
+    """
+
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    tris = np.asarray(tris, dtype=np.int64).reshape(-1, 3)
+
+    num_verts = len(points)
+
+    if target_triangles is None:
+        target_triangles = int(round(len(tris) * ratio))
+
+    source_tris = np.arange(len(tris))
+
+    if corner_uv_ids is not None:
+        corner_uv_ids = np.asarray(corner_uv_ids, dtype=np.int64).reshape(-1, 3)
+
+    quadrics = sum_quadrics(tris.ravel(), np.repeat(plane_quadrics(points, tris), 3, axis=0), num_verts)
+
+    if not preserve_boundary:
+        # open edges are free to move, planes standing on them keep the outline in shape
+        edges = tris[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+        keys = edges.min(axis=1) * num_verts + edges.max(axis=1)
+
+        _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+        open_edges = first[counts == 1]
+
+        tri_points = points[tris[open_edges // 3]]
+        normals = cross(tri_points[:, 1] - tri_points[:, 0], tri_points[:, 2] - tri_points[:, 0])
+
+        quadrics += sum_quadrics(edges[open_edges].ravel(),
+                                 np.repeat(edge_quadrics(points, edges[open_edges], normals, boundary_weight), 2,
+                                           axis=0), num_verts)
+
+    locked = np.zeros(num_verts, dtype=bool)
+
+    if preserve_uv_seams and corner_uv_ids is not None:
+        # verts with more than one uv sit on a seam
+        pairs = np.unique(tris.ravel() * (corner_uv_ids.max() + 2) + corner_uv_ids.ravel() + 1)
+        locked |= np.bincount(pairs // (corner_uv_ids.max() + 2), minlength=num_verts) > 1
+
+    homogeneous = np.concatenate([points, np.ones((num_verts, 1))], axis=1)
+
+    for _ in range(max_passes):
+        needed = len(tris) - target_triangles
+
+        if needed <= 0:
+            break
+
+        edges = tris[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+        low = edges.min(axis=1)
+        high = edges.max(axis=1)
+
+        keys, edge_tri_counts = np.unique(low * num_verts + high, return_counts=True)
+        edge_a = keys // num_verts
+        edge_b = keys % num_verts
+
+        boundary_edges = edge_tri_counts == 1
+
+        on_boundary = np.zeros(num_verts, dtype=bool)
+        on_boundary[edge_a[boundary_edges]] = True
+        on_boundary[edge_b[boundary_edges]] = True
+
+        # non manifold edges are left alone, so are their verts
+        stuck = locked.copy()
+        stuck[edge_a[edge_tri_counts > 2]] = True
+        stuck[edge_b[edge_tri_counts > 2]] = True
+
+        if preserve_boundary:
+            stuck |= on_boundary
+
+        adjacency = csr_matrix((np.ones(2 * len(keys)), (np.r_[edge_a, edge_b], np.r_[edge_b, edge_a])),
+                               shape=(num_verts, num_verts))
+
+        # the verts either side of an edge have to be the only ones they share (link condition)
+        shared = adjacency.dot(adjacency).tocsr()
+        shared.sort_indices()
+
+        common = np.asarray(shared[edge_a, edge_b]).ravel()
+        manifold = common == edge_tri_counts
+
+        # a boundary vert can only slide along the boundary
+        pinches = ~boundary_edges & on_boundary[edge_a] & on_boundary[edge_b]
+
+        usable = manifold & (edge_tri_counts <= 2) & ~pinches
+
+        # every usable edge both ways round, the first vert moves onto the second
+        moving = np.r_[edge_a[usable], edge_b[usable]]
+        staying = np.r_[edge_b[usable], edge_a[usable]]
+        removes = np.r_[edge_tri_counts[usable], edge_tri_counts[usable]]
+
+        valid = ~stuck[moving]
+
+        if not preserve_boundary:
+            boundary_usable = np.r_[boundary_edges[usable], boundary_edges[usable]]
+            valid &= ~on_boundary[moving] | boundary_usable
+
+        moving, staying, removes = moving[valid], staying[valid], removes[valid]
+
+        if not len(moving):
+            break
+
+        target_points = homogeneous[staying]
+        costs = np.einsum("ij,ijk,ik->i", target_points, quadrics[moving] + quadrics[staying], target_points)
+
+        # the cheapest collapse of each vert
+        order = np.lexsort((costs, moving))
+        first = order[np.r_[True, moving[order][1:] != moving[order][:-1]]]
+
+        moving, staying, removes, costs = moving[first], staying[first], removes[first], costs[first]
+
+        destinations = np.full(num_verts, -1, dtype=np.int64)
+        destinations[moving] = staying
+
+        # triangles round the moving vert that don't hold the edge must not flip
+        corner_moves = destinations[tris]
+        moved_corners = np.argwhere(corner_moves >= 0)
+
+        moved_tris = tris[moved_corners[:, 0]]
+        destination = corner_moves[moved_corners[:, 0], moved_corners[:, 1]]
+        keeps_edge = (moved_tris == destination[:, np.newaxis]).any(axis=1)
+
+        moved_corners = moved_corners[~keeps_edge]
+        moved_tris = moved_tris[~keeps_edge]
+        destination = destination[~keeps_edge]
+
+        old_points = points[moved_tris]
+        new_points = old_points.copy()
+        new_points[np.arange(len(moved_corners)), moved_corners[:, 1]] = points[destination]
+
+        old_normals = cross(old_points[:, 1] - old_points[:, 0], old_points[:, 2] - old_points[:, 0])
+        new_normals = cross(new_points[:, 1] - new_points[:, 0], new_points[:, 2] - new_points[:, 0])
+
+        flips = np.einsum("ij,ij->i", old_normals, new_normals) <= 0
+
+        flipped = np.zeros(num_verts, dtype=bool)
+        flipped[moved_tris[flips, moved_corners[flips, 1]]] = True
+
+        keep = ~flipped[moving]
+        moving, staying, removes, costs = moving[keep], staying[keep], removes[keep], costs[keep]
+
+        if not len(moving):
+            break
+
+        # collapses whose verts aren't next to another collapse's verts can all be applied together, each
+        # collapse claims the neighbourhood when it is the cheapest in it
+        ranks = np.empty(len(moving), dtype=np.float64)
+        ranks[np.lexsort((moving, costs))] = np.arange(len(moving))
+
+        vert_ranks = np.full(num_verts, np.inf)
+        np.minimum.at(vert_ranks, moving, ranks)
+        np.minimum.at(vert_ranks, staying, ranks)
+
+        neighbourhood = (adjacency + csr_matrix((np.ones(num_verts), (np.arange(num_verts), np.arange(num_verts))),
+                                                shape=(num_verts, num_verts))).tocsr()
+
+        neighbourhood_ranks = np.minimum.reduceat(vert_ranks[neighbourhood.indices], neighbourhood.indptr[:-1])
+
+        chosen = (neighbourhood_ranks[moving] == ranks) & (neighbourhood_ranks[staying] == ranks)
+
+        # cheapest first, without removing more than needed
+        chosen = np.flatnonzero(chosen)
+        chosen = chosen[np.argsort(costs[chosen], kind="stable")]
+        chosen = chosen[np.cumsum(removes[chosen]) <= max(needed, removes[chosen[0]])]
+
+        moving, staying = moving[chosen], staying[chosen]
+
+        destinations = np.full(num_verts, -1, dtype=np.int64)
+        destinations[moving] = staying
+
+        corner_moves = destinations[tris]
+        moved = corner_moves >= 0
+
+        if corner_uv_ids is not None:
+            # the moving vert takes the staying vert's uv from the triangles on the collapsed edge
+            staying_uvs = np.full(num_verts, -1, dtype=np.int64)
+
+            for corner in range(3):
+                from_verts = tris[:, corner]
+                edge_tris = destinations[from_verts] >= 0
+
+                for other in range(3):
+                    on_edge = edge_tris & (tris[:, other] == destinations[from_verts])
+                    staying_uvs[from_verts[on_edge]] = corner_uv_ids[on_edge, other]
+
+            corner_uv_ids = np.where(moved, staying_uvs[tris], corner_uv_ids)
+
+        tris = np.where(moved, corner_moves, tris)
+
+        quadrics[staying] += quadrics[moving]
+
+        alive = (tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 2] != tris[:, 0])
+
+        tris = tris[alive]
+        source_tris = source_tris[alive]
+
+        if corner_uv_ids is not None:
+            corner_uv_ids = corner_uv_ids[alive]
+
+    return {"tris": tris, "corner_uv_ids": corner_uv_ids, "source_tris": source_tris}
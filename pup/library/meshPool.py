@@ -0,0 +1,369 @@
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import traceback
+
+import numpy as np
+
+from .arrayMesh import ArrayMesh
+from .meshCache import MeshCache
+
+# meshes a worker keeps around between jobs, so running more tasks on a mesh reuses its caches
+_worker_meshes = {}
+
+
+def python_executable():
+    """
+
+    Get the python to start worker processes with. Inside a maya session sys.executable is maya itself, the
+    workers are started with the mayapy next to it instead
+
+    :return: path to the python executable
+    :rtype: str
+    """
+
+    executable = sys.executable
+    name = os.path.basename(executable).lower()
+
+    if name.startswith("maya") and not name.startswith("mayapy"):
+        mayapy = os.path.join(os.path.dirname(executable), "mayapy" + (".exe" if name.endswith(".exe") else ""))
+
+        if os.path.isfile(mayapy):
+            return mayapy
+
+    return executable
+
+
+def spawn_context():
+    """
+
+    Get a multiprocessing context that starts fresh worker processes. Forking would copy the whole maya session
+    into every worker, so where python can only fork (python 2 off windows) there is no context
+
+    :return: multiprocessing context or module, None when workers can't be spawned
+    """
+
+    if hasattr(multiprocessing, "get_context"):
+        return multiprocessing.get_context("spawn")
+
+    # python 2 spawns on windows, everywhere else it forks
+    if sys.platform == "win32":
+        return multiprocessing
+
+    return None
+
+
+def task_name(task):
+    """
+
+    Get a readable name for a task, used in error messages
+
+    :param task: ArrayMesh method name or function taking the mesh as its first argument
+    :type task: str or function
+    :return: name
+    :rtype: str
+    """
+
+    return task if isinstance(task, str) else getattr(task, "__name__", repr(task))
+
+
+def _store_result(cache, key, name, result):
+    """
+
+    Write the arrays of a result to the shared folder so they don't have to be pickled back, anything else is
+    returned as it is
+
+    :param cache: shared folder
+    :type cache: MeshCache
+    :param key: mesh key
+    :type key: str
+    :param name: result name
+    :type name: str
+    :param result: task result
+    :return: (kind, value) to hand to _load_result
+    :rtype: tuple
+    """
+
+    if isinstance(result, np.ndarray) and result.dtype != object:
+        cache.save_arrays(key, name, {"result": result})
+        return "array", name
+
+    if isinstance(result, (tuple, list)) and result and \
+            all(isinstance(value, np.ndarray) and value.dtype != object for value in result):
+        cache.save_arrays(key, name, dict(("result_{0}".format(itr), value) for itr, value in enumerate(result)))
+        return "tuple", (name, len(result))
+
+    if isinstance(result, dict) and result and \
+            all(isinstance(value, np.ndarray) and value.dtype != object for value in result.values()):
+        cache.save_arrays(key, name, result)
+        return "dict", name
+
+    return "object", result
+
+
+def _load_result(cache, key, kind, value):
+    """
+
+    Read back a result written by _store_result
+
+    :param cache: shared folder, with mmap off so nothing holds on to the files
+    :type cache: MeshCache
+    :param key: mesh key
+    :type key: str
+    :param kind: kind returned by _store_result
+    :type kind: str
+    :param value: value returned by _store_result
+    :return: task result
+    """
+
+    if kind == "object":
+        return value
+
+    name = value[0] if kind == "tuple" else value
+    arrays = cache.load_arrays(key, name)
+
+    shutil.rmtree(cache.entry_path(key, name), ignore_errors=True)
+
+    if kind == "array":
+        return arrays["result"]
+
+    if kind == "tuple":
+        return tuple(arrays["result_{0}".format(itr)] for itr in range(value[1]))
+
+    return arrays
+
+
+def _run_mesh(job):
+    """
+
+    Worker side of a MeshPool, rebuild a mesh from the shared arrays and run the tasks on it
+
+    :param job: shared folder, mesh key, uv set, cache dir, run id, [(task, args, kwargs), ...]
+    :type job: tuple
+    :return: mesh key, [(kind, value), ...] for _load_result
+    :rtype: str, list
+    """
+
+    directory, key, uv_set, cache_dir, run_id, tasks = job
+
+    cache = MeshCache(directory)
+
+    mesh_key = (directory, key)
+    mesh = _worker_meshes.get(mesh_key)
+
+    if mesh is None:
+        arrays = cache.load_arrays(key, "mesh")
+
+        mesh = ArrayMesh(uv_set=uv_set, cache_dir=cache_dir, **arrays)
+
+        _worker_meshes.clear()
+        _worker_meshes[mesh_key] = mesh
+
+    results = []
+
+    for itr, (task, args, kwargs) in enumerate(tasks):
+        try:
+            if isinstance(task, str):
+                result = getattr(mesh, task)(*args, **kwargs)
+            else:
+                result = task(mesh, *args, **kwargs)
+        except Exception:
+            raise RuntimeError("{0} failed on mesh {1}:\n{2}".format(task_name(task), key, traceback.format_exc()))
+
+        results.append(_store_result(cache, key, "run{0}_{1}".format(run_id, itr), result))
+
+    return key, results
+
+
+class MeshPool(object):
+
+    def __init__(self, processes=None, cache_dir=None):
+        """
+
+        Runs ArrayMesh computations for many meshes in a pool of worker processes. The mesh arrays are written
+        once to a shared folder of .npy files that the workers memory map, so the arrays go through the os page
+        cache rather than being pickled to each worker, array results come back the same way
+
+        :param processes: number of worker processes, None uses one per cpu, 0 or 1 runs everything in this process.
+                          Everything also runs in this process where workers can't be spawned, see spawn_context
+        :type processes: int
+        :param cache_dir: disk cache folder for the worker meshes, see MeshCache
+        :type cache_dir: str
+        """
+
+        self.processes = multiprocessing.cpu_count() if processes is None else processes
+        self.cache_dir = cache_dir
+
+        self.directory = None
+        self.keys = []
+        self.sizes = {}
+        self.uv_sets = {}
+
+        self._pool = None
+        self._run_id = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        """
+
+        Make the shared folder, the worker processes are started when they are first needed
+
+        """
+
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix="meshPool_")
+
+    def close(self):
+        """
+
+        Stop the worker processes and delete the shared folder
+
+        """
+
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+        _worker_meshes.clear()
+
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+
+        self.keys = []
+        self.sizes = {}
+        self.uv_sets = {}
+
+    def add(self, key, points, face_counts, face_verts, uvs=None, uv_ids=None, uv_set="map1", edge_verts=None):
+        """
+
+        Share the arrays of a mesh with the workers
+
+        :param key: name to refer to the mesh by, must be unique in the pool
+        :type key: str
+        :param points: vertex positions
+        :param face_counts: number of verts in each face
+        :param face_verts: vert ids for each face vertex
+        :param uvs: uv positions
+        :param uv_ids: uv id for each face vertex, -1 for unmapped face verts
+        :param uv_set: name the uvs are stored under in the worker mesh
+        :type uv_set: str
+        :param edge_verts: n_edges x 2 vert ids, so edge ids from the workers match the source mesh
+        """
+
+        self.open()
+
+        arrays = {"points": np.asarray(points, dtype=np.float64).reshape(-1, 3),
+                  "face_counts": np.asarray(face_counts, dtype=np.int64),
+                  "face_verts": np.asarray(face_verts, dtype=np.int64)}
+
+        if uvs is not None:
+            arrays["uvs"] = np.asarray(uvs, dtype=np.float64).reshape(-1, 2)
+            arrays["uv_ids"] = np.asarray(uv_ids, dtype=np.int64)
+
+        if edge_verts is not None:
+            arrays["edge_verts"] = np.asarray(edge_verts, dtype=np.int64).reshape(-1, 2)
+
+        MeshCache(self.directory).save_arrays(key, "mesh", arrays)
+
+        self.keys.append(key)
+        self.sizes[key] = len(arrays["face_verts"])
+        self.uv_sets[key] = uv_set
+
+    def add_mesh(self, key, mesh, uv_set=None, space=None, share_edges=False):
+        """
+
+        Share the arrays of an ArrayMesh, or a maya Mesh, with the workers. The workers number the edges from the
+        face data unless the edge order is shared too, which costs a walk over every edge of a maya mesh
+
+        :param key: name to refer to the mesh by
+        :type key: str
+        :param mesh: mesh to share
+        :type mesh: ArrayMesh
+        :param uv_set: uv set to share, None shares the current set
+        :param space: space to get the points in
+        :param share_edges: share the edge order so edge ids handed back can be used on the source mesh
+        :type share_edges: bool
+        """
+
+        face_counts, face_verts = mesh.polygons()
+        uv_set = mesh._resolve_uv_set(uv_set)
+
+        try:
+            uvs, uv_ids = mesh.uv_data(uv_set=uv_set)
+        except RuntimeError:  # no uvs to share
+            uvs, uv_ids = None, None
+
+        self.add(key, mesh.points(space), face_counts, face_verts, uvs=uvs, uv_ids=uv_ids, uv_set=uv_set,
+                 edge_verts=mesh.edge_vert_list() if share_edges else None)
+
+    def _get_pool(self):
+        """
+
+        Get the worker processes, starting them the first time. Workers are spawned rather than forked so they
+        don't inherit the state of a running maya session
+
+        :return: process pool, None when workers can't be spawned
+        :rtype: multiprocessing.pool.Pool
+        """
+
+        if self._pool is None:
+            context = spawn_context()
+
+            if context is None:
+                return None
+
+            executable = python_executable()
+
+            if executable != sys.executable:
+                context.set_executable(executable)
+
+            self._pool = context.Pool(min(self.processes, max(len(self.keys), 1)))
+
+        return self._pool
+
+    def run(self, tasks):
+        """
+
+        Run tasks on every mesh in the pool, each mesh is one job so the tasks on a mesh share its caches.
+        The biggest meshes are handed out first to keep the workers busy till the end
+
+        :param tasks: ArrayMesh method names, functions taking the mesh as the first argument or
+                      (task, args, kwargs) tuples. Functions have to be importable by the workers
+        :type tasks: list
+        :return: results by mesh key, one result per task
+        :rtype: dict
+        """
+
+        tasks = [task if isinstance(task, tuple) else (task, (), {}) for task in tasks]
+        tasks = [(task[0], tuple(task[1]) if len(task) > 1 else (), task[2] if len(task) > 2 else {})
+                 for task in tasks]
+
+        keys = sorted(self.keys, key=lambda key: -self.sizes[key])
+        self._run_id += 1
+
+        jobs = [(self.directory, key, self.uv_sets[key], self.cache_dir, self._run_id, tasks) for key in keys]
+
+        pool = self._get_pool() if self.processes > 1 and len(jobs) > 1 else None
+
+        if pool is not None:
+            outputs = pool.imap_unordered(_run_mesh, jobs)
+        else:
+            outputs = (_run_mesh(job) for job in jobs)
+
+        cache = MeshCache(self.directory, mmap=False)
+        results = {}
+
+        for key, stored in outputs:
+            results[key] = [_load_result(cache, key, kind, value) for kind, value in stored]
+
+        return results
@@ -10,6 +10,7 @@ import maya.cmds as cmds
 import re
 
 from ..library import utilsLib
+from ..library import apiMesh
 from ..shelf import alembic
 from . import projectinfo
 
@@ -220,7 +221,10 @@ def open_folder(dict):
         os.startfile(dict["scene"])
 
 
-def publish_from_step(dict, variant):
+def publish_from_step(dict, variant, validation="gate"):
+    """
+    :param validation: gate - failed model checks stop the publish, report - only print them, None - skip them
+    """
     folder_publish = dict["publish"] + variant + "/"
 
     current_scene = (cmds.file(loc=True, q=True).split("/")[-1]).split(".")[0]
@@ -231,8 +235,11 @@ def publish_from_step(dict, variant):
             print "VERSION EXISTS, version up please"
 
         else:
-            os.makedirs(folder_publish + "v"+versionNumber)
             objects = cmds.ls(selection=True)
+            if validation:
+                apiMesh.validate_publish(objects, gate=validation == "gate")
+
+            os.makedirs(folder_publish + "v"+versionNumber)
             save_alembic(objects, folder_publish + "v"+versionNumber+"/"+current_scene)
             save_obj(objects, folder_publish + "v"+versionNumber+"/"+current_scene)
     else:
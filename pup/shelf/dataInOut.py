@@ -3,6 +3,7 @@ import pymel.core as pm
 import maya.mel as mel
 
 from ..library import utilsLib
+from ..library import apiMesh
 from ..library import coreLib
 from ..library import geometryLib
 from ..library import kinematicsLib
@@ -63,13 +64,23 @@ class DataInOut(info.scene_info):
         utilsLib.print_it("SAVED:   "+latest_scene)
 
 
-    def export_model(self, varient, objects):
+    def export_model(self, varient, objects, proxy_ratio=None, validation="gate"):
+        """
+        :param varient: eg. anim - render -proxy
+        :param objects: group to export
+        :param proxy_ratio: also build a reduced copy of the geo and publish it to the proxy stream, eg. 0.25
+        :param validation: gate - failed model checks stop the publish, report - only print them, None - skip them
+        :return:
+        """
 
         object_check = pm.ls(objects)
         if not object_check:
             print "NO %s GEO"%objects
             return
 
+        if validation:
+            apiMesh.validate_publish([objects], gate=validation == "gate", cache_dir=self.folder_rigging_meshCache)
+
         # if not model publish + varient directory
         varient_path = coreLib.save_to_path(varient, self.folder_model_publish, versionUp=True)
         file = varient_path + "/{0}_model_{1}_v001".format(self.asset_name, varient)
@@ -79,6 +90,33 @@ class DataInOut(info.scene_info):
         alembic.save_alembic([objects], file+".abc")
         alembic.save_obj([objects], file+".obj")
 
+        if proxy_ratio and varient != "proxy":
+            self.export_proxy(objects, ratio=proxy_ratio)
+
+    def export_proxy(self, objects, ratio=0.25, validation="report"):
+        """
+        builds a reduced copy of every mesh under objects into proxy_GRP, copies the skinning across when the
+        source is bound and publishes the group to the proxy stream
+        :param objects: group holding the source geo
+        :param ratio: fraction of the triangles to keep
+        :param validation: model checks on the proxy, only reported by default as decimation can leave slivers
+        :return: proxy group
+        """
+
+        if pm.objExists("proxy_GRP"):
+            pm.delete("proxy_GRP")
+        proxy_grp = pm.group(em=True, name="proxy_GRP")
+
+        for geo in geometryLib.decending_geo(objects):
+            proxy, _ = geometryLib.create_proxy(geo, ratio=ratio, parent=str(proxy_grp))
+
+            # proxy verts sit on source verts so the closest point copy is exact
+            kinematicsLib.copy_skin_weights(source=str(geo), destination=proxy)
+
+        self.export_model("proxy", str(proxy_grp), validation=validation)
+
+        return proxy_grp
+
     def import_model(self, varient, type="abc"):
         """
         :param varient: eg. anim - render -proxy
@@ -302,7 +340,7 @@ class DataInOut(info.scene_info):
                     folder = coreLib.save_to_path(folder=stream, asset_folder=self.folder_rigging_skinWeights,
                                                   versionUp=False)
                     pm.select(utilsLib.aslist(geo))
-                    kinematicsLib.xml_weights_in(path=folder, useSelected=True)
+                    kinematicsLib.xml_weights_in(path=folder, useSelected=True, cache_dir=self.folder_rigging_meshCache)
                 else:
                     print "PLEASE SELECT TOP FLODER - eg. ANIM_GRP"
 
@@ -319,7 +357,7 @@ class DataInOut(info.scene_info):
                 folder = coreLib.save_to_path(folder=stream, asset_folder=self.folder_rigging_skinWeights,
                                               versionUp=False)
                 pm.select(utilsLib.aslist(geo))
-                kinematicsLib.xml_weights_in(path=folder, useSelected=True)
+                kinematicsLib.xml_weights_in(path=folder, useSelected=True, cache_dir=self.folder_rigging_meshCache)
 
 
     def mirror_guide(self):
@@ -48,6 +48,8 @@ class scene_info():
         self.folder_rigging_shaders = self.folder_rigging_data + "shaders/"
         self.folder_rigging_blendShapes = self.folder_rigging_data + "blendShapes/"
         self.folder_rigging_extraGeo = self.folder_rigging_data + "extraGeo/"
+        # topology data of the published models, see library.meshCache
+        self.folder_rigging_meshCache = self.folder_rigging_data + "meshCache/"
 
         self.folder_rigging_code = self.folder_rigging_data + "code/"
 
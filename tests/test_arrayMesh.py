@@ -0,0 +1,427 @@
+"""
+
+Tests for the numpy side of the mesh library, they run on ArrayMesh so no maya is needed.
+
+    python -m pytest tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from benchmarks.meshBenchmark import import_array_mesh, grid_mesh, shells_mesh, sphere_mesh, torus_mesh
+
+ArrayMesh = import_array_mesh()
+
+# importing ArrayMesh first sets pup up without loading the maya tools
+from pup.library import meshBvh  # noqa: E402
+
+
+def brute_force_closest(mesh, positions):
+    """
+
+    Get the distance from each position to the closest point on every triangle of the mesh
+
+    :param mesh: mesh to test against
+    :type mesh: ArrayMesh
+    :param positions: n x 3 positions
+    :type positions: numpy.ndarray
+    :return: closest distances
+    :rtype: numpy.ndarray
+    """
+
+    corners = mesh.points()[mesh.triangle_verts()]
+    distances = np.empty(len(positions))
+
+    for itr, position in enumerate(positions):
+        repeated = np.repeat(position[np.newaxis], len(corners), axis=0)
+        closest, _ = meshBvh.closest_points_on_triangles(repeated, corners[:, 0], corners[:, 1], corners[:, 2])
+
+        distances[itr] = np.sqrt(((closest - position) ** 2).sum(axis=1).min())
+
+    return distances
+
+
+def brute_force_winding(mesh, positions):
+    """
+
+    Get the winding number of each position summed exactly over every triangle of the mesh
+
+    :param mesh: mesh to test against
+    :type mesh: ArrayMesh
+    :param positions: n x 3 positions
+    :type positions: numpy.ndarray
+    :return: winding numbers
+    :rtype: numpy.ndarray
+    """
+
+    corners = mesh.points()[mesh.triangle_verts()]
+
+    return np.array([meshBvh.triangle_solid_angles(np.repeat(position[np.newaxis], len(corners), axis=0),
+                                                   corners[:, 0], corners[:, 1], corners[:, 2]).sum()
+                     for position in positions]) / (4.0 * np.pi)
+
+
+class TestQueries(unittest.TestCase):
+
+    def test_closest_points(self):
+        random = np.random.RandomState(0)
+
+        for shape in (sphere_mesh, torus_mesh, shells_mesh):
+            mesh = ArrayMesh(*shape(1500))
+            points = mesh.points()
+
+            low, high = points.min(axis=0), points.max(axis=0)
+            positions = random.uniform(low - 0.5, high + 0.5, (300, 3))
+
+            result = mesh.point_on_mesh(positions)
+
+            np.testing.assert_allclose(result["distance"], brute_force_closest(mesh, positions), atol=1e-9)
+            np.testing.assert_allclose(np.sqrt(((result["point"] - positions) ** 2).sum(axis=1)),
+                                       result["distance"], atol=1e-9)
+
+    def test_closest_points_on_verts(self):
+        mesh = ArrayMesh(*sphere_mesh(1500))
+        points = mesh.points()
+
+        np.testing.assert_allclose(mesh.point_on_mesh(points)["distance"], 0.0, atol=1e-9)
+
+    def test_winding_numbers(self):
+        random = np.random.RandomState(1)
+
+        for shape in (sphere_mesh, torus_mesh):
+            mesh = ArrayMesh(*shape(1500))
+            mesh.points()
+
+            positions = random.uniform(-1.5, 1.5, (500, 3))
+            exact = brute_force_winding(mesh, positions)
+
+            winding = mesh.winding_numbers(positions)
+
+            self.assertLess(np.abs(winding - exact).max(), 0.15)
+            np.testing.assert_array_equal(mesh.inside_mesh(positions), exact > 0.5)
+
+    def test_winding_numbers_empty(self):
+        mesh = ArrayMesh(*sphere_mesh(500))
+        mesh.points()
+
+        self.assertEqual(mesh.winding_numbers(np.zeros((0, 3))).shape, (0,))
+
+
+class TestGeodesics(unittest.TestCase):
+
+    def test_sphere(self):
+        mesh = ArrayMesh(*sphere_mesh(2000))
+        points = mesh.points()
+
+        # great circle distance on the unit sphere
+        exact = np.arccos(np.clip(points.dot(points[0]), -1.0, 1.0))
+
+        distances = mesh.geodesic_distances([0])
+
+        self.assertEqual(distances[0], 0.0)
+        self.assertLess(np.abs(distances - exact).max(), 0.05)
+
+    def test_unreached_piece(self):
+        points, face_counts, face_verts, _, _ = grid_mesh(16)
+
+        mesh = ArrayMesh(np.vstack([points, points + [10.0, 0.0, 0.0]]), np.r_[face_counts, face_counts],
+                         np.r_[face_verts, face_verts + len(points)])
+
+        distances = mesh.geodesic_distances([0])
+
+        self.assertTrue(np.isfinite(distances[:len(points)]).all())
+        self.assertTrue(np.isinf(distances[len(points):]).all())
+
+
+class TestTopology(unittest.TestCase):
+
+    def test_symmetry_map(self):
+        mesh = ArrayMesh(*sphere_mesh(1500))
+        points = mesh.points()
+
+        mirror_ids, confidence = mesh.symmetry_map("x")
+
+        np.testing.assert_allclose(points[mirror_ids], points * [-1.0, 1.0, 1.0], atol=1e-9)
+        self.assertTrue((confidence > 0.99).all())
+
+    def test_symmetry_map_by_topology(self):
+        points, face_counts, face_verts, uvs, uv_ids = sphere_mesh(1500)
+
+        mesh = ArrayMesh(points, face_counts, face_verts, uvs, uv_ids)
+        exact_ids, _ = mesh.symmetry_map("x")
+
+        # push one side out of shape, the walk should still find the mirrors
+        sculpted = points.copy()
+        sculpted[points[:, 0] > 0.2] *= 1.3
+
+        mesh.set_points(sculpted)
+        mirror_ids, confidence = mesh.symmetry_map("x")
+
+        np.testing.assert_array_equal(mirror_ids, exact_ids)
+        self.assertTrue((confidence > 0).all())
+
+    def test_match_topology(self):
+        points, face_counts, face_verts, uvs, uv_ids = torus_mesh(1000)
+
+        # the same mesh with its verts renumbered and nudged
+        random = np.random.RandomState(2)
+        order = random.permutation(len(points))
+        new_ids = np.argsort(order)
+
+        mesh = ArrayMesh(points, face_counts, face_verts, uvs, uv_ids)
+        other = ArrayMesh(points[order] + random.normal(0.0, 0.01, points.shape), face_counts, new_ids[face_verts],
+                          uvs, uv_ids)
+
+        np.testing.assert_array_equal(mesh.match_topology(other), new_ids)
+
+
+class TestValidate(unittest.TestCase):
+
+    def setUp(self):
+        self.points, face_counts, face_verts, self.uvs, uv_ids = grid_mesh(25)
+
+        self.face_counts = list(face_counts)
+        self.face_verts = face_verts.reshape(-1, 4).tolist()
+        self.uv_ids = uv_ids.reshape(-1, 4).tolist()
+
+    def build(self, points=None):
+        return ArrayMesh(self.points if points is None else points, self.face_counts,
+                         [vert for face in self.face_verts for vert in face], self.uvs,
+                         [uv for face in self.uv_ids for uv in face])
+
+    def test_clean(self):
+        for ids in self.build().validate().values():
+            self.assertEqual(len(ids), 0)
+
+        for ids in ArrayMesh(*sphere_mesh(500)).validate().values():
+            self.assertEqual(len(ids), 0)
+
+    def test_flipped_normals(self):
+        self.face_verts[5] = self.face_verts[5][::-1]
+        self.uv_ids[5] = self.uv_ids[5][::-1]
+
+        self.assertEqual(self.build().validate(checks=["flipped_normals"])["flipped_normals"].tolist(), [5])
+
+    def test_unused_verts(self):
+        points = np.vstack([self.points, [[10.0, 10.0, 10.0]]])
+
+        self.assertEqual(self.build(points).validate(checks=["unused_verts"])["unused_verts"].tolist(),
+                         [len(self.points)])
+
+    def test_lamina_faces(self):
+        self.face_counts.append(4)
+        self.face_verts.append(self.face_verts[0])
+        self.uv_ids.append(self.uv_ids[0])
+
+        self.assertEqual(self.build().validate(checks=["lamina_faces"])["lamina_faces"].tolist(),
+                         [0, len(self.face_counts) - 1])
+
+    def test_zero_area_faces(self):
+        points = self.points.copy()
+
+        # fold the corners of the first face onto a line
+        points[self.face_verts[0][2]] = points[self.face_verts[0][1]]
+        points[self.face_verts[0][3]] = points[self.face_verts[0][0]]
+
+        self.assertEqual(self.build(points).validate(checks=["zero_area_faces"])["zero_area_faces"].tolist(), [0])
+
+    def test_overlapping_uvs(self):
+        # map the last face onto the uvs of the first
+        self.uv_ids[-1] = self.uv_ids[0]
+
+        overlapping = self.build().validate(checks=["overlapping_uvs"])["overlapping_uvs"]
+
+        self.assertEqual(overlapping.tolist(), [0, len(self.face_counts) - 1])
+
+
+class TestDecimate(unittest.TestCase):
+
+    def test_sphere(self):
+        mesh = ArrayMesh(*sphere_mesh(2000))
+        points = mesh.points()
+
+        reduced, mapping = mesh.decimate(ratio=0.5)
+
+        self.assertLessEqual(reduced.num_triangles, mesh.num_triangles // 2 + 2)
+        self.assertGreater(reduced.num_triangles, mesh.num_triangles // 3)
+
+        # the reduced verts are source verts, and the surface is still closed and clean
+        np.testing.assert_array_equal(reduced.points(), points[mapping["source_verts"]])
+
+        for ids in reduced.validate().values():
+            self.assertEqual(len(ids), 0)
+
+        # every source vert sits on its reduced triangle
+        tri_verts = reduced.triangle_verts()[mapping["triangles"]]
+        rebuilt = np.einsum("ijk,ij->ik", reduced.points()[tri_verts], mapping["bary"])
+
+        self.assertLess(np.abs(rebuilt - points).max(), 0.1)
+        self.assertEqual(len(mapping["source_triangles"]), reduced.num_triangles)
+
+    def test_keeps_boundary(self):
+        mesh = ArrayMesh(*grid_mesh(400))
+        mesh.points()
+
+        boundary = np.unique(mesh.edge_vert_list()[np.diff(mesh.edge_face_matrix().indptr) == 1])
+
+        reduced, mapping = mesh.decimate(ratio=0.25)
+
+        self.assertTrue(np.isin(boundary, mapping["source_verts"]).all())
+        np.testing.assert_allclose(reduced.points()[:, 2], 0.0)
+        self.assertAlmostEqual(reduced.triangle_areas().sum(), mesh.triangle_areas().sum())
+
+
+class TestFromObj(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, lines):
+        path = os.path.join(self.directory, "mesh.obj")
+
+        with open(path, "w") as obj_file:
+            obj_file.write("\n".join(lines) + "\n")
+
+        return path
+
+    def test_quads_and_uvs(self):
+        path = self.write(["# two quads", "v 0 0 0", "v 1 0 0", "v 1 1 0", "v 0 1 0", "v 2 0 0", "v 2 1 0",
+                           "vt 0 0", "vt 0.5 0", "vt 0.5 1", "vt 0 1", "vt 1 0", "vt 1 1",
+                           "vn 0 0 1", "f 1/1/1 2/2/1 3/3/1 4/4/1", "f 2/2/1 5/5/1 6/6/1 3/3/1"])
+
+        mesh = ArrayMesh.from_obj(path)
+
+        face_counts, face_verts = mesh.polygons()
+
+        self.assertEqual(face_counts.tolist(), [4, 4])
+        self.assertEqual(face_verts.tolist(), [0, 1, 2, 3, 1, 4, 5, 2])
+
+        uvs, uv_ids = mesh.uv_data()
+
+        self.assertEqual(uv_ids.tolist(), [0, 1, 2, 3, 1, 4, 5, 2])
+        np.testing.assert_allclose(uvs[uv_ids[6]], [1.0, 1.0])
+
+    def test_negative_ids_and_no_uvs(self):
+        path = self.write(["v 0 0 0", "v 1 0 0", "v 0 1 0", "f -3 -2 -1", "v 1 1 0", "f 2 4 3"])
+
+        mesh = ArrayMesh.from_obj(path)
+
+        self.assertEqual(mesh.polygons()[1].tolist(), [0, 1, 2, 1, 3, 2])
+        self.assertRaises(RuntimeError, mesh.uv_data)
+
+
+class FlippedTriangles(ArrayMesh):
+
+    def _fetch_triangles(self):
+        """
+
+        Triangulate each quad across its other diagonal
+
+        :return: number of triangles per face, triangle vert ids
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+
+        face_counts, face_verts = self.polygons()
+        quads = face_verts.reshape(-1, 4)
+
+        return np.full(len(face_counts), 2, dtype=np.int64), quads[:, [1, 2, 3, 1, 3, 0]].ravel()
+
+    def _triangle_source(self):
+        """
+
+        :return: flipped
+        :rtype: str
+        """
+
+        return "flipped"
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.mesh_data = shells_mesh(400)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        mesh = ArrayMesh(*self.mesh_data, cache_dir=self.directory)
+        mesh.points()
+
+        shells = mesh.uv_shells()
+        geodesics = mesh.geodesic_distances([0])
+        mirror_ids, _ = mesh.symmetry_map("x")
+
+        self.assertTrue(os.listdir(self.directory))
+
+        # a fresh mesh reads the same arrays back
+        loaded = ArrayMesh(*self.mesh_data, cache_dir=self.directory)
+        loaded.points()
+
+        np.testing.assert_array_equal(loaded.triangle_verts(), mesh.triangle_verts())
+        np.testing.assert_array_equal(loaded.uv_shells()[0], shells[0])
+        np.testing.assert_array_equal(loaded.uv_shells()[1], shells[1])
+        np.testing.assert_array_equal(loaded.symmetry_map("x")[0], mirror_ids)
+        np.testing.assert_allclose(loaded.geodesic_distances([0]), geodesics)
+
+    def test_symmetry_follows_points(self):
+        mesh = ArrayMesh(*self.mesh_data, cache_dir=self.directory)
+        points = mesh.points()
+
+        mirror_ids, _ = mesh.symmetry_map("x")
+
+        # moved along x the mesh no longer mirrors across the origin, the cached map must not be reused
+        moved = ArrayMesh(points + [0.5, 0.0, 0.0], *self.mesh_data[1:], cache_dir=self.directory)
+        _, confidence = moved.symmetry_map("x")
+
+        self.assertFalse((confidence > 0.99).all())
+        np.testing.assert_array_equal(mesh.symmetry_map("x")[0], mirror_ids)
+
+    def test_edge_order_collision(self):
+        mesh = ArrayMesh(*self.mesh_data, cache_dir=self.directory)
+        face_edges = mesh.edge_vert_list()
+
+        # the same topology with its edges numbered backwards, as a host might
+        host_edges = face_edges[::-1].copy()
+
+        other = ArrayMesh(*self.mesh_data, cache_dir=self.directory, edge_verts=host_edges)
+        np.testing.assert_array_equal(other.edge_vert_list(), host_edges)
+        np.testing.assert_array_equal(other.edge_face_matrix().toarray(),
+                                      mesh.edge_face_matrix().toarray()[::-1])
+
+        # and the first mesh still gets its own order back from the shared cache
+        again = ArrayMesh(*self.mesh_data, cache_dir=self.directory)
+        np.testing.assert_array_equal(again.edge_vert_list(), face_edges)
+
+    def test_triangle_collision(self):
+        mesh = ArrayMesh(*self.mesh_data, cache_dir=self.directory)
+        mesh.points()
+
+        fan = mesh.triangle_verts().copy()
+        mesh.cotangent_laplacian()
+
+        flipped = FlippedTriangles(*self.mesh_data, cache_dir=self.directory)
+        flipped.points()
+
+        quads = self.mesh_data[2].reshape(-1, 4)
+
+        np.testing.assert_array_equal(flipped.triangle_verts(), quads[:, [1, 2, 3, 1, 3, 0]].reshape(-1, 3))
+        self.assertFalse(np.array_equal(flipped.triangle_verts(), fan))
+
+        # the laplacian layout comes from the triangles, it must not be shared either
+        laplacian = flipped.cotangent_laplacian()
+        expected = FlippedTriangles(*self.mesh_data).cotangent_laplacian()
+
+        np.testing.assert_allclose(laplacian.toarray(), expected.toarray(), atol=1e-12)
+
+        again = ArrayMesh(*self.mesh_data, cache_dir=self.directory)
+        again.points()
+
+        np.testing.assert_array_equal(again.triangle_verts(), fan)